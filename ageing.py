@@ -0,0 +1,208 @@
+import numpy as np
+import snapshot
+from arraytopology import DX, DY
+
+'''
+Link ageing
+
+Ageing wears the links of a Mesh or Torus (object, array or lazy backed) down over time. Every
+physical link, the pair of a router's link and its counterpart on the neighbour, gets one health
+value, the lower of the two at the start; links that are already faulty are left alone. The
+engine keeps the health of the links it ages in its own array and a wear model moves all of them
+at once.
+
+Observers only hear about a link when it crosses the threshold: both of its ends are then set to
+the health it has at that step, through Router.setLinkHealth() or ArrayTopology.writeHealth(), in
+the order the links failed, so NeighbourIndex, PathCache, DynamicRoutes and the rest update
+incrementally. The slow decay above the threshold is written back without telling anyone by
+sync(), which run() calls at the end (on a lazy topology this stores every router it touches, on
+an object one it refreshes the NeighbourIndex).
+
+run(steps) advances the clock in blocks of 'blockSize' steps. The models work out, per block,
+the health of every link at the end of the block and the exact step at which a link crossed the
+threshold, so a block costs a few vectorized operations however long it is:
+* WeibullWear       deterministic decay exp(-(t/scale)**shape) with a random scale per link;
+                    lifetimes follow a Weibull distribution
+* GammaWear         stochastic wear, a gamma process: the wear of every step is gamma distributed
+                    with mean 'rate' and coefficient of variation 'variation'. A block draws the
+                    total wear of every link and, only for the links that crossed, splits it over
+                    the steps of the block (a Dirichlet draw, which is exact for a gamma process)
+electromigration() turns current density and temperature into GammaWear rates with Black's equation.
+
+A model keeps per-link parameters, so it belongs to one engine. Health changed by anyone else
+after the engine was made isn't picked up.
+'''
+
+# Boltzmann constant in eV/K
+BOLTZMANN = 8.617e-5
+
+class Ageing:
+    def __init__(self, topo, model, rng = None, blockSize = 1024):
+        self.topology = topo
+        self.X, self.Y = topo.getDimensions()
+        self.model = model
+        self.rng = np.random.default_rng(rng)
+        self.blockSize = blockSize
+        self.threshold = topo.threshold if hasattr(topo, "health") else topo.routers[0][0].threshold
+        health = np.asarray(snapshot.stateArrays(topo)[0], dtype=float)
+        # every physical link once, as the right (0) and up (1) link of a router
+        ys, xs, directions = np.indices((self.Y, self.X, 2)).reshape(3, -1)
+        ny, nx, nd = (ys+DY[directions]) % self.Y, (xs+DX[directions]) % self.X, directions+2
+        linkHealth = np.minimum(health[ys, xs, directions], health[ny, nx, nd])
+        keep = linkHealth > self.threshold
+        self.ends = np.stack((ys, xs, directions, ny, nx, nd))[:, keep]
+        self.health = linkHealth[keep]
+        self.alive = np.ones(len(self.health), dtype=bool)
+        self.time = 0
+        self.events = []
+        model.start(self)
+
+    # returns the value of every aged link in 'values', broadcast to (Y, X, 4), the larger of its two ends
+    def gather(self, values):
+        values = np.broadcast_to(np.asarray(values, dtype=float), (self.Y, self.X, 4))
+        ys, xs, directions, ny, nx, nd = self.ends
+        return np.maximum(values[ys, xs, directions], values[ny, nx, nd])
+
+    # advances the clock by 'steps', returning the links that failed as (step, (x, y), direction, health)
+    def run(self, steps, sync = True):
+        events = []
+        while steps > 0:
+            block = min(steps, self.blockSize)
+            links = np.flatnonzero(self.alive)
+            if len(links) == 0:
+                self.time = self.time + steps
+                break
+            health, crossing, atCrossing = self.model.advance(links, self.health[links], self.time, block, self.threshold, self.rng)
+            self.health[links] = health
+            crossed = np.flatnonzero(crossing)
+            crossed = crossed[np.argsort(crossing[crossed], kind="stable")]
+            failed = links[crossed]
+            self.health[failed] = atCrossing[crossed]
+            self.alive[failed] = False
+            events.extend(self.fail(failed, self.time + crossing[crossed]))
+            self.time = self.time + block
+            steps = steps - block
+        if sync:
+            self.sync()
+        self.events.extend(events)
+        return events
+
+    def step(self):
+        return self.run(1)
+
+    # sets both ends of the 'failed' links to their health, telling the observers, in order
+    def fail(self, failed, times):
+        ys, xs, directions, ny, nx, nd = self.ends[:, failed]
+        health = self.health[failed]
+        topo = self.topology
+        if hasattr(topo, "health"):
+            flat = np.ravel_multi_index((np.stack((ys, ny), 1).ravel(), np.stack((xs, nx), 1).ravel(),
+                np.stack((directions, nd), 1).ravel()), topo.health.shape)
+            topo.writeHealth(flat, np.repeat(health, 2))
+        else:
+            for link in range(len(failed)):
+                topo.routerAt(int(xs[link]), int(ys[link])).setLinkHealth(int(directions[link]), float(health[link]))
+                topo.routerAt(int(nx[link]), int(ny[link])).setLinkHealth(int(nd[link]), float(health[link]))
+        return [(int(time), (int(x), int(y)), int(direction), float(value))
+            for time, x, y, direction, value in zip(times, xs, ys, directions, health)]
+
+    # writes the health of the links still above the threshold to the topology, without telling the observers
+    def sync(self):
+        ys, xs, directions, ny, nx, nd = self.ends[:, self.alive]
+        health = self.health[self.alive]
+        topo = self.topology
+        if hasattr(topo, "health"):
+            topo.health[ys, xs, directions] = health
+            topo.health[ny, nx, nd] = health
+            return
+        routers = {}
+        for y, x, direction, value in zip(np.concatenate((ys, ny)).tolist(), np.concatenate((xs, nx)).tolist(),
+                np.concatenate((directions, nd)).tolist(), np.tile(health, 2).tolist()):
+            if (x, y) not in routers:
+                routers[(x, y)] = list(topo.routerAt(x, y).linkHealth)
+            routers[(x, y)][direction] = value
+        # assigning the list instead of changing it in place also stores lazy routers
+        for (x, y), linkHealth in routers.items():
+            topo.routerAt(x, y).linkHealth = linkHealth
+        # the writes went past the observers, the neighbour index reads the routers again
+        if getattr(topo, "neighbourIndex", None) is not None:
+            topo.neighbourIndex.refresh()
+
+    # number of aged links still above the threshold
+    def aliveCount(self):
+        return int(np.count_nonzero(self.alive))
+
+
+######################
+# Wear models
+######################
+class WeibullWear:
+    # a link 't' steps old has its starting health times exp(-(t/scale)**shape), 'scale' varying
+    # from link to link by a lognormal factor with sigma 'spread'
+    def __init__(self, scale, shape = 2.0, spread = 0.25):
+        self.scale, self.shape, self.spread = scale, shape, spread
+
+    def start(self, engine):
+        self.initial = engine.health.copy()
+        self.scales = engine.gather(self.scale)*engine.rng.lognormal(0, self.spread, len(self.initial))
+
+    def healthAt(self, links, time):
+        return self.initial[links]*np.exp(-(time/self.scales[links])**self.shape)
+
+    # returns the health of 'links' after 'steps' more steps, the step of the block in which each
+    # crossed the threshold (0 if it didn't) and its health at that step
+    def advance(self, links, health, time, steps, threshold, rng):
+        health = self.healthAt(links, time + steps)
+        crossing = np.zeros(len(links), dtype=np.int64)
+        crossed = np.flatnonzero(health <= threshold)
+        atCrossing = health.copy()
+        if len(crossed):
+            failing = links[crossed]
+            lifetime = self.scales[failing]*np.log(self.initial[failing]/threshold)**(1.0/self.shape)
+            step = np.clip(np.ceil(lifetime - time), 1, steps).astype(np.int64)
+            # rounding can leave the link just above the threshold at the computed step
+            late = self.healthAt(failing, time + step) > threshold
+            step[late] = np.minimum(step[late] + 1, steps)
+            crossing[crossed] = step
+            atCrossing[crossed] = self.healthAt(failing, time + step)
+        return health, crossing, atCrossing
+
+
+class GammaWear:
+    # the wear of every step is gamma distributed with mean 'rate' (a number, or per link as an
+    # array broadcast to (Y, X, 4)) and coefficient of variation 'variation'
+    def __init__(self, rate, variation = 1.0):
+        self.rate, self.variation = rate, variation
+
+    def start(self, engine):
+        self.rates = engine.gather(self.rate)
+
+    def advance(self, links, health, time, steps, threshold, rng):
+        k = 1.0/self.variation**2
+        scale = self.rates[links]*self.variation**2
+        wear = rng.gamma(k*steps, 1.0, len(links))*scale
+        after = np.maximum(health - wear, 0)
+        crossing = np.zeros(len(links), dtype=np.int64)
+        atCrossing = after.copy()
+        crossed = np.flatnonzero(after <= threshold)
+        # split the total wear of the crossed links over the steps, a few rows at a time
+        for chunk in np.array_split(crossed, max(1, len(crossed)*steps // 2**20)):
+            if len(chunk) == 0:
+                continue
+            worn = np.cumsum(rng.gamma(k, 1.0, (len(chunk), steps)), axis=1)
+            worn = worn*(wear[chunk]/worn[:, -1])[:, None]
+            path = health[chunk, None] - worn
+            path[:, -1] = health[chunk] - wear[chunk]
+            step = np.argmax(path <= threshold, axis=1)
+            crossing[chunk] = step + 1
+            atCrossing[chunk] = np.maximum(path[np.arange(len(chunk)), step], 0)
+        return after, crossing, atCrossing
+
+
+# returns wear rates per step for GammaWear from Black's equation, MTTF = A*J**-n*exp(Ea/(k*T))
+# 'current' is the current density (a number or (Y, X, 4) array, e.g. TrafficRouting.utilisation()),
+# 'temperature' in kelvin; a link wears from health 1 to 0 in MTTF steps on average
+def electromigration(current, temperature = 358.0, activation = 0.7, exponent = 2.0, A = 1.0):
+    current = np.asarray(current, dtype=float)
+    mttf = A*np.power(current, -exponent, where=current > 0, out=np.full(current.shape, np.inf))*np.exp(activation/(BOLTZMANN*np.asarray(temperature, dtype=float)))
+    return 1.0/mttf
@@ -0,0 +1,285 @@
+import numpy as np
+from router import Router
+import topology
+
+'''
+Structure-of-arrays topologies
+
+ArrayMesh and ArrayTorus keep the state of every router in a few contiguous NumPy arrays
+instead of one Router object per grid cell:
+* health        (Y, X, 4)   link health, ordered right, up, left, down as in Router
+* linkWeights   (Y, X, 4)   link weights
+* weights       (Y, X)      router weights
+A single threshold is shared by all routers of the topology.
+
+topo.routers[y][x] still works; it hands out RouterView objects that read and write
+straight into the arrays, so existing code (findPath, showPath, fault injection) runs unchanged.
+'''
+
+# x and y offsets of the neighbour along each link direction
+DX = np.array([1, 0, -1, 0])
+DY = np.array([0, -1, 0, 1])
+
+#############################
+# Router backed by the arrays
+#############################
+class RouterView(Router):
+    def __init__(self, topology, x, y):
+        self.topology = topology
+        self.posx, self.posy = x, y
+        # search state is not kept in the arrays, search.py keeps it per query
+        self.cost = self.heuristic = 0
+        self.parent = None
+
+    # views of the same router compare equal, even though a new view is made on every access
+    def __eq__(self, other):
+        return (isinstance(other, RouterView) and self.topology is other.topology
+            and self.posx == other.posx and self.posy == other.posy)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.topology), self.posx, self.posy))
+
+    def __repr__(self):
+        return "RouterView({0}, {1})".format(self.posx, self.posy)
+
+    # the Router attributes map onto array elements
+    @property
+    def linkHealth(self):
+        return self.topology.health[self.posy, self.posx]
+
+    @linkHealth.setter
+    def linkHealth(self, linkHealthList):
+        self.topology.health[self.posy, self.posx] = linkHealthList
+
+    @property
+    def linkWeightList(self):
+        return self.topology.linkWeights[self.posy, self.posx]
+
+    @property
+    def weight(self):
+        return self.topology.weights[self.posy, self.posx]
+
+    @weight.setter
+    def weight(self, weight):
+        self.topology.weights[self.posy, self.posx] = weight
+
+    @property
+    def threshold(self):
+        return self.topology.threshold
+
+    @property
+    def observers(self):
+        return self.topology.observers
+
+    # returns an array of healthy (1) and permanent-hard-faulty (0) links
+    def getHealthyLinksList(self):
+        return (self.linkHealth > self.topology.threshold).astype(int).tolist()
+
+
+####################################
+# Rows of views, for routers[y][x]
+####################################
+# the views come from topology.routerAt(), so other view-backed topologies (see lazytopology.py) share these
+class RouterRow:
+    def __init__(self, topology, y):
+        self.topology, self.y = topology, y
+
+    def __len__(self):
+        return self.topology.X
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self[j] for j in range(*x.indices(self.topology.X))]
+        return self.topology.routerAt(range(self.topology.X)[x], self.y)
+
+    def __iter__(self):
+        for x in range(self.topology.X):
+            yield self.topology.routerAt(x, self.y)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class RouterGrid:
+    def __init__(self, topology):
+        self.topology = topology
+
+    def __len__(self):
+        return self.topology.Y
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(self.topology.Y))]
+        return RouterRow(self.topology, range(self.topology.Y)[y])
+
+    def __iter__(self):
+        for y in range(self.topology.Y):
+            yield RouterRow(self.topology, y)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+#####################################
+# Common base for array topologies
+#####################################
+class ArrayTopology:
+    # 'arrays' hands over existing (health, linkWeights, weights) arrays (e.g. read by snapshot.load())
+    # instead of allocating new ones, 'connectAllLinks' is then ignored
+    def __init__(self, x, y, connectAllLinks = False, threshold = 0.03, arrays = None):
+        self.X, self.Y = x, y
+        self.threshold = threshold
+        if arrays is not None:
+            self.health, self.linkWeights, self.weights = arrays
+        else:
+            self.health = np.full((y, x, 4), 1 if connectAllLinks else 0, dtype=np.float32)
+            self.linkWeights = np.ones((y, x, 4))
+            self.weights = np.ones((y, x))
+        self.routers = RouterGrid(self)
+        self.observers = []
+
+    # a topology mapped read-only from a snapshot (see snapshot.py) is pickled as its file name
+    def __reduce_ex__(self, protocol):
+        if getattr(self, "snapshotPath", None) is not None:
+            import snapshot
+            return (snapshot.load, (self.snapshotPath,))
+        return object.__reduce_ex__(self, protocol)
+
+    # writes a new health array, telling observers about every link that changed
+    def setHealth(self, health):
+        health = np.broadcast_to(np.asarray(health, dtype=self.health.dtype), self.health.shape)
+        if not self.observers:
+            self.health[:] = health
+            return
+        changed = np.flatnonzero(self.health != health)
+        self.writeHealth(changed, health.flat[changed])
+
+    # sets the links at the given flat indices of the health array to 'value'
+    def setLinksHealth(self, flat, value):
+        flat = np.unique(flat)
+        self.writeHealth(flat, np.full(len(flat), value, dtype=self.health.dtype))
+
+    # writes 'values' to the links at the given flat indices
+    # With observers the links change one at a time, each observer hearing about a link before the
+    # next one changes (as Router.setLinkHealthList() does), so none of them sees a change it hasn't
+    # been told about yet.
+    def writeHealth(self, flat, values):
+        if not self.observers:
+            self.health.flat[flat] = values
+            return
+        ys, xs, directions = np.unravel_index(flat, self.health.shape)
+        for link, y, x, direction, value in zip(np.asarray(flat).tolist(), ys.tolist(), xs.tolist(), directions.tolist(), np.asarray(values).tolist()):
+            old = float(self.health.flat[link])
+            if old == value:
+                continue
+            self.health.flat[link] = value
+            router = RouterView(self, x, y)
+            for observer in self.observers:
+                observer.linkHealthChanged(router, direction, old, float(self.health.flat[link]))
+
+    # returns a (Y, X, 4) boolean array of healthy links
+    def healthyLinks(self):
+        return self.health > self.threshold
+
+    # returns a (Y, X) array with the number of healthy links of every router
+    def healthyLinksCount(self):
+        return self.healthyLinks().sum(axis=2)
+
+    # returns a (Y, X) boolean array of isolated (faulty) routers
+    def isolatedRouters(self):
+        return ~self.healthyLinks().any(axis=2)
+
+    # returns router at given address
+    def routerAt(self, posx, posy):
+        return RouterView(self, posx, posy)
+
+    # returns active neighbouring routers
+    def getActiveNeighbours(self, pos):
+        x, y = pos
+        healthy = self.health[y, x] > self.threshold
+        active = []
+        for link in range(4):
+            if(healthy[link]):
+                active.append(RouterView(self, (x+int(DX[link]))%self.X, (y+int(DY[link]))%self.Y))
+        return active
+
+    # search state is kept per query, there's nothing stored in the arrays to clear
+    def clearPathInfo(self):
+        return
+
+    # kills the given links, and their counterparts on the neighbouring routers
+    # xs, ys and directions are equal length sequences; returns the number of links that were healthy
+    def injectLinkFaults(self, xs, ys, directions):
+        xs, ys, directions = np.asarray(xs, dtype=int), np.asarray(ys, dtype=int), np.asarray(directions, dtype=int)
+        healthy = np.count_nonzero(self.health[ys, xs, directions] > self.threshold)
+        self.setLinksHealth(np.concatenate((
+            np.ravel_multi_index((ys, xs, directions), self.health.shape),
+            np.ravel_multi_index(((ys+DY[directions])%self.Y, (xs+DX[directions])%self.X, (directions+2)%4), self.health.shape))), 0)
+        return healthy
+
+    # kills all links of the given routers, and the links pointing at them
+    def injectRouterFaults(self, xs, ys):
+        xs, ys = np.asarray(xs, dtype=int), np.asarray(ys, dtype=int)
+        flat = []
+        for link in range(4):
+            flat.append(np.ravel_multi_index((ys, xs, np.full_like(xs, link)), self.health.shape))
+            flat.append(np.ravel_multi_index(((ys+DY[link])%self.Y, (xs+DX[link])%self.X, np.full_like(xs, (link+2)%4)), self.health.shape))
+        self.setLinksHealth(np.concatenate(flat), 0)
+
+    # injects 'n' faults on distinct, randomly chosen healthy links
+    # links are numbered as in topology.injectRandomLinkFaults(), two (right and up) per router
+    def injectRandomLinkFaults(self, n, rng = None):
+        if n > 2*self.X*self.Y:
+            raise ValueError("Too many elements. No faults injected.")
+        rng = np.random.default_rng(rng)
+        candidates = np.flatnonzero(self.healthyLinks()[:, :, :2])
+        if n > len(candidates):
+            print("Couldn't inject " + str(n - len(candidates)) + " faults")
+            n = len(candidates)
+        choice = rng.choice(candidates, n, replace=False)
+        ys, rest = np.divmod(choice, 2*self.X)
+        xs, directions = np.divmod(rest, 2)
+        self.injectLinkFaults(xs, ys, directions)
+        return [((int(x), int(y)), int(d)) for x, y, d in zip(xs, ys, directions)]
+
+    # kills 'n' distinct, randomly chosen routers
+    def injectRandomRouterFaults(self, n, rng = None):
+        if n > self.X*self.Y:
+            raise ValueError("Too many elements. No faults injected.")
+        rng = np.random.default_rng(rng)
+        choice = rng.choice(self.X*self.Y, n, replace=False)
+        ys, xs = np.divmod(choice, self.X)
+        self.injectRouterFaults(xs, ys)
+        return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+
+############
+# Array Mesh
+############
+class ArrayMesh(ArrayTopology, topology.Mesh):
+    def __init__(self, x, y, connectAllLinks = False, threshold = 0.03, arrays = None):
+        ArrayTopology.__init__(self, x, y, connectAllLinks, threshold, arrays)
+
+    # initialises the topology with all healthy links, except the ones on the border
+    def initialise(self):
+        health = np.ones_like(self.health)
+        health[:, -1, 0] = 0
+        health[0, :, 1] = 0
+        health[:, 0, 2] = 0
+        health[-1, :, 3] = 0
+        self.setHealth(health)
+
+
+#############
+# Array Torus
+#############
+class ArrayTorus(ArrayTopology, topology.Torus):
+    def __init__(self, x, y, connectAllLinks = True, threshold = 0.03, arrays = None):
+        ArrayTopology.__init__(self, x, y, connectAllLinks, threshold, arrays)
+
+    # initialises the topology with all healthy links
+    def initialise(self):
+        self.setHealth(1)
@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import search
+
+'''
+Batch routing
+
+findPaths() routes a whole list of (source, destination) position pairs against one fault
+snapshot of a topology and returns the (path, pathCost) results in the order of the input.
+
+Identical pairs are routed only once, every copy gets a result of its own. Pairs are grouped
+by source and chunks are cut between groups, so all queries of one source land on the same
+worker. The search heuristic depends on the destination, so the search itself can't be shared
+between different destinations of one source.
+
+With more than one worker the pairs are spread over a process pool. The topology is sent to
+every worker once, when the worker starts, and is only read from there on; weights are not
+modified the way topology.findPath(pathWeight, linkWeight) does. Starting a pool costs far more
+than a few searches, so fewer than 'parallelThreshold' distinct pairs are routed in-process.
+'''
+
+# topology snapshot and routing function of a worker process
+_snapshot = None
+_routing = None
+
+def _initWorker(topology, routing):
+    global _snapshot, _routing
+    _snapshot, _routing = topology, routing
+
+def _routeChunk(pairs, topology = None, routing = None):
+    topology = _snapshot if topology is None else topology
+    routing = _routing if routing is None else routing
+    return [routing(topology, topology.routerAt(*source), topology.routerAt(*destination))
+        for source, destination in pairs]
+
+# route all pairs, returning a list of (path, pathCost) in input order
+# 'routing' has the signature of findPath(), e.g. one of the algorithms in routing.py
+def findPaths(topology, pairs, workers = None, chunksPerWorker = 4, routing = search.findPath, parallelThreshold = 256):
+    pairs = [(tuple(source), tuple(destination)) for source, destination in pairs]
+    # drop duplicates and group the rest by source
+    groups = {}
+    for source, destination in pairs:
+        groups.setdefault(source, {})[destination] = None
+    unique = [(source, destination) for source in groups for destination in groups[source]]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if len(unique) < parallelThreshold:
+        workers = 1
+    workers = max(1, min(workers, len(groups)))
+
+    if workers == 1:
+        routed = _routeChunk(unique, topology, routing)
+    else:
+        # whole source groups per chunk, a chunk closed once it holds 'size' pairs
+        size = -(-len(unique) // (workers*chunksPerWorker))
+        chunks = [[]]
+        for source in groups:
+            if len(chunks[-1]) >= size:
+                chunks.append([])
+            chunks[-1].extend((source, destination) for destination in groups[source])
+        routed = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(topology, routing)) as pool:
+            for results in pool.map(_routeChunk, chunks):
+                routed.extend(results)
+    results = dict(zip(unique, routed))
+    # copies of a pair don't share the path list
+    return [(list(results[pair][0]), results[pair][1]) for pair in pairs]
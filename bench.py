@@ -0,0 +1,210 @@
+from __future__ import print_function
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+import topology
+
+'''
+Benchmarks
+
+Times the basic operations of the topology module over grid sizes and fault densities:
+* construct         Mesh/Torus construction and initialise()
+* injectLinks       injectRandomLinkFaults() of 'density' times the number of links
+* injectRouters     injectRandomRouterFaults() of 'density' times the number of routers
+* findPath          findPath() on 'pairs' random pairs, with 'density' of the links faulty, on a
+                    topology whose NeighbourIndex is already built
+* clearPathInfo     clearPathInfo() on a topology that has answered a findPath() query
+* printTopologyMap  printTopologyMap() into a discarded stream, with 'density' of the links faulty
+
+Every case is prepared afresh (topology built, faults injected) before each of its 'repeat'
+timed runs, and run once more under tracemalloc for its peak memory; only the operation itself
+is measured. Every run of a case is seeded the same, so all of them, and every run of the suite,
+measure the same work.
+
+    python bench.py --sizes 8 32 128 --densities 0 0.05 --output results.json
+    python bench.py --baseline results.json
+
+With --baseline, cases whose median got slower than 'threshold' times the baseline's median are
+listed as regressions (unless it is by less than 'minimum' seconds) and the exit status is 1.
+'''
+
+TOPOLOGIES = {"Mesh": topology.Mesh, "Torus": topology.Torus}
+
+# discards everything written to it, stands in for stdout while printing maps
+class NullStream:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+def build(kind, size, density, rng):
+    topo = kind(size, size)
+    topo.initialise()
+    links = int(density*2*size*size)
+    if links:
+        topology.injectRandomLinkFaults(topo, links, rng=rng)
+    return topo
+
+# every case prepares a topology and returns the operation to time, without arguments
+
+def prepareConstruct(kind, size, density, rng, pairs):
+    def run():
+        kind(size, size).initialise()
+    return run
+
+def prepareInjectLinks(kind, size, density, rng, pairs):
+    topo = build(kind, size, 0, rng)
+    return lambda: topology.injectRandomLinkFaults(topo, int(density*2*size*size), rng=rng)
+
+def prepareInjectRouters(kind, size, density, rng, pairs):
+    topo = build(kind, size, 0, rng)
+    return lambda: topology.injectRandomRouterFaults(topo, int(density*size*size), rng=rng)
+
+def prepareFindPath(kind, size, density, rng, pairs):
+    topo = build(kind, size, density, rng)
+    routers = [router for row in topo.routers for router in row if not router.isIsolated()]
+    queries = [(rng.choice(routers), rng.choice(routers)) for pair in range(pairs)]
+    # the NeighbourIndex is built on the first getActiveNeighbours(), build it here so only the searches are timed
+    topo.getActiveNeighbours((0, 0))
+    def run():
+        for source, destination in queries:
+            topology.findPath(topo, source, destination)
+    return run
+
+def prepareClearPathInfo(kind, size, density, rng, pairs):
+    topo = build(kind, size, 0, rng)
+    # a used topology, one query across it has been answered
+    topology.findPath(topo, topo.routerAt(0, 0), topo.routerAt(size-1, size-1))
+    return topo.clearPathInfo
+
+def preparePrintTopologyMap(kind, size, density, rng, pairs):
+    topo = build(kind, size, density, rng)
+    return lambda: topology.printTopologyMap(topo, True)
+
+# name -> (prepare function, whether it depends on the fault density)
+CASES = {
+    "construct": (prepareConstruct, False),
+    "injectLinks": (prepareInjectLinks, True),
+    "injectRouters": (prepareInjectRouters, True),
+    "findPath": (prepareFindPath, True),
+    "clearPathInfo": (prepareClearPathInfo, False),
+    "printTopologyMap": (preparePrintTopologyMap, True),
+}
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values)-1, int(p*len(values)))]
+
+# times one case, returning its result entry
+def measure(name, topologyName, size, density, repeat, pairs, seed):
+    prepare = CASES[name][0]
+    kind = TOPOLOGIES[topologyName]
+    key = "{0}-{1}-{2}-{3}-{4}".format(seed, name, topologyName, size, density)
+    # printed maps would drown the report
+    stdout, sys.stdout = sys.stdout, NullStream()
+    try:
+        times = []
+        # every run is seeded the same, so every run times the same faults and queries
+        for run in range(repeat):
+            operation = prepare(kind, size, density, random.Random(key), pairs)
+            start = time.perf_counter()
+            operation()
+            times.append(time.perf_counter() - start)
+        operation = prepare(kind, size, density, random.Random(key), pairs)
+        tracemalloc.start()
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        sys.stdout = stdout
+    return {
+        "name": name,
+        "topology": topologyName,
+        "size": size,
+        "density": density,
+        "runs": repeat,
+        "median": percentile(times, 0.5),
+        "p95": percentile(times, 0.95),
+        "peakMemory": peak,
+    }
+
+# runs every combination of the given cases, topologies, sizes and densities
+def runSuite(cases, topologies, sizes, densities, repeat = 5, pairs = 10, seed = 0, log = None):
+    results = []
+    for name in cases:
+        for topologyName in topologies:
+            for size in sizes:
+                for density in (densities if CASES[name][1] else [0]):
+                    result = measure(name, topologyName, size, density, repeat, pairs, seed)
+                    if log:
+                        log(result)
+                    results.append(result)
+    return results
+
+def key(result):
+    return (result["name"], result["topology"], result["size"], result["density"])
+
+# returns (result, baseline result, ratio) of every case that got slower than 'threshold' times the
+# baseline, and by more than 'minimum' seconds so that timer noise on tiny cases isn't flagged
+def regressions(results, baseline, threshold = 1.25, minimum = 1e-4):
+    previous = dict((key(result), result) for result in baseline)
+    slower = []
+    for result in results:
+        old = previous.get(key(result))
+        if old and old["median"] > 0:
+            ratio = result["median"]/old["median"]
+            if ratio > threshold and result["median"] - old["median"] > minimum:
+                slower.append((result, old, ratio))
+    return slower
+
+def describe(result):
+    return "{0:<17} {1:<6} {2:>5}x{2:<5} density {3:<5} median {4:10.6f}s  p95 {5:10.6f}s  peak {6:8.1f} kB".format(
+        result["name"], result["topology"], result["size"], result["density"], result["median"], result["p95"],
+        result["peakMemory"]/1024.0)
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the topology module")
+    parser.add_argument("--cases", nargs = "+", default = list(CASES), choices = list(CASES))
+    parser.add_argument("--topologies", nargs = "+", default = list(TOPOLOGIES), choices = list(TOPOLOGIES))
+    parser.add_argument("--sizes", nargs = "+", type = int, default = [8, 32, 128, 1024])
+    parser.add_argument("--densities", nargs = "+", type = float, default = [0.01, 0.05, 0.2])
+    parser.add_argument("--repeat", type = int, default = 5)
+    parser.add_argument("--pairs", type = int, default = 10, help = "findPath queries per run")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--output", help = "write the results to this JSON file")
+    parser.add_argument("--baseline", help = "compare against the results in this JSON file")
+    parser.add_argument("--threshold", type = float, default = 1.25, help = "slowdown ratio flagged as a regression")
+    parser.add_argument("--minimum", type = float, default = 1e-4, help = "slowdowns of fewer seconds are ignored")
+    args = parser.parse_args(arguments)
+
+    results = runSuite(args.cases, args.topologies, args.sizes, args.densities, args.repeat, args.pairs, args.seed,
+        log = lambda result: print(describe(result)))
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "pairs": args.pairs,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent = 2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            slower = regressions(results, json.load(baseline)["results"], args.threshold, args.minimum)
+        for result, old, ratio in slower:
+            print("REGRESSION {0}  {1:.2f}x slower than {2:.6f}s".format(describe(result), ratio, old["median"]))
+        if slower:
+            return 1
+        print("No regressions against " + args.baseline)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import os
+import math
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import topology
+import search
+
+'''
+Monte Carlo fault-tolerance campaigns
+
+runCampaign() measures how a topology holds up as faults pile up. For every fault count it runs
+independent trials; a trial builds a fresh topology with 'factory', injects faults with
+'faultModel' and routes 'pairsPerTrial' random router pairs with findPath. Per trial it records
+* reachability      fraction of pairs that still have a path
+* stretch           average hop count of the found paths over the fault-free shortest hop count
+* disconnected      number of pairs without a path
+
+Trials run in rounds of 'roundSize' spread over a process pool. A fault count stops taking new
+rounds once the confidence interval of the mean reachability is narrower than +-'tolerance'
+(after 'minTrials', a round ending there), or after 'maxTrials'.
+
+Trial 'i' of fault count 'n' draws all of its random numbers from its own generator seeded with
+(seed, n, i), and the stopping rule only looks at whole rounds, so results don't depend on the
+number of workers.
+'''
+
+# z values of two-sided confidence levels
+Z = {0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+# picklable topology factory, builds and initialises topologyClass(*args)
+class TopologyFactory:
+    def __init__(self, topologyClass, *args):
+        self.topologyClass, self.args = topologyClass, args
+
+    def __call__(self):
+        topo = self.topologyClass(*self.args)
+        topo.initialise()
+        return topo
+
+# fault models: inject 'n' faults drawing random numbers from 'rng' (a random.Random)
+def linkFaults(topo, n, rng):
+    topology.injectRandomLinkFaults(topo, n, rng=rng)
+
+def routerFaults(topo, n, rng):
+    topology.injectRandomRouterFaults(topo, n, rng=rng)
+
+# hop count of the shortest path between two positions, None if there is none
+def hopDistance(topo, source, destination):
+    hops = {source: 0}
+    queue = deque([source])
+    while queue:
+        pos = queue.popleft()
+        if pos == destination:
+            return hops[pos]
+        for neighbour in topo.getActiveNeighbours(pos):
+            neighbour = neighbour.getPosition()
+            if neighbour not in hops:
+                hops[neighbour] = hops[pos] + 1
+                queue.append(neighbour)
+    return None
+
+# runs one trial, returning (reachability, stretch, disconnected)
+def runTrial(factory, faultModel, faults, seed, trial, pairsPerTrial):
+    rng = random.Random("{0}-{1}-{2}".format(seed, faults, trial))
+    healthy = factory()
+    topo = factory()
+    faultModel(topo, faults, rng)
+    X, Y = topo.getDimensions()
+    reached, stretch = 0, []
+    for pair in range(pairsPerTrial):
+        source = (rng.randrange(X), rng.randrange(Y))
+        destination = (rng.randrange(X), rng.randrange(Y))
+        path, pathCost = search.findPath(topo, topo.routerAt(*source), topo.routerAt(*destination))
+        if path:
+            reached = reached + 1
+            shortest = hopDistance(healthy, source, destination)
+            if shortest:
+                stretch.append(float(len(path)-1)/shortest)
+    return (float(reached)/pairsPerTrial, sum(stretch)/len(stretch) if stretch else float("nan"),
+        pairsPerTrial - reached)
+
+def runTrialArgs(args):
+    return runTrial(*args)
+
+def summarise(values):
+    values = [value for value in values if not math.isnan(value)]
+    if not values:
+        return float("nan"), float("nan")
+    mean = sum(values)/len(values)
+    if len(values) < 2:
+        return mean, float("inf")
+    deviation = math.sqrt(sum((value - mean)**2 for value in values)/(len(values)-1))
+    return mean, deviation/math.sqrt(len(values))
+
+# runs the campaign, returning one result dictionary per fault count
+def runCampaign(factory, faultModel, faultCounts, seed, pairsPerTrial = 100, workers = None,
+        confidence = 0.95, tolerance = 0.01, minTrials = 10, maxTrials = 1000, roundSize = 16):
+    z = Z[confidence]
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    results = []
+    try:
+        for faults in faultCounts:
+            trials = []
+            while len(trials) < maxTrials:
+                count = min(roundSize, maxTrials - len(trials))
+                # the round that reaches 'minTrials' ends there, so a settled count stops at minTrials
+                if len(trials) < minTrials:
+                    count = min(count, minTrials - len(trials))
+                args = [(factory, faultModel, faults, seed, trial, pairsPerTrial)
+                    for trial in range(len(trials), len(trials)+count)]
+                trials.extend(pool.map(runTrialArgs, args) if pool else map(runTrialArgs, args))
+                mean, error = summarise([trial[0] for trial in trials])
+                if len(trials) >= minTrials and z*error <= tolerance:
+                    break
+            reachability, error = summarise([trial[0] for trial in trials])
+            stretch, stretchError = summarise([trial[1] for trial in trials])
+            disconnected, disconnectedError = summarise([trial[2] for trial in trials])
+            results.append({
+                "faults": faults,
+                "trials": len(trials),
+                "reachability": reachability,
+                "reachabilityInterval": z*error,
+                "stretch": stretch,
+                "stretchInterval": z*stretchError,
+                "disconnected": disconnected,
+                "disconnectedInterval": z*disconnectedError,
+            })
+    finally:
+        if pool:
+            pool.shutdown()
+    return results
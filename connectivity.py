@@ -0,0 +1,170 @@
+from collections import Counter, deque
+from itertools import count
+import topology
+
+'''
+Connectivity index
+
+ConnectivityIndex labels every router of a topology with the connected component it belongs to,
+in one union-find pass over the healthy links, so isReachable(a, b) and componentOf(pos) are plain
+lookups. Two routers count as linked if either of them has a healthy link to the other, so a pair
+the index calls unreachable really is, and findPath() rejects it without searching.
+
+The index observes the topology and keeps the labels up to date:
+* a link going down starts a breadth-first search from both of its ends, one step at a time from
+  each side; if they meet nothing changed, otherwise the side that ran out is the new component
+* a link coming up merges two components by relabelling the smaller one
+'''
+
+class ConnectivityIndex(topology.Observer):
+    def __init__(self, topo, attach = True):
+        self.topology = topo
+        self.X, self.Y = topo.getDimensions()
+        self.build()
+        self.ids = count(self.X*self.Y)
+        topology.addObserver(topo, self)
+        # findPath() asks the index before searching
+        if attach:
+            topo.connectivity = self
+
+    # stops observing the topology
+    def close(self):
+        topology.removeObserver(self.topology, self)
+        if getattr(self.topology, "connectivity", None) is self:
+            del self.topology.connectivity
+
+    # labels all routers in one union-find pass
+    def build(self):
+        parents = list(range(self.X*self.Y))
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+        for i, j in self.links():
+            i, j = find(i), find(j)
+            if i != j:
+                parents[max(i, j)] = min(i, j)
+        self.labels = [find(i) for i in range(self.X*self.Y)]
+        self.sizes = Counter(self.labels)
+
+    # yields (router, neighbour) index pairs of every healthy link
+    def links(self):
+        if hasattr(self.topology, "healthyLinks"):
+            # array topologies hand them over all at once
+            import numpy as np
+            healthy = self.topology.healthyLinks()
+            for direction, (dx, dy) in enumerate(((1, 0), (0, -1), (-1, 0), (0, 1))):
+                ys, xs = np.nonzero(healthy[:, :, direction])
+                neighbours = ((ys+dy) % self.Y)*self.X + (xs+dx) % self.X
+                for i, j in zip((ys*self.X + xs).tolist(), neighbours.tolist()):
+                    yield i, j
+        else:
+            for y in range(self.Y):
+                for x in range(self.X):
+                    for direction in self.healthyDirections((x, y)):
+                        yield y*self.X + x, self.index(topology.neighbourPosition(self.topology, (x, y), direction))
+
+    def index(self, pos):
+        return pos[1]*self.X + pos[0]
+
+    def position(self, index):
+        return (index % self.X, index // self.X)
+
+    def healthyDirections(self, pos):
+        router = self.topology.routerAt(*pos)
+        return [direction for direction in range(4) if router.linkHealth[direction] > router.threshold]
+
+    # yields the routers linked to 'pos' by a healthy link at either end
+    def neighbours(self, pos):
+        healthy = self.healthyDirections(pos)
+        for direction in range(4):
+            neighbour = topology.neighbourPosition(self.topology, pos, direction)
+            if neighbour == pos:
+                continue
+            if direction in healthy or self.isLinked(neighbour, (direction+2)%4):
+                yield neighbour
+
+    def isLinked(self, pos, direction):
+        router = self.topology.routerAt(*pos)
+        return router.linkHealth[direction] > router.threshold
+
+    # returns the label of the component holding the router at 'pos'
+    def componentOf(self, pos):
+        return self.labels[self.index(pos)]
+
+    # returns the number of routers in the component holding 'pos'
+    def componentSize(self, pos):
+        return self.sizes[self.componentOf(pos)]
+
+    # checks whether a path can exist between two positions
+    def isReachable(self, source, destination):
+        return self.labels[self.index(source)] == self.labels[self.index(destination)]
+
+    def componentCount(self):
+        return len(self.sizes)
+
+    # returns {component size: number of components of that size}
+    def sizeHistogram(self):
+        return dict(Counter(self.sizes.values()))
+
+    # gives every router reachable from 'pos' and labelled 'old' the label 'new'
+    def relabel(self, pos, old, new):
+        queue = deque([pos])
+        self.labels[self.index(pos)] = new
+        moved = 1
+        while queue:
+            current = queue.popleft()
+            for neighbour in self.neighbours(current):
+                if self.labels[self.index(neighbour)] == old:
+                    self.labels[self.index(neighbour)] = new
+                    moved = moved + 1
+                    queue.append(neighbour)
+        self.sizes[old] = self.sizes[old] - moved
+        if self.sizes[old] == 0:
+            del self.sizes[old]
+        self.sizes[new] = self.sizes[new] + moved
+
+    # checks whether 'a' and 'b' are still connected; returns None if so, otherwise the routers
+    # of whichever side was fully explored first
+    def split(self, a, b):
+        seen = [set([a]), set([b])]
+        queues = [deque([a]), deque([b])]
+        while True:
+            for side in (0, 1):
+                if not queues[side]:
+                    return seen[side]
+                current = queues[side].popleft()
+                for neighbour in self.neighbours(current):
+                    if neighbour in seen[1-side]:
+                        return None
+                    if neighbour not in seen[side]:
+                        seen[side].add(neighbour)
+                        queues[side].append(neighbour)
+
+    def linkHealthChanged(self, router, direction, old, new):
+        threshold = router.threshold
+        if((old > threshold) == (new > threshold)):
+            return
+        pos = router.getPosition()
+        neighbour = topology.neighbourPosition(self.topology, pos, direction)
+        if neighbour == pos:
+            return
+        label, neighbourLabel = self.componentOf(pos), self.componentOf(neighbour)
+        if new > threshold:
+            if label != neighbourLabel:
+                if self.sizes[label] < self.sizes[neighbourLabel]:
+                    self.relabel(pos, label, neighbourLabel)
+                else:
+                    self.relabel(neighbour, neighbourLabel, label)
+        elif label == neighbourLabel and not self.isLinked(neighbour, (direction+2)%4):
+            side = self.split(pos, neighbour)
+            if side is not None:
+                new = next(self.ids)
+                for member in side:
+                    old = self.labels[self.index(member)]
+                    self.sizes[old] = self.sizes[old] - 1
+                    if self.sizes[old] == 0:
+                        del self.sizes[old]
+                    self.labels[self.index(member)] = new
+                self.sizes[new] = len(side)
@@ -0,0 +1,170 @@
+import heapq
+import topology
+import search
+
+'''
+Incremental route repair
+
+DynamicRoutes keeps, for a set of tracked destinations, the distance of every router to the
+destination and the link it should forward on (its next hop). Distances use search.edgeCost(),
+which is the hop count when all weights are 1.
+
+The tables are built once with a reverse Dijkstra from each destination. After that the object
+observes the topology, and every link that fails, recovers or changes weight is repaired in place:
+* a link that gets worse only matters to routers whose route runs over it; that subtree of the
+  next-hop tree is cut loose and re-attached with a Dijkstra restricted to it
+* a link that gets better lowers distances outward from its router, stopping where they don't improve
+Either way the work is proportional to the routers whose routes change, not the size of the grid.
+'lastRepair' holds the number of routers touched by the most recent change.
+'''
+
+INF = float("inf")
+
+class DynamicRoutes(topology.Observer):
+    def __init__(self, topo, destinations = ()):
+        self.topology = topo
+        self.distances = {}     # destination -> {position: distance}
+        self.nextHops = {}      # destination -> {position: direction}
+        self.lastRepair = 0
+        for destination in destinations:
+            self.track(destination)
+        topology.addObserver(topo, self)
+
+    # starts maintaining routes towards the router at position 'destination'
+    def track(self, destination):
+        destination = tuple(destination)
+        self.distances[destination] = {destination: 0}
+        self.nextHops[destination] = {}
+        self.propagate(destination, [(0, destination)])
+
+    def untrack(self, destination):
+        del self.distances[tuple(destination)]
+        del self.nextHops[tuple(destination)]
+
+    # stops observing the topology
+    def close(self):
+        topology.removeObserver(self.topology, self)
+
+    # returns the distance from 'pos' to 'destination', inf if it can't be reached
+    def distance(self, pos, destination):
+        return self.distances[tuple(destination)].get(tuple(pos), INF)
+
+    # returns the link to forward on at 'pos' towards 'destination', None if there is none
+    def nextHop(self, pos, destination):
+        return self.nextHops[tuple(destination)].get(tuple(pos))
+
+    # follows the next hops from 'source', returning (path, pathCost) like findPath()
+    def path(self, source, destination):
+        source, destination = tuple(source), tuple(destination)
+        distances, nextHops = self.distances[destination], self.nextHops[destination]
+        if source not in distances:
+            return ([], "inf")
+        path = [source]
+        while path[-1] != destination:
+            path.append(topology.neighbourPosition(self.topology, path[-1], nextHops[path[-1]]))
+        return (path, distances[source])
+
+    # checks whether link 'direction' of the router at 'pos' can be used
+    def isHealthy(self, pos, direction):
+        router = self.topology.routerAt(*pos)
+        return router.linkHealth[direction] > router.threshold
+
+    # cost of the link from 'pos' along 'direction', inf if the link is down
+    def linkCost(self, pos, direction):
+        if not self.isHealthy(pos, direction):
+            return INF
+        neighbour = topology.neighbourPosition(self.topology, pos, direction)
+        return search.edgeCost(self.topology.routerAt(*pos), direction, self.topology.routerAt(*neighbour))
+
+    # yields (predecessor, direction) for every router with a link into 'pos'
+    def predecessors(self, pos):
+        for direction in range(4):
+            predecessor = topology.neighbourPosition(self.topology, pos, direction)
+            back = (direction+2)%4
+            if predecessor != pos and self.isHealthy(predecessor, back):
+                yield predecessor, back
+
+    # runs a reverse Dijkstra from the (distance, position) entries in 'heap', only lowering distances
+    def propagate(self, destination, heap, within = None):
+        distances, nextHops = self.distances[destination], self.nextHops[destination]
+        heapq.heapify(heap)
+        touched = 0
+        while heap:
+            dist, pos = heapq.heappop(heap)
+            if dist > distances.get(pos, INF):
+                continue
+            touched = touched + 1
+            for predecessor, direction in self.predecessors(pos):
+                if within is not None and predecessor not in within:
+                    continue
+                candidate = dist + self.linkCost(predecessor, direction)
+                if candidate < distances.get(predecessor, INF):
+                    distances[predecessor] = candidate
+                    nextHops[predecessor] = direction
+                    heapq.heappush(heap, (candidate, predecessor))
+        return touched
+
+    # re-routes 'pos' and every router routed through it, after its next hop got worse
+    def repair(self, destination, pos):
+        distances, nextHops = self.distances[destination], self.nextHops[destination]
+        # collect the subtree of routers whose route runs through 'pos'
+        affected = set([pos])
+        stack = [pos]
+        while stack:
+            current = stack.pop()
+            for predecessor, direction in self.predecessors(current):
+                if predecessor not in affected and nextHops.get(predecessor) == direction:
+                    affected.add(predecessor)
+                    stack.append(predecessor)
+        for current in affected:
+            del distances[current]
+            del nextHops[current]
+        # re-attach the subtree to the best router left outside of it
+        heap = []
+        for current in affected:
+            best, bestDirection = INF, None
+            for direction in range(4):
+                neighbour = topology.neighbourPosition(self.topology, current, direction)
+                if neighbour in distances:
+                    candidate = distances[neighbour] + self.linkCost(current, direction)
+                    if candidate < best:
+                        best, bestDirection = candidate, direction
+            if bestDirection is not None:
+                distances[current] = best
+                nextHops[current] = bestDirection
+                heap.append((best, current))
+        self.propagate(destination, heap, affected)
+        return len(affected)
+
+    # brings all tracked destinations up to date after link 'direction' of 'pos' changed cost
+    # returns the number of routers touched
+    def linkChanged(self, pos, direction):
+        neighbour = topology.neighbourPosition(self.topology, pos, direction)
+        cost = self.linkCost(pos, direction)
+        touched = 0
+        for destination in self.distances:
+            distances, nextHops = self.distances[destination], self.nextHops[destination]
+            if pos == destination:
+                continue
+            candidate = distances.get(neighbour, INF) + cost
+            if nextHops.get(pos) == direction and candidate > distances[pos]:
+                touched = touched + self.repair(destination, pos)
+            elif candidate < distances.get(pos, INF):
+                distances[pos] = candidate
+                nextHops[pos] = direction
+                touched = touched + self.propagate(destination, [(candidate, pos)])
+        return touched
+
+    def linkHealthChanged(self, router, direction, old, new):
+        if((old > router.threshold) != (new > router.threshold)):
+            self.lastRepair = self.linkChanged(router.getPosition(), direction)
+
+    def weightChanged(self, router, direction):
+        pos = router.getPosition()
+        if direction is not None:
+            self.lastRepair = self.linkChanged(pos, direction)
+        else:
+            # the router weight is part of the cost of every link into it
+            self.lastRepair = 0
+            for predecessor, back in list(self.predecessors(pos)):
+                self.lastRepair = self.lastRepair + self.linkChanged(predecessor, back)
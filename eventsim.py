@@ -0,0 +1,226 @@
+import heapq
+from collections import deque
+from itertools import count
+import search
+
+'''
+Event-driven packet simulator
+
+Packets move through the topology hop by hop, driven by a heap-ordered event queue.
+Every router gets bounded FIFO buffers (see Router.setBuffers()), one per input port and one
+for packets injected locally, with room counted in flits:
+* a packet may leave a buffer only when the next router's input buffer has room for all of its
+  flits; room is reserved when the packet is sent, which is what applies backpressure upstream
+* a link carries one flit per cycle, so a packet of 'size' flits keeps its output link busy for
+  'size' cycles and its tail arrives routerLatency + linkLatency + size - 1 cycles after it left
+* packets that can't enter the local buffer yet wait in an unbounded source queue; a packet can't
+  be larger than a buffer (inject() raises ValueError)
+* packets are delivered as soon as they arrive at their destination router
+
+Routes are picked when a packet is injected, with 'routing', which has the same signature and
+result as findPath() (search.findPath by default) and is asked once per (source, destination).
+The topology's faults at that time decide the route; packets without a route are dropped.
+Routes that may turn anywhere (findPath's can) are not deadlock free, so under heavy load some
+packets can get stuck for good; report() lists them as 'inFlight'.
+'''
+
+INJECT, FORWARD, ARRIVE = 0, 1, 2
+LOCAL = 4
+
+class Packet:
+    __slots__ = ('id', 'source', 'destination', 'size', 'created', 'route', 'hop')
+
+    def __init__(self, id, source, destination, size, created):
+        self.id = id
+        self.source, self.destination = source, destination
+        self.size = size
+        self.created = created
+        self.route = None   # (router index, output direction) of every hop
+        self.hop = 0
+
+
+class Simulator:
+    def __init__(self, topology, bufferDepth = 8, linkLatency = 1, routerLatency = 1, routing = search.findPath):
+        self.topology = topology
+        self.X, self.Y = topology.getDimensions()
+        self.bufferDepth = bufferDepth
+        self.linkLatency, self.routerLatency = linkLatency, routerLatency
+        self.routing = routing
+        # routers are fetched once, array topologies hand out a new view on every access
+        self.routers = [topology.routerAt(x, y) for y in range(self.Y) for x in range(self.X)]
+        for router in self.routers:
+            router.setBuffers(bufferDepth)
+        self.routes = {}
+        self.events = []
+        self.order = count()
+        self.ids = count()
+        self.now = 0
+        self.sourceQueues = [deque() for router in self.routers]
+        self.linkFree = [0]*(4*len(self.routers))   # cycle at which each output link is free again
+        self.pending = set()                        # input ports with a forward attempt scheduled or blocked
+        self.blocked = {}                           # full input port -> input ports waiting for room in it
+        # statistics
+        self.injected = self.delivered = self.dropped = self.hops = self.flits = 0
+        self.latencies = []
+        self.occupied = self.occupancyIntegral = self.lastChange = self.peakOccupancy = 0
+
+    # queues a packet of 'size' flits from position 'source' to 'destination' at cycle 'time'
+    # a packet larger than a buffer could never enter one, so it is refused
+    def inject(self, time, source, destination, size = 1):
+        if size > self.bufferDepth:
+            raise ValueError("Packet of " + str(size) + " flits doesn't fit in buffers of " + str(self.bufferDepth))
+        packet = Packet(next(self.ids), tuple(source), tuple(destination), size, time)
+        heapq.heappush(self.events, (time, next(self.order), INJECT, packet, None))
+        self.injected = self.injected + 1
+
+    # queues an iterable of (time, source, destination) or (time, source, destination, size)
+    def injectMany(self, packets):
+        for packet in packets:
+            self.inject(*packet)
+
+    # processes events until there are none left, or until cycle 'until'
+    def run(self, until = None):
+        events = self.events
+        while events:
+            if until is not None and events[0][0] > until:
+                break
+            time, order, kind, a, b = heapq.heappop(events)
+            self.now = time
+            if kind == FORWARD:
+                self.forward(a, b)
+            elif kind == ARRIVE:
+                self.arrive(a, b)
+            else:
+                self.start(a)
+        return self.report()
+
+    # returns the (router index, output direction) hops from 'source' to 'destination', None without a route
+    def route(self, source, destination):
+        key = (source, destination)
+        if key not in self.routes:
+            path, pathCost = self.routing(self.topology, self.topology.routerAt(*source), self.topology.routerAt(*destination))
+            hops = None
+            if path:
+                hops = []
+                for current, following in zip(path, path[1:]):
+                    direction = self.topology.getRelativeDirection(self.topology.routerAt(*current), self.topology.routerAt(*following))
+                    hops.append((following[1]*self.X + following[0], direction))
+            self.routes[key] = hops
+        return self.routes[key]
+
+    def occupy(self, flits):
+        self.occupancyIntegral = self.occupancyIntegral + self.occupied*(self.now - self.lastChange)
+        self.lastChange = self.now
+        self.occupied = self.occupied + flits
+
+    def schedule(self, time, kind, a, b):
+        heapq.heappush(self.events, (time, next(self.order), kind, a, b))
+
+    # schedules a forward attempt for the head of an input port, unless one is already due
+    def scheduleForward(self, index, port, time):
+        key = index*5 + port
+        if key not in self.pending:
+            self.pending.add(key)
+            self.schedule(time, FORWARD, index, port)
+
+    def start(self, packet):
+        packet.route = self.route(packet.source, packet.destination)
+        if packet.route is None:
+            self.dropped = self.dropped + 1
+        elif not packet.route:
+            self.deliver(packet)
+        else:
+            index = packet.source[1]*self.X + packet.source[0]
+            self.sourceQueues[index].append(packet)
+            self.admit(index)
+
+    # moves packets from the source queue into the local buffer while there is room
+    def admit(self, index):
+        router, queue = self.routers[index], self.sourceQueues[index]
+        while queue and router.canAccept(LOCAL, queue[0].size):
+            packet = queue.popleft()
+            router.reserveBuffer(LOCAL, packet.size)
+            router.pushPacket(LOCAL, packet)
+            self.occupy(packet.size)
+            self.peakOccupancy = max(self.peakOccupancy, router.bufferOccupancy[LOCAL])
+            self.scheduleForward(index, LOCAL, self.now)
+
+    # tries to send the packet at the head of an input port to the next router
+    def forward(self, index, port):
+        key = index*5 + port
+        self.pending.discard(key)
+        router = self.routers[index]
+        packet = router.peekPacket(port)
+        if packet is None:
+            return
+        nextIndex, direction = packet.route[packet.hop]
+        link = index*4 + direction
+        if self.linkFree[link] > self.now:
+            self.scheduleForward(index, port, self.linkFree[link])
+            return
+        nextRouter, nextPort = self.routers[nextIndex], (direction+2)%4
+        if not nextRouter.canAccept(nextPort, packet.size):
+            # backpressure, retried when the next router frees room in that buffer
+            self.pending.add(key)
+            self.blocked.setdefault(nextIndex*5 + nextPort, []).append((index, port))
+            return
+        # the packet's flits move from this buffer to the reserved room, total occupancy stays the same
+        nextRouter.reserveBuffer(nextPort, packet.size)
+        self.peakOccupancy = max(self.peakOccupancy, nextRouter.bufferOccupancy[nextPort])
+        router.popPacket(port)
+        self.linkFree[link] = self.now + packet.size
+        self.hops = self.hops + 1
+        self.schedule(self.now + self.routerLatency + self.linkLatency + packet.size - 1, ARRIVE, nextIndex, (nextPort, packet))
+        self.freed(index, port)
+        if router.buffers[port]:
+            self.scheduleForward(index, port, self.now)
+
+    def arrive(self, index, portPacket):
+        port, packet = portPacket
+        packet.hop = packet.hop + 1
+        router = self.routers[index]
+        if packet.hop == len(packet.route):
+            # ejected at the destination, its reserved room is released straight away
+            router.bufferOccupancy[port] = router.bufferOccupancy[port] - packet.size
+            self.occupy(-packet.size)
+            self.deliver(packet)
+            self.freed(index, port)
+        else:
+            router.pushPacket(port, packet)
+            self.scheduleForward(index, port, self.now)
+
+    # wakes up whoever waits for room in an input port
+    def freed(self, index, port):
+        if port == LOCAL:
+            self.admit(index)
+        for waiter, waiterPort in self.blocked.pop(index*5 + port, ()):
+            self.pending.discard(waiter*5 + waiterPort)
+            self.scheduleForward(waiter, waiterPort, self.now)
+
+    def deliver(self, packet):
+        self.delivered = self.delivered + 1
+        self.flits = self.flits + packet.size
+        self.latencies.append(self.now - packet.created)
+
+    # returns throughput, latency and buffer occupancy figures of the run so far
+    def report(self):
+        cycles = max(self.now, 1)
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(len(latencies)-1, int(p*len(latencies)))] if latencies else 0
+        self.occupy(0)
+        return {
+            "cycles": self.now,
+            "injected": self.injected,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "inFlight": self.injected - self.delivered - self.dropped,
+            "hops": self.hops,
+            "throughput": float(self.flits)/cycles/len(self.routers),   # flits per router per cycle
+            "latencyMean": float(sum(latencies))/len(latencies) if latencies else 0,
+            "latencyP50": percentile(0.5),
+            "latencyP99": percentile(0.99),
+            "latencyMax": latencies[-1] if latencies else 0,
+            "bufferOccupancyMean": float(self.occupancyIntegral)/cycles/len(self.routers),  # flits per router
+            "bufferOccupancyPeak": self.peakOccupancy,     # flits in the fullest buffer
+        }
@@ -0,0 +1,349 @@
+import numpy as np
+from router import Router
+import topology
+
+'''
+Generic graph topologies
+
+GraphTopology holds any network, with routers of any number of links, in compressed sparse row
+form instead of a grid (or the dense adjacency matrix of nodeMap.py). Routers are numbered
+0..N-1 and the links (ports) of router i are ports offsets[i] to offsets[i+1]-1:
+* offsets       (N+1)   first port of every router
+* targets       (E)     router at the other end of every port
+* reverse       (E)     port of that router leading back, -1 for one-way links
+* health        (E)     link health
+* linkWeights   (E)     link weights
+* weights       (N)     router weights
+A single threshold is shared by all routers. Port p of router i is its link direction p-offsets[i],
+so Router methods taking a direction work with a router's local port numbers.
+
+A router's position is the tuple (i,), so topo.routerAt(i) and topo.routers[i] hand out
+GraphRouter views of the arrays and findPath() runs unchanged. There are no coordinates to
+guide the search, so it expands routers in breadth-first order (scaled by router weights)
+and finds paths with the fewest hops.
+
+Topologies are built from an adjacency dict or list (fromAdjacency), from an edge list
+(fromEdges), or generated: fatTree(k) and butterfly(k, n) have 100k+ routers for k=74 and
+butterfly(4, 8). Faults go through the Router setters or the vectorized inject* methods, which
+the fault injectors of topology.py call too, with positions (i,) and local port numbers as
+directions. printTopologyMap()
+and showPath() draw graphs through writeMap(), as Graphviz DOT.
+'''
+
+###################################
+# Router backed by the graph arrays
+###################################
+class GraphRouter(Router):
+    def __init__(self, topology, index):
+        self.topology = topology
+        self.index = index
+        # search state is not kept in the arrays, search.py keeps it per query
+        self.cost = self.heuristic = 0
+        self.parent = None
+
+    # views of the same router compare equal, even though a new view is made on every access
+    def __eq__(self, other):
+        return isinstance(other, GraphRouter) and self.topology is other.topology and self.index == other.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.topology), self.index))
+
+    def __repr__(self):
+        return "GraphRouter({0})".format(self.topology.nameOf(self.index))
+
+    def ports(self):
+        return slice(self.topology.offsets[self.index], self.topology.offsets[self.index+1])
+
+    # the Router attributes map onto array elements
+    @property
+    def linkHealth(self):
+        return self.topology.health[self.ports()]
+
+    @linkHealth.setter
+    def linkHealth(self, linkHealthList):
+        self.topology.health[self.ports()] = linkHealthList
+
+    @property
+    def linkWeightList(self):
+        return self.topology.linkWeights[self.ports()]
+
+    @property
+    def weight(self):
+        return self.topology.weights[self.index]
+
+    @weight.setter
+    def weight(self, weight):
+        self.topology.weights[self.index] = weight
+
+    @property
+    def threshold(self):
+        return self.topology.threshold
+
+    @property
+    def observers(self):
+        return self.topology.observers
+
+    def getPosition(self):
+        return (self.index,)
+
+    def getHealthyLinksList(self):
+        return (self.linkHealth > self.topology.threshold).astype(int).tolist()
+
+    def isIsolated(self):
+        return len(self.topology.active[self.index]) == 0
+
+
+# routers[i], for code that indexes routers directly
+class GraphRouters:
+    def __init__(self, topology):
+        self.topology = topology
+
+    def __len__(self):
+        return self.topology.N
+
+    def __getitem__(self, i):
+        return GraphRouter(self.topology, range(self.topology.N)[i])
+
+    def __iter__(self):
+        for i in range(self.topology.N):
+            yield GraphRouter(self.topology, i)
+
+
+#################
+# Graph topology
+#################
+class GraphTopology(topology.Observer):
+    # 'offsets' and 'targets' are the CSR arrays, 'names' optional labels of the routers
+    def __init__(self, offsets, targets, names = None, threshold = 0.03):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.N = len(self.offsets) - 1
+        self.names = list(names) if names is not None else None
+        self.indices = dict((name, i) for i, name in enumerate(self.names)) if names is not None else None
+        self.threshold = threshold
+        self.sources = np.repeat(np.arange(self.N), np.diff(self.offsets))
+        self.reverse = reversePorts(self.sources, self.targets, self.N)
+        self.health = np.ones(len(self.targets), dtype=np.float32)
+        self.linkWeights = np.ones(len(self.targets))
+        self.weights = np.ones(self.N)
+        self.routers = GraphRouters(self)
+        # neighbours of every router and, behind its healthy links, its active neighbours
+        # (plain tuples, expanding a router in a search is a single lookup)
+        bounds = self.offsets.tolist()
+        targets = self.targets.tolist()
+        self.neighbours = [tuple(targets[bounds[i]:bounds[i+1]]) for i in range(self.N)]
+        self.active = list(self.neighbours)
+        # the topology keeps 'active' up to date as its own first observer
+        self.observers = [self]
+
+    # returns the number of routers
+    def getDimensions(self):
+        return (self.N,)
+
+    def routerAt(self, index):
+        return GraphRouter(self, index)
+
+    def nameOf(self, index):
+        return self.names[index] if self.names is not None else index
+
+    # returns the router number of a name given to fromAdjacency()
+    def indexOf(self, name):
+        return self.indices[name]
+
+    def getActiveNeighbours(self, pos):
+        return [GraphRouter(self, j) for j in self.active[pos[0]]]
+
+    # returns the port (local link number) of 'source' that leads to 'destination'
+    def getRelativeDirection(self, source, destination):
+        return self.neighbours[source.index].index(destination.index)
+
+    # returns the port of the router at the other end of port 'direction' of 'router' that leads back
+    def getReverseDirection(self, router, direction):
+        port = int(self.reverse[self.offsets[router.index] + direction])
+        return port - int(self.offsets[self.sources[port]])
+
+    # without coordinates every hop costs the same and nothing is known about the distance left
+    def heuristic(self, current, destination, direction):
+        return 1, 0
+
+    # search state is kept per query, there's nothing stored in the arrays to clear
+    def clearPathInfo(self):
+        return
+
+    def linkHealthChanged(self, router, direction, old, new):
+        i = router.index
+        start = self.offsets[i]
+        healthy = self.health[start:self.offsets[i+1]] > self.threshold
+        self.active[i] = tuple(j for j, ok in zip(self.neighbours[i], healthy.tolist()) if ok)
+
+    # returns a boolean array of the healthy ports
+    def healthyLinks(self):
+        return self.health > self.threshold
+
+    # returns the number of healthy links of every router
+    def healthyLinksCount(self):
+        return np.add.reduceat(self.healthyLinks().astype(np.int64), self.offsets[:-1]) if len(self.targets) else np.zeros(self.N, dtype=np.int64)
+
+    # sets the ports at the given indices to 'value', telling observers about every change
+    # the ports change one at a time, each observer hearing about a port before the next one changes
+    def setLinksHealth(self, ports, value):
+        ports = np.unique(ports)
+        ports = ports[self.health[ports] != value]
+        for port in ports.tolist():
+            old = float(self.health[port])
+            self.health[port] = value
+            i = int(self.sources[port])
+            router = GraphRouter(self, i)
+            for observer in self.observers:
+                observer.linkHealthChanged(router, port - int(self.offsets[i]), old, float(self.health[port]))
+
+    # returns the number of the router at position 'pos', (i,)
+    def routerIndex(self, pos):
+        if(len(pos) != 1 or not 0 <= pos[0] < self.N):
+            raise IndexError("Index out of range for given topology")
+        return int(pos[0])
+
+    # returns the port number of link 'direction' of the router at 'pos'
+    def port(self, pos, direction):
+        i = self.routerIndex(pos)
+        if(not 0 <= direction < self.offsets[i+1] - self.offsets[i]):
+            raise IndexError("Index out of range for given topology")
+        return int(self.offsets[i]) + direction
+
+    # kills the given ports and the ports leading back over the same links
+    # returns the number of ports that were healthy
+    def injectLinkFaults(self, ports):
+        ports = np.asarray(ports, dtype=np.int64)
+        healthy = np.count_nonzero(self.health[ports] > self.threshold)
+        back = self.reverse[ports]
+        self.setLinksHealth(np.concatenate((ports, back[back >= 0])), 0)
+        return healthy
+
+    # kills all links of the given routers, and the links pointing at them
+    def injectRouterFaults(self, routers):
+        routers = np.asarray(routers, dtype=np.int64)
+        ports = np.concatenate([np.arange(self.offsets[i], self.offsets[i+1]) for i in routers.tolist()] + [np.zeros(0, dtype=np.int64)])
+        self.injectLinkFaults(ports)
+
+    # injects 'n' faults on distinct, randomly chosen healthy links, returning them as (router, port)
+    # each two-way link is counted once, by its port with the lower number
+    def injectRandomLinkFaults(self, n, rng = None):
+        rng = np.random.default_rng(rng)
+        ports = np.arange(len(self.targets))
+        candidates = np.flatnonzero(self.healthyLinks() & ((self.reverse < 0) | (ports < self.reverse)))
+        if n > len(candidates):
+            print("Couldn't inject " + str(n - len(candidates)) + " faults")
+            n = len(candidates)
+        choice = rng.choice(candidates, n, replace=False)
+        self.injectLinkFaults(choice)
+        return [(int(self.sources[port]), int(port - self.offsets[self.sources[port]])) for port in choice]
+
+    # kills 'n' distinct, randomly chosen routers
+    def injectRandomRouterFaults(self, n, rng = None):
+        if n > self.N:
+            raise ValueError("Too many elements. No faults injected.")
+        rng = np.random.default_rng(rng)
+        choice = rng.choice(self.N, n, replace=False)
+        self.injectRouterFaults(choice)
+        return choice.tolist()
+
+    # writes the graph in Graphviz DOT format, faulty links dashed (red with 'colour') and 'path' green
+    def writeMap(self, stream, path = (), colour = False):
+        onPath = set(pos[0] for pos in path)
+        pathLinks = set()
+        for current, following in zip(path, path[1:]):
+            pathLinks.add((min(current[0], following[0]), max(current[0], following[0])))
+        healthy = self.healthyLinks()
+        stream.write("graph topology {\n")
+        for i in range(self.N):
+            attributes = ' [color="green"]' if i in onPath else ""
+            stream.write('  "{0}"{1};\n'.format(self.nameOf(i), attributes))
+        for port in range(len(self.targets)):
+            i, j = int(self.sources[port]), int(self.targets[port])
+            back = int(self.reverse[port])
+            # two-way links are written once, from their lower port
+            if back >= 0 and back < port:
+                continue
+            if (min(i, j), max(i, j)) in pathLinks:
+                attributes = ' [color="green"]'
+            elif healthy[port] and (back < 0 or healthy[back]):
+                attributes = ""
+            else:
+                attributes = ' [style="dashed", color="red"]' if colour else ' [style="dashed"]'
+            stream.write('  "{0}" -- "{1}"{2};\n'.format(self.nameOf(i), self.nameOf(j), attributes))
+        stream.write("}\n")
+
+
+# returns the port leading back over the same link for every port, -1 if there is none
+def reversePorts(sources, targets, N):
+    keys = sources*N + targets
+    order = np.argsort(keys, kind="stable")
+    wanted = targets*N + sources
+    found = np.searchsorted(keys[order], wanted)
+    found = np.minimum(found, len(keys) - 1) if len(keys) else found
+    reverse = np.full(len(keys), -1, dtype=np.int64)
+    if len(keys):
+        match = keys[order][found] == wanted
+        reverse[match] = order[found[match]]
+    return reverse
+
+# builds a topology from {name: [neighbour names]} or a list of neighbour lists
+# links are taken in the order listed, so list them right, up, left, down to mimic Router
+def fromAdjacency(adjacency, threshold = 0.03):
+    if isinstance(adjacency, dict):
+        names = list(adjacency)
+        indices = dict((name, i) for i, name in enumerate(names))
+        lists = [[indices[neighbour] for neighbour in adjacency[name]] for name in names]
+    else:
+        names = None
+        lists = [list(neighbours) for neighbours in adjacency]
+    offsets = np.cumsum([0] + [len(neighbours) for neighbours in lists])
+    targets = np.array([j for neighbours in lists for j in neighbours], dtype=np.int64)
+    return GraphTopology(offsets, targets, names, threshold)
+
+# builds a topology of N routers from (router, router) links, both ways unless 'directed'
+def fromEdges(edges, N = None, directed = False, threshold = 0.03):
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources, targets = edges[:, 0], edges[:, 1]
+    if not directed:
+        sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+    if N is None:
+        N = int(max(sources.max(), targets.max())) + 1 if len(sources) else 0
+    order = np.argsort(sources, kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=N))))
+    return GraphTopology(offsets, targets[order], None, threshold)
+
+# k-ary fat-tree (k even): k pods of k/2 edge and k/2 aggregation switches, (k/2)^2 core switches
+# and k^3/4 hosts; routers are numbered hosts first, then edge, aggregation and core switches
+def fatTree(k, threshold = 0.03):
+    half = k//2
+    hosts, edge, aggregation, core = k*half*half, k*half, k*half, half*half
+    edgeStart, aggregationStart, coreStart = hosts, hosts + edge, hosts + edge + aggregation
+    links = []
+    # every edge switch serves k/2 hosts
+    host = np.arange(hosts)
+    links.append(np.stack((host, edgeStart + host//half), axis=1))
+    # edge and aggregation switches of a pod are fully connected
+    pod, e, a = np.meshgrid(np.arange(k), np.arange(half), np.arange(half), indexing="ij")
+    links.append(np.stack(((edgeStart + pod*half + e).ravel(), (aggregationStart + pod*half + a).ravel()), axis=1))
+    # aggregation switch a of every pod links to core switches a*k/2 .. a*k/2 + k/2-1
+    pod, a, c = np.meshgrid(np.arange(k), np.arange(half), np.arange(half), indexing="ij")
+    links.append(np.stack(((aggregationStart + pod*half + a).ravel(), (coreStart + a*half + c).ravel()), axis=1))
+    return fromEdges(np.concatenate(links), hosts + edge + aggregation + core, threshold = threshold)
+
+# k-ary n-fly butterfly: n stages of k^(n-1) switches, switch w of stage s links to the switches of
+# stage s+1 whose number differs from w in digit s (base k) only; router number = s*k^(n-1) + w
+def butterfly(k, n, threshold = 0.03):
+    width = k**(n-1)
+    links = []
+    switch = np.arange(width)
+    for stage in range(n-1):
+        place = k**stage
+        digit = (switch // place) % k
+        for value in range(k):
+            links.append(np.stack((stage*width + switch, (stage+1)*width + switch + (value - digit)*place), axis=1))
+    edges = np.concatenate(links) if links else np.zeros((0, 2), dtype=np.int64)
+    return fromEdges(edges, n*width, threshold = threshold)
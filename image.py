@@ -0,0 +1,134 @@
+import os
+import struct
+import zlib
+import render
+import topology
+
+'''
+Image export
+
+saveImage() draws a topology as a raster image, using nothing but the standard library:
+* .ppm      binary colour pixmap
+* .pgm      binary greyscale map
+* .png      colour PNG, compressed with zlib
+
+Every router takes a block of 2x2 cells, each 'scale' pixels wide:
+* top left      the router, coloured by its number of healthy links (red for 0, yellow for 1,
+                then lighter shades of blue up to 4), or green if it is on 'path'
+* top right     its right link, grey if healthy, green if 'path' uses it
+* bottom left   its down link, the same way
+* bottom right  background
+which is the layout of printTopologyMap(), one pixel per character cell.
+
+Images are written one row of routers at a time, so memory use doesn't grow with the map; a
+1000x1000 topology is a 2000x2000 image.
+
+FrameWriter writes one numbered image per draw() call, which makes a frame sequence of a fault
+injection (see the 'frames' argument of the random fault injectors) for any video tool to stitch.
+'''
+
+BACKGROUND = (16, 16, 16)
+LINK = (128, 128, 128)
+PATH = (0, 192, 0)
+# router colours indexed by [number of healthy links]
+ROUTER = [(227, 32, 32), (192, 192, 0), (64, 96, 200), (112, 152, 232), (200, 216, 255)]
+
+FORMATS = ("png", "ppm", "pgm")
+
+# returns the pixel bytes of an (r,g,b) colour, a single grey level if not 'colour'
+def pixel(rgb, colour = True):
+    if colour:
+        return bytes(rgb)
+    r, g, b = rgb
+    return bytes([int(round(0.299*r + 0.587*g + 0.114*b))])
+
+# returns {position: set of directions (0 right or 3 down)} of the links a path goes through,
+# each link is stored at the router drawing it
+def pathLinks(topo, path):
+    links = {}
+    for current, following in zip(path, path[1:]):
+        for direction in range(4):
+            if topology.neighbourPosition(topo, current, direction) == tuple(following):
+                if direction in (0, 3):
+                    links.setdefault(tuple(current), set()).add(direction)
+                else:
+                    links.setdefault(tuple(following), set()).add((direction+2)%4)
+                break
+    return links
+
+# yields the scanlines of the image, without PNG filter bytes
+def scanlines(topo, path = (), scale = 1, colour = True):
+    X, Y = topo.getDimensions()
+    # {y: {x: directions of path links drawn there}} of every router on the path
+    rows = {}
+    for x, y in path:
+        rows.setdefault(y, {})[x] = set()
+    for (x, y), directions in pathLinks(topo, list(path)).items():
+        rows.setdefault(y, {}).setdefault(x, set()).update(directions)
+    routers = [pixel(rgb, colour)*scale for rgb in ROUTER]
+    cells = [pixel(BACKGROUND, colour)*scale, pixel(LINK, colour)*scale]
+    green = pixel(PATH, colour)*scale
+    background = cells[0]
+    for y, (counts, right, down) in enumerate(render.linkRows(topo)):
+        top = [routers[num] + cells[link] for num, link in zip(counts, right)]
+        bottom = [cells[link] + background for link in down]
+        for x, directions in rows.get(y, {}).items():
+            top[x] = green + top[x][len(green):]
+            if 0 in directions:
+                top[x] = top[x][:len(green)] + green
+            if 3 in directions:
+                bottom[x] = green + background
+        top, bottom = b"".join(top), b"".join(bottom)
+        for line in range(scale):
+            yield top
+        for line in range(scale):
+            yield bottom
+
+# writes a PNG chunk
+def writeChunk(stream, kind, data):
+    stream.write(struct.pack(">I", len(data)))
+    stream.write(kind + data)
+    stream.write(struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+# writes the image to an open binary stream in 'format' (png, ppm or pgm)
+def writeImage(topo, stream, format = "png", path = (), scale = 1):
+    if format not in FORMATS:
+        raise ValueError("Unknown image format: " + str(format))
+    X, Y = topo.getDimensions()
+    width, height = 2*X*scale, 2*Y*scale
+    lines = scanlines(topo, path, scale, format != "pgm")
+    if format == "png":
+        stream.write(b"\x89PNG\r\n\x1a\n")
+        writeChunk(stream, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        compressor = zlib.compressobj(6)
+        for line in lines:
+            data = compressor.compress(b"\x00" + line)
+            if data:
+                writeChunk(stream, b"IDAT", data)
+        writeChunk(stream, b"IDAT", compressor.flush())
+        writeChunk(stream, b"IEND", b"")
+    else:
+        header = "P6" if format == "ppm" else "P5"
+        stream.write("{0}\n{1} {2}\n255\n".format(header, width, height).encode("ascii"))
+        for line in lines:
+            stream.write(line)
+
+# saves the image to 'filename', the format is taken from its extension unless given
+def saveImage(topo, filename, path = (), scale = 1, format = None):
+    if format is None:
+        format = os.path.splitext(filename)[1][1:].lower()
+    with open(filename, "wb") as stream:
+        writeImage(topo, stream, format, path, scale)
+
+# saves numbered images of a topology, one per draw()
+# 'pattern' is a file name with a format field for the frame number, like "frames/{0:04d}.png"
+class FrameWriter:
+    def __init__(self, topo, pattern, scale = 1):
+        self.topology = topo
+        self.pattern = pattern
+        self.scale = scale
+        self.frame = 0
+
+    def draw(self, path = ()):
+        saveImage(self.topology, self.pattern.format(self.frame), path, self.scale)
+        self.frame = self.frame + 1
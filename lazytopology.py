@@ -0,0 +1,174 @@
+from router import Router
+import topology
+from arraytopology import RouterGrid
+
+'''
+Lazy topologies
+
+LazyMesh and LazyTorus behave like Mesh and Torus but don't create a Router per grid cell. A router
+whose state is the default (the link health initialise() would give it, weights of 1, no search
+state) isn't stored at all: its health is worked out from its position when asked for. Only routers
+that are written to are materialised, into 'materialised', a dict keyed by position, so building
+a topology costs O(1) and memory grows with the number of faults instead of the area of the grid.
+
+topo.routers[y][x] and topo.routerAt(x, y) hand out LazyRouter views. Reading a view never stores
+anything; the first write (setLinkHealth, setWeight, setBuffers, ...) materialises the router.
+clearPathInfo() resets the search state of the stored routers and, like compact(), drops the
+ones that are back at the default.
+
+initialise() only visits the stored routers, so observers attached before it only hear about
+those; attach them afterwards.
+'''
+
+# attributes of a router in the default state, besides its link health
+DEFAULTS = {"threshold": 0.03, "cost": 0, "heuristic": 0, "parent": None, "weight": 1}
+
+##########################################
+# Router view over the sparse router store
+##########################################
+class LazyRouter(Router):
+    def __init__(self, topology, x, y):
+        # the view's own attributes, everything else is the router's state
+        self.__dict__.update(topology = topology, posx = x, posy = y)
+
+    # views of the same router compare equal, even though a new view is made on every access
+    def __eq__(self, other):
+        return (isinstance(other, LazyRouter) and self.topology is other.topology
+            and self.posx == other.posx and self.posy == other.posy)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.topology), self.posx, self.posy))
+
+    def __repr__(self):
+        return "LazyRouter({0}, {1})".format(self.posx, self.posy)
+
+    @property
+    def observers(self):
+        return self.topology.observers
+
+    # reads come from the stored router, or from the defaults while there is none
+    def __getattr__(self, name):
+        state = self.topology.materialised.get((self.posx, self.posy))
+        if state is not None:
+            return getattr(state, name)
+        if name == "linkHealth":
+            return self.topology.defaultHealth(self.posx, self.posy)
+        if name == "linkWeightList":
+            return [1, 1, 1, 1]
+        if name in DEFAULTS:
+            return DEFAULTS[name]
+        raise AttributeError(name)
+
+    # writes go to the stored router, which is made on the first one
+    def __setattr__(self, name, value):
+        setattr(self.topology.materialise(self.posx, self.posy), name, value)
+
+    # these two modify lists in place, which have to be the stored ones
+    def setLinkHealth(self, direction, health):
+        self.topology.materialise(self.posx, self.posy)
+        return Router.setLinkHealth(self, direction, health)
+
+    def setLinkWeight(self, direction, weight):
+        self.topology.materialise(self.posx, self.posy)
+        return Router.setLinkWeight(self, direction, weight)
+
+    def isMaterialised(self):
+        return (self.posx, self.posy) in self.topology.materialised
+
+
+####################################
+# Common base for lazy topologies
+####################################
+class LazyTopology:
+    def __init__(self, x, y, connectAllLinks):
+        self.X, self.Y = x, y
+        self.connectAllLinks = connectAllLinks
+        self.initialised = False
+        self.materialised = {}
+        self.routers = RouterGrid(self)
+        self.observers = []
+
+    # returns the stored router at (x, y), storing one in the default state if there's none yet
+    def materialise(self, x, y):
+        state = self.materialised.get((x, y))
+        if state is None:
+            state = self.materialised[(x, y)] = Router([x, y], self.defaultHealth(x, y))
+        return state
+
+    # true if the stored router at 'pos' is back in the default state
+    def isDefault(self, pos):
+        state = self.materialised[pos]
+        return (list(state.linkHealth) == self.defaultHealth(*pos) and list(state.linkWeightList) == [1, 1, 1, 1]
+            and all(getattr(state, name) == value for name, value in DEFAULTS.items())
+            and not hasattr(state, "buffers"))
+
+    # drops the stored routers that are back in the default state
+    def compact(self):
+        for pos in [pos for pos in self.materialised if self.isDefault(pos)]:
+            del self.materialised[pos]
+
+    # link health of every router before initialise()
+    def uninitialisedHealth(self):
+        return [1, 1, 1, 1] if self.connectAllLinks else [0, 0, 0, 0]
+
+    def initialise(self):
+        self.initialised = True
+        for (x, y) in list(self.materialised):
+            self.routerAt(x, y).setLinkHealthList(self.defaultHealth(x, y))
+
+    # returns router at given address
+    def routerAt(self, posx, posy):
+        return LazyRouter(self, posx, posy)
+
+    # returns active neighbouring routers
+    def getActiveNeighbours(self, pos):
+        x, y = pos
+        state = self.materialised.get(pos)
+        if state is None:
+            health, threshold = self.defaultHealth(x, y), DEFAULTS["threshold"]
+        else:
+            health, threshold = state.linkHealth, state.threshold
+        active = []
+        for direction in range(4):
+            if(health[direction] > threshold):
+                nx, ny = topology.neighbourPosition(self, pos, direction)
+                active.append(LazyRouter(self, nx, ny))
+        return active
+
+    # resets the search state of the stored routers, dropping the ones left in the default state
+    def clearPathInfo(self):
+        for state in self.materialised.values():
+            state.setCostHeuristic(cost=0, heuristic=0)
+            state.parent = None
+        self.compact()
+
+
+###########
+# Lazy Mesh
+###########
+class LazyMesh(LazyTopology, topology.Mesh):
+    def __init__(self, x, y, connectAllLinks = False):
+        LazyTopology.__init__(self, x, y, connectAllLinks)
+
+    # link health of the router at (x, y) as long as it isn't stored
+    def defaultHealth(self, x, y):
+        if not self.initialised:
+            return self.uninitialisedHealth()
+        return self.initialHealth(x, y)
+
+
+############
+# Lazy Torus
+############
+class LazyTorus(LazyTopology, topology.Torus):
+    def __init__(self, x, y, connectAllLinks = True):
+        LazyTopology.__init__(self, x, y, connectAllLinks)
+
+    # link health of the router at (x, y) as long as it isn't stored
+    def defaultHealth(self, x, y):
+        if not self.initialised:
+            return self.uninitialisedHealth()
+        return self.initialHealth(x, y)
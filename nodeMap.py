@@ -1,5 +1,6 @@
 from __future__ import print_function
 import sys
+import graphtopology
 
 torusDict = {
 	"a" : ["b","m","d","e"],
@@ -41,20 +42,12 @@ torusList = [
 
 print(torusList)
 
-torus = [[0 for x in range(16)] for y in range(16)]
-'''
-torusTuple = (tuple(tuple((ord(node) - 97) for node in torusDict[nodeList]) for nodeList in torusDict))
-torusTupleChar = (tuple(tuple((node) for node in torusDict[nodeList]) for nodeList in torusDict))
-print(torusTupleChar)
-print(torusTuple)
-'''
-
-for i in range(len(torus)):
-	for j in range(len(torus)):
-		# print(chr(j+97) + " : " + str(torusList[i]))
-		if chr(j+97) in torusList[i]:
-			#print(str(j) + " is in " + str(torusList[j]))
-			torus[i][j] = 1
+# adjacency matrix from the sparse topology, one pass over the links instead of a scan per pair
+graph = graphtopology.fromAdjacency(torusDict)
+torus = [[0 for x in range(graph.N)] for y in range(graph.N)]
+for i in range(graph.N):
+	for j in graph.neighbours[i]:
+		torus[i][j] = 1
 	print(torus[i])
 
 '''
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+import topology
+import search
+
+'''
+Fault-aware path cache
+
+A PathCache sits on one topology and remembers the result of findPath() for the most recently
+used (source, destination, pathWeight, linkWeight) queries, evicting the least recently used
+entry once 'maxsize' entries are held. 'routing' is the search behind it, search.findPath() or
+anything with its signature such as the strategies in strategies.py.
+
+The cache observes the topology (see topology.addObserver()), so every change made through
+the Router setters, injectLinkFault(), injectRouterFault() or the random injectors bumps
+'version' and invalidates only what the change can affect:
+* a link going down drops the cached paths that run over that link
+* a router or link weight change drops the cached paths through that router or link
+* a link coming back up may open a shorter path anywhere, so the whole cache is dropped
+Cached paths that survive a fault are still made of healthy links only.
+'''
+
+class PathCache(topology.Observer):
+    def __init__(self, topo, maxsize = 4096, routing = search.findPath):
+        self.topology = topo
+        self.maxsize = maxsize
+        self.routing = routing
+        self.version = 0
+        self.entries = OrderedDict()    # query -> (path, pathCost)
+        self.byRouter = {}              # position -> queries whose path runs through it
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        topology.addObserver(topo, self)
+
+    # same as topology.findPath(), answered from the cache when possible
+    def findPath(self, source, destination, pathWeight = 1, linkWeight = 1):
+        key = (source.getPosition(), destination.getPosition(), pathWeight, linkWeight)
+        if key in self.entries:
+            self.hits = self.hits + 1
+            self.entries.move_to_end(key)
+            path, pathCost = self.entries[key]
+        else:
+            self.misses = self.misses + 1
+            path, pathCost = self.routing(self.topology, source, destination)
+            self.insert(key, (path, pathCost))
+        # the weight change invalidates every path through these routers, this one included
+        if(pathWeight != 1 or linkWeight != 1):
+            search.applyPathWeights(self.topology, path, pathWeight, linkWeight)
+        return (path, pathCost)
+
+    def insert(self, key, result):
+        self.entries[key] = result
+        for pos in result[0]:
+            self.byRouter.setdefault(pos, set()).add(key)
+        if len(self.entries) > self.maxsize:
+            self.remove(next(iter(self.entries)))
+            self.evictions = self.evictions + 1
+
+    def remove(self, key):
+        path, pathCost = self.entries.pop(key)
+        for pos in path:
+            keys = self.byRouter[pos]
+            keys.discard(key)
+            if not keys:
+                del self.byRouter[pos]
+
+    # drops the cached paths through the router at 'pos', or only those leaving it along 'direction'
+    def invalidate(self, router, direction = None):
+        pos = router.getPosition()
+        for key in list(self.byRouter.get(pos, ())):
+            if direction is not None and not self.usesLink(self.entries[key][0], router, direction):
+                continue
+            self.remove(key)
+            self.invalidations = self.invalidations + 1
+
+    # checks whether a path runs over link 'direction' of 'router'
+    # a path of the router alone uses no link, but stops being found once the router is isolated
+    def usesLink(self, path, router, direction):
+        if len(path) == 1:
+            return True
+        index = path.index(router.getPosition())
+        for neighbour in path[max(index-1, 0):index] + path[index+1:index+2]:
+            if(self.topology.getRelativeDirection(router, self.topology.routerAt(*neighbour)) == direction):
+                return True
+        return False
+
+    def clear(self):
+        self.invalidations = self.invalidations + len(self.entries)
+        self.entries.clear()
+        self.byRouter.clear()
+
+    # stops observing the topology
+    def close(self):
+        topology.removeObserver(self.topology, self)
+
+    # returns the cache counters
+    def stats(self):
+        return {"version": self.version, "size": len(self.entries), "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "invalidations": self.invalidations}
+
+    def linkHealthChanged(self, router, direction, old, new):
+        self.version = self.version + 1
+        threshold = router.threshold
+        if(old > threshold and new <= threshold):
+            self.invalidate(router, direction)
+        elif(old <= threshold and new > threshold):
+            self.clear()
+
+    def weightChanged(self, router, direction):
+        self.version = self.version + 1
+        self.invalidate(router, direction)
@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import socket
+import argparse
+import asyncio
+import topology
+import arraytopology
+import lazytopology
+import snapshot
+import search
+import strategies
+import srn
+from pathcache import PathCache
+
+'''
+Path-query daemon
+
+A long running process that keeps named topologies in memory, so scripts don't pay for importing,
+building the grid and replaying the faults on every run. It listens on a Unix socket or on a
+localhost TCP port and speaks JSON lines: every message is one JSON object on a line, and every
+reply echoes the message's "id" (when it has one) next to the result or an "error".
+
+    {"op": "create", "name": "a", "kind": "Mesh", "size": [64, 64], "storage": "array"}
+    {"op": "load", "name": "a", "path": "faults.snap"}
+    {"op": "faults", "name": "a", "links": [[[x, y], direction], ...], "routers": [[x, y], ...]}
+    {"op": "random", "name": "a", "links": n, "routers": n, "seed": s}
+    {"op": "path", "name": "a", "source": [x, y], "destination": [x, y], "strategy": "astar"}
+    {"op": "list"}, {"op": "stats", "name": "a"}, {"op": "drop", "name": "a"}
+
+"storage" is one of STORAGE ("array" when not given), "strategy" one of STRATEGIES ("findPath").
+A path reply holds "path" (a list of [x, y]) and "cost", as findPath() returns them, and the
+"distance" the least-cost strategies minimise (search.pathDistance(), the hop count with default
+weights), so replies of different strategies can be compared by either.
+
+Path queries aren't answered one by one. They are queued per topology, and the queue is routed as
+one batch once the event loop has read everything that has arrived, so concurrent queries from
+any number of clients are coalesced. A batch is routed in one go, with nothing else running, and
+a message that changes a topology first routes the queries queued before it, so every batch sees
+one consistent state and every query sees the faults sent before it. Replies are written as soon
+as their batch is done and may come back in another order than the queries were sent; match them
+by "id".
+Every topology has a PathCache per strategy, which drops only the paths a fault affects, so
+repeated queries on a cached topology are answered in microseconds.
+
+Client is a small blocking client for scripts; findPaths() sends a whole list of queries before
+reading any reply, so they are routed in one batch.
+'''
+
+STORAGE = {
+    "object": {"Mesh": topology.Mesh, "Torus": topology.Torus},
+    "array": {"Mesh": arraytopology.ArrayMesh, "Torus": arraytopology.ArrayTorus},
+    "lazy": {"Mesh": lazytopology.LazyMesh, "Torus": lazytopology.LazyTorus},
+}
+
+STRATEGIES = dict(strategies.STRATEGIES, srn=srn.findPath)
+
+# a topology held by the daemon, its path caches and its queue of queries
+class Entry:
+    def __init__(self, topo, cacheSize):
+        self.topology = topo
+        self.cacheSize = cacheSize
+        self.caches = {}
+        self.pending = []
+        self.batches = self.queries = 0
+
+    def cache(self, strategy):
+        if strategy not in self.caches:
+            self.caches[strategy] = PathCache(self.topology, self.cacheSize, STRATEGIES[strategy])
+        return self.caches[strategy]
+
+    def close(self):
+        for cache in self.caches.values():
+            cache.close()
+
+
+class Service:
+    def __init__(self, cacheSize = 65536):
+        self.cacheSize = cacheSize
+        self.topologies = {}
+        self.scheduled = set()
+
+    def entry(self, message):
+        name = message["name"]
+        if name not in self.topologies:
+            raise KeyError("no topology named " + repr(name))
+        return self.topologies[name]
+
+    # handles one message from 'writer'; path queries are queued, everything else is answered at once
+    def handle(self, message, writer):
+        op = message.get("op")
+        if op == "path":
+            entry = self.entry(message)
+            strategy = message.get("strategy", "findPath")
+            if strategy not in STRATEGIES:
+                raise ValueError("unknown strategy " + repr(strategy))
+            X, Y = entry.topology.getDimensions()
+            source, destination = tuple(message["source"]), tuple(message["destination"])
+            for x, y in (source, destination):
+                if not (0 <= x < X and 0 <= y < Y):
+                    raise IndexError("Index out of range for given topology")
+            entry.pending.append((message.get("id"), source, destination, strategy, writer))
+            if message["name"] not in self.scheduled:
+                self.scheduled.add(message["name"])
+                asyncio.get_running_loop().call_soon(self.flush, message["name"])
+            return None
+        if op == "create":
+            kind, storage = message.get("kind", "Mesh"), message.get("storage", "array")
+            if kind not in snapshot.KINDS or storage not in STORAGE:
+                raise ValueError("unknown kind or storage " + repr((kind, storage)))
+            topo = STORAGE[storage][kind](*message["size"])
+            topo.initialise()
+            return self.add(message["name"], topo)
+        if op == "load":
+            return self.add(message["name"], snapshot.load(message["path"], mmap=False))
+        if op == "faults":
+            entry = self.entry(message)
+            self.flush(message["name"])
+            links = [(tuple(pos), direction) for pos, direction in message.get("links", ())]
+            rejected = topology.injectLinkFaults(entry.topology, links)
+            rejected = rejected + topology.injectRouterFaults(entry.topology, [tuple(pos) for pos in message.get("routers", ())])
+            return {"rejected": len(rejected)}
+        if op == "random":
+            entry = self.entry(message)
+            self.flush(message["name"])
+            seed = message.get("seed")
+            if message.get("links"):
+                topology.injectRandomLinkFaults(entry.topology, message["links"], rng=seed)
+            if message.get("routers"):
+                topology.injectRandomRouterFaults(entry.topology, message["routers"], rng=seed)
+            return {}
+        if op == "list":
+            return {"topologies": {name: list(entry.topology.getDimensions()) for name, entry in self.topologies.items()}}
+        if op == "stats":
+            entry = self.entry(message)
+            return {"batches": entry.batches, "queries": entry.queries,
+                "caches": {strategy: cache.stats() for strategy, cache in entry.caches.items()}}
+        if op == "drop":
+            entry = self.entry(message)
+            self.flush(message["name"])
+            entry.close()
+            del self.topologies[message["name"]]
+            return {}
+        raise ValueError("unknown op " + repr(op))
+
+    # (re)places the topology called 'name'
+    def add(self, name, topo):
+        if name in self.topologies:
+            self.flush(name)
+            self.topologies[name].close()
+        self.topologies[name] = Entry(topo, self.cacheSize)
+        return {"size": list(topo.getDimensions())}
+
+    # routes the queued queries of topology 'name' as one batch and writes the replies
+    def flush(self, name):
+        self.scheduled.discard(name)
+        entry = self.topologies.get(name)
+        if entry is None or not entry.pending:
+            return
+        pending, entry.pending = entry.pending, []
+        entry.batches = entry.batches + 1
+        entry.queries = entry.queries + len(pending)
+        topo = entry.topology
+        for messageId, source, destination, strategy, writer in pending:
+            # whatever one query raises, the others of the batch are still answered
+            try:
+                path, cost = entry.cache(strategy).findPath(topo.routerAt(*source), topo.routerAt(*destination))
+                result = {"path": [list(pos) for pos in path], "cost": cost, "distance": search.pathDistance(topo, path)}
+            except Exception as error:
+                result = {"error": type(error).__name__ + ": " + str(error)}
+            reply(writer, messageId, result)
+
+    # serves one connection until the client closes it
+    async def serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                messageId = None
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("a message must be a JSON object")
+                    messageId = message.get("id")
+                    result = self.handle(message, writer)
+                # a bad message gets an error reply, the connection stays open
+                except Exception as error:
+                    result = {"error": type(error).__name__ + ": " + str(error)}
+                if result is not None:
+                    reply(writer, messageId, result)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+# writes 'result' to the client behind 'writer', tagged with the id of the message it answers
+def reply(writer, messageId, result):
+    if messageId is not None:
+        result["id"] = messageId
+    if not writer.is_closing():
+        writer.write((json.dumps(result) + "\n").encode())
+
+# starts serving 'service' on the Unix socket 'path', or on TCP 'host':'port' when path is None
+async def startServer(service, path = None, host = "127.0.0.1", port = 8765):
+    if path is not None:
+        if os.path.exists(path):
+            os.unlink(path)
+        return await asyncio.start_unix_server(service.serve, path, limit=2**24)
+    return await asyncio.start_server(service.serve, host, port, limit=2**24)
+
+async def serveForever(service, path = None, host = "127.0.0.1", port = 8765):
+    server = await startServer(service, path, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+###########################
+# Blocking client
+###########################
+class Client:
+    # connects to the Unix socket 'path', or to TCP 'host':'port' when path is None
+    def __init__(self, path = None, host = "127.0.0.1", port = 8765):
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port))
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.socket.makefile("rwb")
+        self.nextId = 0
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+    # sends all 'messages', then returns their replies in the same order
+    def send(self, messages):
+        ids = []
+        for message in messages:
+            self.nextId = self.nextId + 1
+            ids.append(self.nextId)
+            self.stream.write((json.dumps(dict(message, id=self.nextId)) + "\n").encode())
+        self.stream.flush()
+        replies = {}
+        while len(replies) < len(ids):
+            result = json.loads(self.stream.readline())
+            replies[result.pop("id")] = result
+        return [replies[id] for id in ids]
+
+    # sends one message and returns its reply, raising RuntimeError if it is an error
+    def request(self, op, **fields):
+        result = self.send([dict(fields, op=op)])[0]
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result
+
+    def create(self, name, kind, X, Y, storage = "array"):
+        return self.request("create", name=name, kind=kind, size=[X, Y], storage=storage)
+
+    def load(self, name, path):
+        return self.request("load", name=name, path=os.path.abspath(path))
+
+    def injectFaults(self, name, links = (), routers = ()):
+        return self.request("faults", name=name, links=[[list(pos), direction] for pos, direction in links],
+            routers=[list(pos) for pos in routers])["rejected"]
+
+    def injectRandomFaults(self, name, links = 0, routers = 0, seed = None):
+        return self.request("random", name=name, links=links, routers=routers, seed=seed)
+
+    # returns (path, cost) like findPath(), with the path as a list of (x, y)
+    def findPath(self, name, source, destination, strategy = "findPath"):
+        return self.findPaths(name, [(source, destination)], strategy)[0]
+
+    # routes all (source, destination) pairs in one batch, returning (path, cost) in input order
+    def findPaths(self, name, pairs, strategy = "findPath"):
+        results = []
+        for result in self.send([{"op": "path", "name": name, "source": list(source),
+                "destination": list(destination), "strategy": strategy} for source, destination in pairs]):
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            results.append(([tuple(pos) for pos in result["path"]], result["cost"]))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Serve path queries on topologies held in memory")
+    parser.add_argument("--socket", help = "Unix socket to listen on, instead of TCP")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--cache", type = int, default = 65536, help = "cached paths per topology and strategy")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serveForever(Service(args.cache), args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        sys.exit(0)
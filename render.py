@@ -0,0 +1,117 @@
+import sys
+
+'''
+Terminal rendering
+
+A frame is built as one string from precomputed cell glyphs and written with a single call.
+Every router takes two cells, 4 characters wide:
+* its node cell, the number of healthy links followed by "---" if the right link is healthy
+* its link cell below, "|" if the down link is healthy
+which is the layout printTopologyMap() and showPath() have always printed.
+
+FrameRenderer remembers the cells it drew last, so when it draws the next frame of an
+animation it only rewrites the cells that changed, moving the cursor there with escape codes.
+'''
+
+BLUE =  '\033[1;38;2;32;64;227m'
+RED =   '\033[1;38;2;227;32;32m'
+GREEN = '\033[0;38;2;0;192;0m'
+YELLOW ='\033[0;38;2;192;192;0m'
+NC =    '\033[0m'
+
+CELL_WIDTH = 4
+
+# node glyphs indexed by [number of healthy links] for each style
+PLAIN = [str(num) for num in range(5)]
+COLOUR = [RED + "0" + NC, YELLOW + "1" + NC] + PLAIN[2:]
+BLANK = [" "] + PLAIN[1:]
+PATH = [GREEN + str(num) + NC for num in range(5)]
+RIGHT = ["   ", "---"]
+DOWN = ["    ", "|   "]
+
+# yields (counts, right, down) of every row of routers: healthy link count, right and down link health
+def linkRows(topology):
+    if hasattr(topology, "health"):
+        for y in range(len(topology.health)):
+            healthy = topology.health[y] > topology.threshold
+            yield healthy.sum(axis=1).tolist(), healthy[:, 0].astype(int).tolist(), healthy[:, 3].astype(int).tolist()
+        return
+    for row in topology.routers:
+        counts, right, down = [], [], []
+        for router in row:
+            threshold = router.threshold
+            links = [1 if link > threshold else 0 for link in router.linkHealth]
+            counts.append(sum(links))
+            right.append(links[0])
+            down.append(links[3])
+        yield counts, right, down
+
+# returns (counts, right, down) as lists of rows
+def linkStates(topology):
+    counts, right, down = [], [], []
+    for countRow, rightRow, downRow in linkRows(topology):
+        counts.append(countRow)
+        right.append(rightRow)
+        down.append(downRow)
+    return counts, right, down
+
+# returns the frame as a list of lines, each a list of cells
+# 'glyphs' styles the node numbers; routers in 'path' are drawn in green
+def frameCells(topology, glyphs, path = ()):
+    counts, right, down = linkStates(topology)
+    X, Y = topology.getDimensions()
+    lines = []
+    for i in range(Y):
+        nodes = [glyphs[num] + RIGHT[link] for num, link in zip(counts[i], right[i])]
+        # the last column has no link to its right
+        nodes[-1] = glyphs[counts[i][-1]]
+        lines.append(nodes)
+        lines.append([DOWN[link] for link in down[i]] if i != Y-1 else [])
+    for x, y in set(path):
+        if not (0 <= x < X and 0 <= y < Y):
+            continue
+        lines[2*y][x] = PATH[counts[y][x]] + (RIGHT[right[y][x]] if x < X-1 else "")
+    return lines
+
+# returns the whole frame as one string
+def frame(topology, glyphs, path = ()):
+    return "".join("".join(line) + "\n" for line in frameCells(topology, glyphs, path))
+
+# draws the frames of an animation, rewriting only what changed since the previous one
+class FrameRenderer:
+    def __init__(self, topology, colour = True, stream = None):
+        self.topology = topology
+        self.glyphs = COLOUR if colour else BLANK
+        self.stream = stream or sys.stdout
+        self.previous = None
+
+    def draw(self, path = ()):
+        lines = frameCells(self.topology, self.glyphs, path)
+        if self.previous is None or len(self.previous) != len(lines):
+            out = "".join("".join(line) + "\n" for line in lines)
+        else:
+            out = self.diff(self.previous, lines)
+        self.previous = lines
+        self.stream.write(out)
+        self.stream.flush()
+
+    # escape codes that turn the frame 'old', drawn right above the cursor, into 'new'
+    def diff(self, old, new):
+        out = []
+        current = len(old)   # the cursor sits on the line below the frame
+        for number, (oldLine, newLine) in enumerate(zip(old, new)):
+            if oldLine == newLine:
+                continue
+            for column, (oldCell, newCell) in enumerate(zip(oldLine, newLine)):
+                if oldCell != newCell:
+                    if current > number:
+                        out.append("\033[{0}A".format(current - number))
+                    elif current < number:
+                        out.append("\033[{0}B".format(number - current))
+                    current = number
+                    out.append("\033[{0}G".format(column*CELL_WIDTH + 1))
+                    out.append(newCell)
+        if current < len(new):
+            out.append("\033[{0}B".format(len(new) - current))
+        out.append("\r")
+        return "".join(out)
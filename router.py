@@ -1,27 +1,47 @@
+from collections import deque
+
 class Router:
+    # objects told about every link health and weight change, shared with the topology
+    # through topology.addObserver()
+    observers = ()
+
     def __init__(self, pos, linkHealthList):
-        self.linkHealth = linkHealthList
+        # a copy, the list handed in may be shared with other routers
+        self.linkHealth = list(linkHealthList)
         self.posx, self.posy = pos
         self.threshold = 0.03
         self.cost = self.heuristic = 0
         self.parent = None
         self.weight = 1
-        self.linkWeightList = [1,1,1,1]
+        self.linkWeightList = [1]*len(linkHealthList)
         # print("New router initialised with position [" + str(self.posx) + ", " + str(self.posy) + "]")
 
     # modifies health for one specific link
     def setLinkHealth(self, direction, health):
-        if(abs(direction) < 4):
+        # routers of generic graphs (see graphtopology.py) may have any number of links
+        links = len(self.linkHealth)
+        if(abs(direction) < links):
+            old = self.linkHealth[int(direction)]
             self.linkHealth[int(direction)] = health
+            for observer in self.observers:
+                observer.linkHealthChanged(self, int(direction)%links, old, health)
             return True
         else:
             # print("Error: Not a valid direction")
             return False
 
     # modify health list
+    # The router keeps a copy of the list, which it may change in place later on. With observers
+    # the links change one at a time, each observer hearing about a link before the next one
+    # changes, so none of them sees a change it hasn't been told about yet.
     def setLinkHealthList(self, linkHealthList):
-        if(abs(len(linkHealthList) == 4)):
-            self.linkHealth = linkHealthList
+        if(len(linkHealthList) == len(self.linkHealth)):
+            if not self.observers:
+                self.linkHealth = list(linkHealthList)
+                return True
+            for direction in range(len(linkHealthList)):
+                if(self.linkHealth[direction] != linkHealthList[direction]):
+                    self.setLinkHealth(direction, linkHealthList[direction])
             return True
         else:
             # print("Error: Unexpected length")
@@ -41,10 +61,14 @@ class Router:
     # sets router weight
     def setWeight(self, weight):
         self.weight = weight
+        for observer in self.observers:
+            observer.weightChanged(self, None)
 
     # sets the link weight
     def setLinkWeight(self, direction, weight):
         self.linkWeightList[direction] = weight
+        for observer in self.observers:
+            observer.weightChanged(self, direction)
 
     # returns X,Y position, useful for routing packets around
     def getPosition(self):
@@ -97,9 +121,38 @@ class Router:
     # returns true if the routing was successful, otherwise false
     def route(self, source, destination):
         t = True if (self.canTransmit(destination)) else False
-        r = True if (self.canRecieve(source)) else False
+        r = True if (self.canReceive(source)) else False
         return [r,t]
     
+    # attaches bounded FIFO buffers, one per input port (right, up, left, down, local)
+    # 'depth' is counted in flits, so a packet of 'size' flits takes 'size' slots
+    def setBuffers(self, depth, ports = 5):
+        self.bufferDepth = depth
+        self.buffers = [deque() for port in range(ports)]
+        self.bufferOccupancy = [0]*ports
+
+    # returns true if the buffer of 'port' has room for 'size' more flits
+    def canAccept(self, port, size):
+        return self.bufferOccupancy[port] + size <= self.bufferDepth
+
+    # claims room for a packet that is still on its way, so that no one else takes it
+    def reserveBuffer(self, port, size):
+        self.bufferOccupancy[port] = self.bufferOccupancy[port] + size
+
+    # adds a packet whose room has already been reserved to the tail of the buffer
+    def pushPacket(self, port, packet):
+        self.buffers[port].append(packet)
+
+    # returns the packet at the head of the buffer without removing it, None if empty
+    def peekPacket(self, port):
+        return self.buffers[port][0] if self.buffers[port] else None
+
+    # removes the packet at the head of the buffer and frees its room
+    def popPacket(self, port):
+        packet = self.buffers[port].popleft()
+        self.bufferOccupancy[port] = self.bufferOccupancy[port] - packet.size
+        return packet
+
     # checks whether a router has been isolated
     def isIsolated(self):
         return True if (self.getHealthyLinksCount() == 0) else False
@@ -109,13 +162,14 @@ class Router:
         count = self.getHealthyLinksCount()
         return True if count == 1 else False
 
-    # returns direction of best transmit link
+    # returns direction of best transmit link, None if there's no healthy one
     # useful in case of local SRN
     def selectBestLink(self, source):
-        listLink = self.linkHealth
-        # get the link with highest health excluding the source
-        destination = listLink.index(max(listLink.pop(source)))
-        return destination
+        # get the link with highest health excluding the source, leaving linkHealth as it is
+        links = [direction for direction in range(len(self.linkHealth)) if direction != source and self.linkHealth[direction] > self.threshold]
+        if not links:
+            return None
+        return max(links, key=lambda direction: self.linkHealth[direction])
 
 def wrap(variable, minval, maxval):
     # I should use mod here but lite for now
@@ -0,0 +1,170 @@
+import time
+import topology
+import search
+
+'''
+Deterministic routing algorithms
+
+Classic table-free NoC routing functions, each with the routing signature of search.findPath():
+algorithm(topology, source, destination, stats = None) -> (path, pathCost), the cost being
+search.pathCost() of the path and ([], "inf") when the packet gets stuck. A SearchStats counts
+every router a hop was decided at as expanded; there are no heuristic calls or open set.
+
+Every hop is decided in constant time from the current and destination positions and the health
+of the current router's links. Only productive (distance reducing) links are ever taken, so routes
+are minimal. When a rule allows more than one link, the healthy one along the dimension with the
+most hops left is taken, X first on a tie; a packet with no healthy allowed link is stuck.
+
+* xy, yx            dimension order: all the way along X (Y) first, then along Y (X); no choice
+* westFirst         west hops first, then adaptively east, north and south
+* northLast         adaptively east, west and south, north hops last
+* negativeFirst     adaptively west and north first (negative directions), then east and south
+* oddEven           Chiu's odd-even turn model: no east to north/south turns in even columns and
+                    no north/south to west turns in odd columns
+
+Up (direction 1, y-1) is north. On a Torus offsets are taken the shorter way round, as
+Torus.getRelativeDirection() does, with a tie going right or down. The turn models are deadlock
+free on a Mesh; on a Torus the wrap-around links can close a cycle.
+'''
+
+EAST, NORTH, WEST, SOUTH = 0, 1, 2, 3
+STEPS = ((1, 0), (0, -1), (-1, 0), (0, 1))
+
+# returns the signed number of hops from a to b along a dimension of 'size' routers
+def offset(a, b, size, wraps):
+    hops = b - a
+    if(wraps):
+        hops = hops % size
+        if(2*hops > size):
+            hops = hops - size
+    return hops
+
+def alongX(dx):
+    return EAST if dx > 0 else WEST
+
+def alongY(dy):
+    return SOUTH if dy > 0 else NORTH
+
+# productive links along X and Y, the dimension with more hops left first
+def both(dx, dy):
+    if(dx == 0):
+        return (alongY(dy),) if dy else ()
+    if(dy == 0):
+        return (alongX(dx),)
+    if(abs(dy) > abs(dx)):
+        return (alongY(dy), alongX(dx))
+    return (alongX(dx), alongY(dy))
+
+# every rule takes the offsets to the destination, the current column and the source and
+# destination columns, and returns the allowed links in order of preference
+
+def xyRule(dx, dy, x, sx, tx):
+    if(dx != 0):
+        return (alongX(dx),)
+    return (alongY(dy),) if dy else ()
+
+def yxRule(dx, dy, x, sx, tx):
+    if(dy != 0):
+        return (alongY(dy),)
+    return (alongX(dx),) if dx else ()
+
+def westFirstRule(dx, dy, x, sx, tx):
+    if(dx < 0):
+        return (WEST,)
+    return both(dx, dy)
+
+def northLastRule(dx, dy, x, sx, tx):
+    if(dy < 0):
+        return (alongX(dx),) if dx else (NORTH,)
+    return both(dx, dy)
+
+def negativeFirstRule(dx, dy, x, sx, tx):
+    if(dx < 0 or dy < 0):
+        return both(min(dx, 0), min(dy, 0))
+    return both(dx, dy)
+
+def oddEvenRule(dx, dy, x, sx, tx):
+    if(dx == 0):
+        return (alongY(dy),) if dy else ()
+    if(dy == 0 and dx > 0):
+        return (EAST,)
+    allowed = []
+    if(dx > 0):
+        # turning off an eastward run is only allowed in odd columns, or before the first east hop
+        if(x % 2 == 1 or x == sx):
+            allowed.append(alongY(dy))
+        # the last east hop can't arrive in an even column that would then have to turn
+        if(tx % 2 == 1 or dx != 1):
+            allowed.append(EAST)
+    else:
+        allowed.append(WEST)
+        # turning to the west from north or south is not allowed in odd columns
+        if(x % 2 == 0 and dy != 0):
+            allowed.append(alongY(dy))
+    # more hops left first, X first on a tie
+    return tuple(sorted(allowed, key = lambda direction: (-abs(dy if direction%2 else dx), direction%2)))
+
+# walks from 'source' to 'destination' asking 'rule' for the allowed links at every hop
+def route(rule, topo, source, destination, stats = None):
+    stats = stats or search.defaultStats
+    if stats is not None:
+        started = time.perf_counter()
+    # customary check
+    if(source.isIsolated() or destination.isIsolated()):
+        if stats is not None:
+            stats.record(False, 0, 0, 0, 0, time.perf_counter() - started)
+        return ([], "inf")
+    X, Y = topo.getDimensions()
+    wraps = isinstance(topo, topology.Torus)
+    x, y = source.getPosition()
+    tx, ty = destination.getPosition()
+    dx, dy = offset(x, tx, X, wraps), offset(y, ty, Y, wraps)
+    # columns are counted along the route without wrapping, which keeps odd-even's parities in order
+    column, sourceColumn, destinationColumn = x, x, x+dx
+    router = source
+    path = [(x, y)]
+    while dx or dy:
+        for direction in rule(dx, dy, column, sourceColumn, destinationColumn):
+            if(router.linkHealth[direction] > router.threshold):
+                break
+        else:
+            # stuck, no allowed link is healthy
+            if stats is not None:
+                stats.record(False, len(path), 0, 0, 0, time.perf_counter() - started)
+            return ([], "inf")
+        stepx, stepy = STEPS[direction]
+        dx, dy, column = dx-stepx, dy-stepy, column+stepx
+        x, y = topology.neighbourPosition(topo, (x, y), direction)
+        router = topo.routerAt(x, y)
+        path.append((x, y))
+    if stats is not None:
+        stats.record(True, len(path)-1, 0, 0, 0, time.perf_counter() - started)
+    return (path, search.pathCost(topo, path))
+
+def xy(topo, source, destination, stats = None):
+    return route(xyRule, topo, source, destination, stats)
+
+def yx(topo, source, destination, stats = None):
+    return route(yxRule, topo, source, destination, stats)
+
+def westFirst(topo, source, destination, stats = None):
+    return route(westFirstRule, topo, source, destination, stats)
+
+def northLast(topo, source, destination, stats = None):
+    return route(northLastRule, topo, source, destination, stats)
+
+def negativeFirst(topo, source, destination, stats = None):
+    return route(negativeFirstRule, topo, source, destination, stats)
+
+def oddEven(topo, source, destination, stats = None):
+    return route(oddEvenRule, topo, source, destination, stats)
+
+# routing algorithms by name
+ALGORITHMS = {
+    "xy": xy,
+    "yx": yx,
+    "westFirst": westFirst,
+    "northLast": northLast,
+    "negativeFirst": negativeFirst,
+    "oddEven": oddEven,
+}
@@ -0,0 +1,101 @@
+import time
+import numpy as np
+import search
+
+'''
+Routing tables
+
+RoutingTable computes what a table-driven router would hold: for every router and every
+destination, the link to forward on. It is built for the whole network at once, under the faults
+the topology has at that time, and isn't updated afterwards (see DynamicRoutes for that).
+
+Routers are numbered i = y*X + x. For all destinations together, a breadth-first sweep walks
+outward from the destinations over the healthy links in reverse, one hop per sweep; every sweep
+is a handful of NumPy operations on the flat (destination, router) indices of the frontier.
+A router first reached in sweep k is k hops away and forwards on the link that reached it, the
+lowest numbered direction if several did. Routes are minimal in hops; weights are not looked at.
+
+nextHop[router, destination] is a uint8 holding the direction (0 right, 1 up, 2 left, 3 down),
+LOCAL at the destination itself and NONE if the destination can't be reached, so the table takes
+N*N bytes for N routers. path() walks it in time proportional to the path length, and findPath()
+wraps that with the routing signature of search.findPath(), for topology.findPath(strategy) and
+the packet simulator's 'routing'.
+'''
+
+LOCAL = 4
+NONE = 255
+
+# x and y offsets of the neighbour along each link direction
+DX = np.array([1, 0, -1, 0])
+DY = np.array([0, -1, 0, 1])
+STEPS = ((1, 0), (0, -1), (-1, 0), (0, 1))
+
+# returns a (N, 4) boolean array of the healthy links of every router
+def healthyLinks(topo):
+    X, Y = topo.getDimensions()
+    if hasattr(topo, "healthyLinks"):
+        return topo.healthyLinks().reshape(X*Y, 4)
+    healthy = np.zeros((X*Y, 4), dtype=bool)
+    for y, row in enumerate(topo.routers):
+        for x, router in enumerate(row):
+            healthy[y*X + x] = [link > router.threshold for link in router.linkHealth]
+    return healthy
+
+class RoutingTable:
+    def __init__(self, topo):
+        self.X, self.Y = topo.getDimensions()
+        N = self.X*self.Y
+        healthy = healthyLinks(topo)
+        xs, ys = np.arange(N) % self.X, np.arange(N) // self.X
+        # predecessors[n, d]: the router whose link d leads to router n
+        predecessors = np.stack([((ys-DY[d]) % self.Y)*self.X + (xs-DX[d]) % self.X for d in range(4)], axis=1)
+        table = np.full(N*N, NONE, dtype=np.uint8)     # flat [destination, router], transposed below
+        # frontier holds destination*N + router of the routers reached in the last sweep
+        frontier = np.arange(N)*N + np.arange(N)
+        table[frontier] = LOCAL
+        while frontier.size:
+            destinations, routers = np.divmod(frontier, N)
+            reached = []
+            for d in range(4):
+                previous = predecessors[routers, d]
+                usable = healthy[previous, d]
+                candidates = destinations[usable]*N + previous[usable]
+                # a router reached over a lower direction in this sweep keeps that one
+                candidates = candidates[table[candidates] == NONE]
+                table[candidates] = d
+                reached.append(candidates)
+            frontier = np.concatenate(reached)
+        self.nextHop = np.ascontiguousarray(table.reshape(N, N).T)
+
+    # returns the positions from 'source' to 'destination' following the table, [] if there is no route
+    def path(self, source, destination):
+        X, Y = self.X, self.Y
+        x, y = source
+        target = destination[1]*X + destination[0]
+        column = self.nextHop[:, target]
+        if column[y*X + x] == NONE:
+            return []
+        path = [(x, y)]
+        direction = int(column[y*X + x])
+        while direction != LOCAL:
+            dx, dy = STEPS[direction]
+            x, y = (x + dx) % X, (y + dy) % Y
+            path.append((x, y))
+            direction = int(column[y*X + x])
+        return path
+
+    # same signature and result format as search.findPath(), the cost being search.pathCost()
+    # every router the path was looked up at counts as expanded in 'stats'
+    def findPath(self, topo, source, destination, stats = None):
+        stats = stats or search.defaultStats
+        if stats is not None:
+            started = time.perf_counter()
+        # customary check
+        path = []
+        if not (source.isIsolated() or destination.isIsolated()):
+            path = self.path(source.getPosition(), destination.getPosition())
+        if stats is not None:
+            stats.record(bool(path), len(path), 0, 0, 0, time.perf_counter() - started)
+        if not path:
+            return ([], "inf")
+        return (path, search.pathCost(topo, path))
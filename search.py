@@ -0,0 +1,224 @@
+from __future__ import print_function
+import time
+import heapq
+from itertools import count
+
+'''
+Re-entrant path search
+
+All search state (cost, heuristic, parent, open/closed sets) is kept in tables local to
+a single query, keyed by router position. Router objects are only read, so there's no need
+to call clearPathInfo() between queries and several queries may run on one topology at once.
+
+The cost model is the one used by topology.findPath():
+* a child router is scored with topology.heuristic(child, destination, direction)
+* routers are expanded in order of weight*(cost+heuristic), ties broken by discovery order
+* a router's parent is the first router that discovered it
+* the cost of the path is the sum of the scores its routers got from their parents, pathCost()
+  works it out for any path, so other searches can report the same cost
+Up to the path-cost change the cost summed the score a router was given last, which differs
+when a router is scored again from another neighbour before it is expanded (a few percent of
+queries on faulty grids). The paths found are the same, only that cost changed.
+
+Routing functions
+Everything that routes a single pair has the signature of findPath() below:
+    routing(topology, source, destination, stats = None) -> (path, pathCost)
+'source' and 'destination' are routers, 'path' the list of positions from one to the other and
+'pathCost' pathCost(topology, path), or ([], "inf") when there's no path. 'stats' is a
+SearchStats the query is recorded into (defaultStats when not given). search.findPath, the
+strategies in strategies.py, srn.findPath, the algorithms in routing.py and
+RoutingTable.findPath all follow it, so any of them can be handed to topology.findPath(strategy),
+PathCache, batch.findPaths(), the packet simulator and the path daemon.
+pathCost() is a score of the heuristic, not a length. The searches that look for the least-cost
+path minimise pathDistance(), the sum of edgeCost() over the links (the hop count when all
+weights are 1), and report pathCost() like findPath() does.
+'''
+
+# find shortest path between two nodes without touching Router state
+# 'stats' (a SearchStats, or the module's 'defaultStats' when not given) records the query
+def findPath(topology, source, destination, stats = None):
+    stats = stats or defaultStats
+    if stats is not None:
+        started = time.perf_counter()
+        expanded = heuristicCalls = revisits = maxOpen = 0
+    # customary check
+    if(source.isIsolated() or destination.isIsolated()):
+        if stats is not None:
+            stats.record(False, 0, 0, 0, 0, time.perf_counter() - started)
+        return ([], "inf")
+    start = source.getPosition()
+    goal = destination.getPosition()
+    # a connectivity index (see connectivity.py) rules out unreachable pairs without a search
+    connectivity = getattr(topology, "connectivity", None)
+    if connectivity is not None and not connectivity.isReachable(start, goal):
+        if stats is not None:
+            stats.record(False, 0, 0, 0, 0, time.perf_counter() - started)
+        return ([], "inf")
+    # per-query tables
+    scores = {start: 0}             # weight*(cost+heuristic) the router was last scored with
+    parentScores = {start: 0}       # the score it got from its parent
+    parents = {start: None}         # position of the router that discovered it
+    firsts = {start: 0}             # discovery order, used to break ties
+    routers = {start: source}
+    closed = set()
+    order = count(1)
+    openHeap = [(0, 0, start)]
+    while openHeap:
+        if stats is not None:
+            maxOpen = max(maxOpen, len(openHeap))
+        priority, first, pos = heapq.heappop(openHeap)
+        if pos in closed:
+            if stats is not None:
+                revisits = revisits + 1
+            continue
+        # skip stale entries, the router has been re-scored since this one was pushed
+        if priority != scores[pos]:
+            if stats is not None:
+                revisits = revisits + 1
+            continue
+        currentNode = routers[pos]
+        closed.add(pos)
+        if stats is not None:
+            expanded = expanded + 1
+            if stats.onExpand is not None:
+                stats.onExpand(pos, priority, len(openHeap))
+
+        # found goal
+        if pos == goal:
+            path = []
+            pathCost = 0
+            while pos is not None:
+                path.append(pos)
+                pathCost = pathCost + parentScores[pos]
+                pos = parents[pos]
+            if stats is not None:
+                stats.record(True, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter() - started)
+            return (path[::-1], pathCost)
+
+        # create and score children
+        for child in topology.getActiveNeighbours(pos):
+            childPos = child.getPosition()
+            if childPos not in parents:
+                parents[childPos] = pos
+                routers[childPos] = child
+                firsts[childPos] = next(order)
+            if childPos in closed:
+                continue
+            direction = topology.getRelativeDirection(currentNode, child)
+            # heuristic is subjective to topology
+            g,h = topology.heuristic(childPos, goal, direction)
+            scores[childPos] = child.getWeight()*(g+h)
+            parentScores.setdefault(childPos, scores[childPos])
+            heapq.heappush(openHeap, (scores[childPos], firsts[childPos], childPos))
+            if stats is not None:
+                heuristicCalls = heuristicCalls + 1
+                if stats.onScore is not None:
+                    stats.onScore(childPos, goal, direction, g, h, scores[childPos])
+    # return nothing if no path found
+    if stats is not None:
+        stats.record(False, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter() - started)
+    return ([], "inf")
+
+'''
+Instrumentation
+
+A SearchStats handed to findPath() (or set as search.defaultStats, which then applies to every
+query, including those made through topology.findPath()) counts per query:
+* expanded          routers taken off the open set and expanded
+* heuristicCalls    heuristic evaluations, one per child scored
+* revisits          open set entries popped for routers already expanded or re-scored since
+* maxOpen           the largest size the open set reached
+* time              wall time in seconds
+'last' holds the counters of the most recent query, the attributes their sums over all queries
+('maxOpen' the largest). onExpand(pos, priority, openSize) and onScore(pos, goal, direction, g, h,
+score) are called for every expansion and every scored child; printScore() prints the latter.
+Without stats findPath() skips all of this.
+'''
+class SearchStats:
+    def __init__(self, onExpand = None, onScore = None):
+        self.onExpand, self.onScore = onExpand, onScore
+        self.reset()
+
+    def reset(self):
+        self.queries = self.found = 0
+        self.expanded = self.heuristicCalls = self.revisits = self.maxOpen = 0
+        self.time = 0.0
+        self.last = None
+
+    # adds the counters of one query
+    def record(self, found, expanded, heuristicCalls, revisits, maxOpen, elapsed):
+        self.last = {"found": found, "expanded": expanded, "heuristicCalls": heuristicCalls,
+            "revisits": revisits, "maxOpen": maxOpen, "time": elapsed}
+        self.queries = self.queries + 1
+        self.found = self.found + (1 if found else 0)
+        self.expanded = self.expanded + expanded
+        self.heuristicCalls = self.heuristicCalls + heuristicCalls
+        self.revisits = self.revisits + revisits
+        self.maxOpen = max(self.maxOpen, maxOpen)
+        self.time = self.time + elapsed
+
+    # returns the totals, and the averages per query
+    def summary(self):
+        queries = max(self.queries, 1)
+        return {
+            "queries": self.queries,
+            "found": self.found,
+            "expanded": self.expanded,
+            "heuristicCalls": self.heuristicCalls,
+            "revisits": self.revisits,
+            "maxOpen": self.maxOpen,
+            "time": self.time,
+            "expandedMean": float(self.expanded)/queries,
+            "heuristicCallsMean": float(self.heuristicCalls)/queries,
+            "timeMean": self.time/queries,
+        }
+
+# SearchStats used by findPath() when it isn't given one
+defaultStats = None
+
+# onScore callback printing every scored child, the output the heuristics used to print
+def printScore(pos, goal, direction, g, h, score):
+    print("F: %.3f, H: %.3f, G: %.3f, Dir: %d" % (g+h, h, g, direction) + " | {0}-->{1}".format(pos, goal))
+
+# multiplies router and link weights along a path, discouraging later paths from reusing it
+def applyPathWeights(topology, path, pathWeight = 1, linkWeight = 1):
+    for index, pos in enumerate(path):
+        current = topology.routerAt(*pos)
+        current.setWeight(current.getWeight()*pathWeight)
+        if(index > 0):
+            parent = topology.routerAt(*path[index-1])
+            direction = topology.getRelativeDirection(current, parent)
+            # the link back; generic graphs (see graphtopology.py) number their links freely
+            pdir = topology.getReverseDirection(current, direction) if hasattr(topology, 'getReverseDirection') else (direction+2)%4
+            parent.setLinkWeight(pdir, linkWeight*parent.getLinkWeight(pdir))
+            current.setLinkWeight(direction, linkWeight*current.getLinkWeight(direction))
+
+# cost findPath() reports for 'path' (a list of positions), whatever search found it
+def pathCost(topology, path):
+    if not path:
+        return "inf"
+    goal = path[-1]
+    cost = 0
+    # summed from the goal back, in the order findPath() adds them up
+    for parent, pos in reversed(list(zip(path, path[1:]))):
+        child = topology.routerAt(*pos)
+        direction = topology.getRelativeDirection(topology.routerAt(*parent), child)
+        g,h = topology.heuristic(pos, goal, direction)
+        cost = cost + child.getWeight()*(g+h)
+    return cost
+
+# sum of edgeCost() over the links of 'path', what the least-cost searches minimise
+def pathDistance(topology, path):
+    if not path:
+        return "inf"
+    distance = 0
+    for pos, following in zip(path, path[1:]):
+        router, neighbour = topology.routerAt(*pos), topology.routerAt(*following)
+        distance = distance + edgeCost(router, topology.getRelativeDirection(router, neighbour), neighbour)
+    return distance
+
+# cost of moving from 'router' to its neighbour over link 'direction'
+# This is the additive cost used by the distance-based routing modules; with default
+# weights it is the hop count.
+def edgeCost(router, direction, neighbour):
+    return router.getLinkWeight(direction)*neighbour.getWeight()
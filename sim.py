@@ -8,18 +8,10 @@ import argparse
 torus = topology.Torus(4,4)
 torus.initialise()
 
-# simvar.faultyLinks contains random faults for a 20x30 grid
-# Parts of these faults can be loaded into any topology by plugging the faults in try-except
-# for router in simvar.faultyRouters:
-# 	topology.injectRouterFault(torus,router)
-
-# simvar.faultyLinks contains random faults for a 20x30 grid
-# Parts of these faults can be loaded into any topology by plugging the faults in try-except
-# for fault in simvar.faultyLinks:
-# 	try:
-# 		topology.injectLinkFault(torus, fault[0], fault[1])
-# 	except:
-# 		pass
+# simvar.faultyRouters and simvar.faultyLinks contain random faults for a 20x30 grid
+# Parts of these faults can be loaded into any topology, the entries that don't fit are returned
+# topology.injectRouterFaults(torus, simvar.faultyRouters)
+# skipped = topology.injectLinkFaults(torus, simvar.faultyLinks)
 
 # optionally inject any random link faults if necessary
 # faults = topology.injectRandomLinkFaults(torus, 6)
@@ -39,5 +31,4 @@ for edge in simvar.edges:
 	path, pathCost = topology.findPath(torus,source,destination,1.2)
 	# optionally display the path
 	topology.showPath(torus,path)
-	print("Path cost: {0}\nPath: {1}".format(pathCost, path))
-	torus.clearPathInfo()
\ No newline at end of file
+	print("Path cost: {0}\nPath: {1}".format(pathCost, path))
\ No newline at end of file
@@ -0,0 +1,110 @@
+from __future__ import print_function
+import struct
+import argparse
+import numpy as np
+import topology
+import arraytopology
+
+'''
+Topology snapshots
+
+save() writes the state of a Mesh or Torus (object or array backed) to a small binary file and
+load() opens it again as an ArrayMesh/ArrayTorus, so fault maps of any size can be stored and
+shared instead of being written out as Python literals like simvar.py.
+
+File layout, little-endian:
+* header, 64 bytes  magic "NOCSNAP\0", format version (uint16), kind (uint8, 0 Mesh, 1 Torus),
+                    a zero byte, X and Y (uint32), threshold (float64), zero padding
+* health            (Y, X, 4) float32, link health ordered right, up, left, down
+* linkWeights       (Y, X, 4) float64
+* weights           (Y, X) float64
+
+load(path, mmap = True) maps the arrays straight from the file instead of reading them, so
+even a million routers open in milliseconds and only the pages that are touched get read. The
+mapped arrays are read-only: several processes can map the same file and share its pages, and a
+mapped topology sent to a worker process (e.g. by batch.findPaths) travels as the file name and
+is mapped again there. Use mmap = False for a private copy that faults can be injected into.
+'''
+
+MAGIC = b"NOCSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHBxIId")
+HEADER_SIZE = 64
+KINDS = ("Mesh", "Torus")
+
+# returns the (health, linkWeights, weights) arrays of any Mesh or Torus
+def stateArrays(topo):
+    if hasattr(topo, "health"):
+        return topo.health, topo.linkWeights, topo.weights
+    X, Y = topo.getDimensions()
+    health = np.empty((Y, X, 4), dtype=np.float32)
+    linkWeights = np.empty((Y, X, 4))
+    weights = np.empty((Y, X))
+    for y, row in enumerate(topo.routers):
+        for x, router in enumerate(row):
+            health[y, x] = router.linkHealth
+            linkWeights[y, x] = router.linkWeightList
+            weights[y, x] = router.weight
+    return health, linkWeights, weights
+
+# writes the topology to 'path'
+def save(topo, path):
+    X, Y = topo.getDimensions()
+    kind = 1 if isinstance(topo, topology.Torus) else 0
+    threshold = topo.threshold if hasattr(topo, "health") else topo.routers[0][0].threshold
+    health, linkWeights, weights = stateArrays(topo)
+    with open(path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, VERSION, kind, X, Y, threshold).ljust(HEADER_SIZE, b"\0"))
+        output.write(np.ascontiguousarray(health, dtype="<f4").tobytes())
+        output.write(np.ascontiguousarray(linkWeights, dtype="<f8").tobytes())
+        output.write(np.ascontiguousarray(weights, dtype="<f8").tobytes())
+
+# returns (kind name, X, Y, threshold) from the header of a snapshot
+def readHeader(path):
+    with open(path, "rb") as snapshot:
+        header = snapshot.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(path + " is not a topology snapshot")
+    magic, version, kind, X, Y, threshold = HEADER.unpack(header[:HEADER.size])
+    if version != VERSION:
+        raise ValueError("Unsupported snapshot version " + str(version))
+    return KINDS[kind], X, Y, threshold
+
+# opens a snapshot as an ArrayMesh or ArrayTorus
+def load(path, mmap = True):
+    kind, X, Y, threshold = readHeader(path)
+    cls = arraytopology.ArrayTorus if kind == "Torus" else arraytopology.ArrayMesh
+    offset = HEADER_SIZE
+    arrays = []
+    for dtype, shape in (("<f4", (Y, X, 4)), ("<f8", (Y, X, 4)), ("<f8", (Y, X))):
+        if mmap:
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+        else:
+            arrays.append(np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape))
+        offset = offset + int(np.prod(shape))*np.dtype(dtype).itemsize
+    # the topology takes the arrays as they are, without allocating its own first
+    topo = cls(X, Y, False, threshold, arrays)
+    if mmap:
+        topo.snapshotPath = path
+    return topo
+
+# turns the fault lists of simvar.py (made for a 20x30 grid) into a snapshot
+# returns the link fault entries that didn't fit the topology
+def fromSimvar(path, kind = "Torus", X = 20, Y = 30):
+    import simvar
+    topo = topology.Torus(X, Y) if kind == "Torus" else topology.Mesh(X, Y)
+    topo.initialise()
+    topology.injectRouterFaults(topo, simvar.faultyRouters)
+    skipped = topology.injectLinkFaults(topo, simvar.faultyLinks)
+    save(topo, path)
+    return skipped
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Convert the faults in simvar.py into a topology snapshot")
+    parser.add_argument("path")
+    parser.add_argument("--kind", default = "Torus", choices = KINDS)
+    parser.add_argument("--size", nargs = 2, type = int, default = [20, 30], metavar = ("X", "Y"))
+    args = parser.parse_args()
+    skipped = fromSimvar(args.path, args.kind, *args.size)
+    if skipped:
+        print("Skipped " + str(len(skipped)) + " link faults outside the grid")
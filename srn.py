@@ -1,21 +1,15 @@
 from __future__ import print_function
+import time
+import numpy as np
 import topology
-from time import sleep
-import pdb
-
-# create a 2D grid of required size
-mesh = topology.Mesh(10,10)
-# initialise all connections
-mesh.initialise()
-# inject some random faults
-topology.injectRandomLinkFaults(mesh, 10)
-topology.injectRandomRouterFaults(mesh, 6)
-# view the map health
-topology.printTopologyMap(mesh,True)
+import search
+import snapshot
+import routingtable
+import strategies
 
 '''
 Working:
-The algorithm follows a recursive approach, while keeping track of 3 global variables:
+The algorithm is a depth first search, while keeping track of 3 things:
 1. Index of routers already visited
 2. Minimum hop-count
 3. Corresponding stack (path)
@@ -30,15 +24,157 @@ The source is marked visited and neighbours are fetched.
 7. go to statement 2
 8. Get hop-count and stack-trace.
 
+SRN does this on explicit stacks instead of recursion, so a path can be as long as the grid is
+large (a 256x256 Mesh is far beyond Python's recursion limit), and with a bound that keeps it from
+going down the same router twice:
+* every router has a lower bound on the hops of any path through it, its hops from the source
+  plus the grid distance left to the destination (which no path can beat). Routers are put on the
+  stack of their bound, and the search works on the stack with the lowest bound, depth first: the
+  last router pushed is taken next, so it runs straight at the destination as long as the grid
+  lets it, like the recursive version. Routers whose bound is higher wait on their own stack until
+  everything that could lead to a shorter path is used up (branch and bound).
+* 'visited' is a bitmap of the routers already gone down. Stepping towards the destination or away
+  from it changes the bound by 0 or 2, so a router is first taken off a stack with its fewest hops
+  and is never gone down again; 'hops' keeps the fewest hops seen, and 'parents' the stack trace.
+The first time the destination comes off a stack, its hops are the minimum hop-count.
+Neighbours closer to the destination are tried first, healthiest link first among equals (as
+Router.selectBestLink does).
+
+SRN observes the topology and keeps its own copy of the link health, so it is built once and used
+for any number of queries; srn.findPath() has the signature of search.findPath() and can be passed
+to topology.findPath(strategy = srn.findPath). Like the strategies in strategies.py it returns the
+cost search.findPath() gives the path (search.pathCost()); the hop count is len(path) - 1.
 '''
 
-# define source and destination routers, note that
-# router at (x,y) is accessed by routers[y][x]
-source = mesh.routers[0][0]
-destination = mesh.routers[9][8]
-# fetch path
-path = topology.findPath(mesh,source,destination)
+INF = float("inf")
+
+class SRN(topology.Observer):
+    def __init__(self, topo):
+        self.topology = topo
+        self.X, self.Y = topo.getDimensions()
+        self.wraps = isinstance(topo, topology.Torus)
+        self.refresh()
+        topology.addObserver(topo, self)
+        topo.srn = self
+
+    # copies the link health, threshold and neighbours of every router i = y*X + x
+    def refresh(self):
+        X, Y = self.X, self.Y
+        N = X*Y
+        health = snapshot.stateArrays(self.topology)[0]
+        self.health = np.asarray(health, dtype=float).reshape(N, 4).tolist()
+        self.healthy = routingtable.healthyLinks(self.topology).tolist()
+        xs, ys = np.arange(N) % X, np.arange(N) // X
+        self.neighbours = np.stack([((ys+routingtable.DY[d]) % Y)*X + (xs+routingtable.DX[d]) % X for d in range(4)], axis=1).tolist()
+        self.xs, self.ys = xs.tolist(), ys.tolist()
+
+    def linkHealthChanged(self, router, direction, old, new):
+        x, y = router.getPosition()
+        i = y*self.X + x
+        self.health[i][direction] = new
+        self.healthy[i][direction] = new > router.threshold
+
+    # returns the neighbours of router 'i' in the order they are pushed, the one to try first last
+    def children(self, i):
+        health, neighbours = self.health[i], self.neighbours[i]
+        order = [(health[d], neighbours[d]) for d in range(4) if self.healthy[i][d]]
+        order.sort()
+        return [j for h, j in order]
+
+    def findPath(self, topo, source, destination, stats = None):
+        stats = stats or search.defaultStats
+        if stats is not None:
+            started = time.perf_counter()
+        ends = strategies.endpoints(topo, source, destination)
+        if ends is None:
+            if stats is not None:
+                stats.record(False, 0, 0, 0, 0, time.perf_counter()-started)
+            return ([], "inf")
+        (sx, sy), (gx, gy) = ends
+        X, Y = self.X, self.Y
+        xs, ys = self.xs, self.ys
+        wraps = self.wraps
+        # hops left to the destination on an empty grid
+        def remaining(j):
+            dx, dy = abs(xs[j] - gx), abs(ys[j] - gy)
+            if wraps:
+                dx, dy = min(dx, X - dx), min(dy, Y - dy)
+            return dx + dy
+        start, target = sy*X + sx, gy*X + gx
+        visited = bytearray(X*Y)
+        hops = {start: 0}
+        parents = {start: None}
+        bound = remaining(start)
+        # one stack per bound
+        stacks = {bound: [start]}
+        expanded = revisits = 0
+        heuristicCalls = waiting = maxOpen = 1
+        found = False
+        while stacks:
+            if bound not in stacks:
+                bound = min(stacks)
+            stack = stacks[bound]
+            i = stack.pop()
+            waiting = waiting - 1
+            if not stack:
+                del stacks[bound]
+            if visited[i]:
+                revisits = revisits + 1
+                continue
+            if i == target:
+                found = True
+                break
+            visited[i] = 1
+            expanded = expanded + 1
+            nextHops = hops[i] + 1
+            for j in self.children(i):
+                if visited[j] or hops.get(j, INF) <= nextHops:
+                    continue
+                hops[j] = nextHops
+                parents[j] = i
+                heuristicCalls = heuristicCalls + 1
+                stacks.setdefault(nextHops + remaining(j), []).append(j)
+                waiting = waiting + 1
+            if waiting > maxOpen:
+                maxOpen = waiting
+        if stats is not None:
+            stats.record(found, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter()-started)
+        if not found:
+            return ([], "inf")
+        path = []
+        i = target
+        while i is not None:
+            path.append((i % X, i // X))
+            i = parents[i]
+        path = path[::-1]
+        return (path, search.pathCost(topo, path))
+
+# minimum hop-count path with the SRN of 'topo', made on first use
+def findPath(topo, source, destination, stats = None):
+    engine = getattr(topo, "srn", None) or SRN(topo)
+    return engine.findPath(topo, source, destination, stats)
+
+
+if __name__ == "__main__":
+    # create a 2D grid of required size
+    mesh = topology.Mesh(10,10)
+    # initialise all connections
+    mesh.initialise()
+    # inject some random faults
+    topology.injectRandomLinkFaults(mesh, 10)
+    topology.injectRandomRouterFaults(mesh, 6)
+    # view the map health
+    topology.printTopologyMap(mesh,True)
+
+    # define source and destination routers, note that
+    # router at (x,y) is accessed by routers[y][x]
+    source = mesh.routers[0][0]
+    destination = mesh.routers[9][8]
+    # fetch path
+    path, pathCost = findPath(mesh,source,destination)
+    hops = len(path) - 1
 
-print("Tracing path from {0}-->{1}".format(source.getPosition(),destination.getPosition()))
-# display the path
-topology.showPath(mesh,path)
\ No newline at end of file
+    print("Tracing path from {0}-->{1}".format(source.getPosition(),destination.getPosition()))
+    # display the path
+    topology.showPath(mesh,path)
+    print("Hop count: {0}".format(hops))
@@ -0,0 +1,461 @@
+import time
+import heapq
+from itertools import count
+import numpy as np
+import topology
+import search
+import snapshot
+import routingtable
+
+'''
+Search strategies
+
+Shortest-path searches for Mesh and Torus grids (object or array backed) with the routing
+signature of search.findPath(), so they can be handed to topology.findPath(strategy = ...),
+batch.findPaths() and the packet simulator as 'routing'. All of them find the path of least
+distance, the sum of search.edgeCost() over its links (search.pathDistance(), the hop count when
+all weights are 1), the distance DynamicRoutes keeps. The cost they return is not that distance
+but the one search.findPath() gives the same path (search.pathCost()), so results of any two
+strategies compare; two paths of the same least distance can have different costs. They return
+([], "inf") when there's no path, and record into a search.SearchStats like search.findPath().
+
+* astar             A* with the grid distance (Manhattan, shorter way round on a Torus) times the
+                    cheapest link cost as heuristic; ties go to the router closest to the goal
+* bidirectional     A* from both ends at once, taking turns, stopping as soon as either side has
+                    nothing left that could beat the best path through a router both have reached
+* jumpPoint         jump point search for 4-connected grids: straight runs are scanned without
+                    putting routers on the open set, only routers where the path may have to turn
+                    are expanded. Needs every link to cost the same and falls back to astar otherwise
+* Landmarks         ALT: distances from and to a few landmark routers, chosen far apart, give a
+                    lower bound through the triangle inequality; landmarks.findPath is A* with it.
+                    The distances are computed again on the first query after any link or weight
+                    changes, as they would no longer be a lower bound
+
+The cheapest link cost and whether all links cost the same are tracked by a CostBounds observer
+of the topology, built on first use.
+'''
+
+INF = float("inf")
+STEPS = ((1, 0), (0, -1), (-1, 0), (0, 1))
+
+##########################
+# Link costs and distances
+##########################
+class CostBounds(topology.Observer):
+    def __init__(self, topo):
+        self.topology = topo
+        self.stale = True
+        topology.addObserver(topo, self)
+        topo.costBounds = self
+
+    def weightChanged(self, router, direction):
+        self.stale = True
+
+    # returns (the cheapest link cost, True if every link costs that)
+    def get(self):
+        if(self.stale):
+            health, linkWeights, weights = snapshot.stateArrays(self.topology)
+            self.floor = float(linkWeights.min())*float(weights.min())
+            self.uniform = bool(linkWeights.min() == linkWeights.max() and weights.min() == weights.max())
+            self.stale = False
+        return self.floor, self.uniform
+
+def costBounds(topo):
+    bounds = getattr(topo, "costBounds", None) or CostBounds(topo)
+    return bounds.get()
+
+# number of hops between two positions on an empty grid
+def gridDistance(topo, a, b):
+    X, Y = topo.getDimensions()
+    dx, dy = abs(a[0]-b[0]), abs(a[1]-b[1])
+    if isinstance(topo, topology.Torus):
+        dx, dy = min(dx, X-dx), min(dy, Y-dy)
+    return dx + dy
+
+# returns a function telling whether link 'direction' of the router at (x, y) is healthy
+def linkTest(topo):
+    if hasattr(topo, "health"):
+        health, threshold = topo.health, topo.threshold
+        return lambda x, y, direction: health[y, x, direction] > threshold
+    routers = topo.routers
+    return lambda x, y, direction: routers[y][x].linkHealth[direction] > routers[y][x].threshold
+
+# returns (neighbour, cost, direction) for the healthy links leaving 'pos' ('reverse' False)
+# or (neighbour, cost, direction of its link) for the healthy links arriving at 'pos'
+def links(topo, pos, healthy, unit, reverse = False):
+    X, Y = topo.getDimensions()
+    x, y = pos
+    result = []
+    for direction, (stepx, stepy) in enumerate(STEPS):
+        if reverse:
+            nx, ny = (x-stepx) % X, (y-stepy) % Y
+            if healthy(nx, ny, direction):
+                cost = unit or search.edgeCost(topo.routerAt(nx, ny), direction, topo.routerAt(x, y))
+                result.append(((nx, ny), cost, direction))
+        elif healthy(x, y, direction):
+            nx, ny = (x+stepx) % X, (y+stepy) % Y
+            cost = unit or search.edgeCost(topo.routerAt(x, y), direction, topo.routerAt(nx, ny))
+            result.append(((nx, ny), cost, direction))
+    return result
+
+# walks back from 'pos' to the start; 'via' holds the direction every router was entered from
+# its parent in, which may be several hops back
+def tracePath(topo, parents, via, pos):
+    X, Y = topo.getDimensions()
+    path = [pos]
+    while parents[pos] is not None:
+        parent = parents[pos]
+        stepx, stepy = STEPS[via[pos]]
+        while pos != parent:
+            pos = ((pos[0]-stepx) % X, (pos[1]-stepy) % Y)
+            path.append(pos)
+    return path[::-1]
+
+# returns (start, goal) positions, or None when the query has no answer without a search
+def endpoints(topo, source, destination):
+    if(source.isIsolated() or destination.isIsolated()):
+        return None
+    start, goal = source.getPosition(), destination.getPosition()
+    connectivity = getattr(topo, "connectivity", None)
+    if connectivity is not None and not connectivity.isReachable(start, goal):
+        return None
+    return start, goal
+
+##########################################
+# A* over a successor function of choice
+##########################################
+# 'successors(pos, direction)' gives (neighbour, cost, direction) for the router at 'pos',
+# entered in 'direction' (None at the start); 'heuristic(pos)' must be consistent
+def bestFirst(topo, source, destination, stats, heuristic, successors):
+    stats = stats or search.defaultStats
+    if stats is not None:
+        started = time.perf_counter()
+        expanded = heuristicCalls = revisits = maxOpen = 0
+    ends = endpoints(topo, source, destination)
+    if ends is None:
+        if stats is not None:
+            stats.record(False, 0, 0, 0, 0, time.perf_counter() - started)
+        return ([], "inf")
+    start, goal = ends
+    costs = {start: 0}
+    parents = {start: None}
+    via = {start: None}
+    closed = set()
+    order = count(1)
+    h = heuristic(start)
+    openHeap = [(h, h, 0, 0, start)]
+    while openHeap:
+        if stats is not None:
+            maxOpen = max(maxOpen, len(openHeap))
+        f, h, first, cost, pos = heapq.heappop(openHeap)
+        # skip entries of routers expanded already or reached more cheaply since
+        if pos in closed or cost != costs[pos]:
+            if stats is not None:
+                revisits = revisits + 1
+            continue
+        closed.add(pos)
+        if stats is not None:
+            expanded = expanded + 1
+            if stats.onExpand is not None:
+                stats.onExpand(pos, f, len(openHeap))
+        if pos == goal:
+            if stats is not None:
+                stats.record(True, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter() - started)
+            path = tracePath(topo, parents, via, pos)
+            return (path, search.pathCost(topo, path))
+        for child, step, direction in successors(pos, via[pos]):
+            if child in closed or cost + step >= costs.get(child, INF):
+                continue
+            costs[child] = cost + step
+            parents[child] = pos
+            via[child] = direction
+            h = heuristic(child)
+            if stats is not None:
+                heuristicCalls = heuristicCalls + 1
+                if stats.onScore is not None:
+                    stats.onScore(child, goal, direction, cost + step, h, cost + step + h)
+            if h < INF:
+                heapq.heappush(openHeap, (cost + step + h, h, next(order), cost + step, child))
+    if stats is not None:
+        stats.record(False, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter() - started)
+    return ([], "inf")
+
+# A* with the grid distance as heuristic
+def astar(topo, source, destination, stats = None):
+    floor, uniform = costBounds(topo)
+    healthy = linkTest(topo)
+    unit = floor if uniform else None
+    goal = destination.getPosition()
+    return bestFirst(topo, source, destination, stats,
+        lambda pos: floor*gridDistance(topo, pos, goal),
+        lambda pos, direction: links(topo, pos, healthy, unit))
+
+#################
+# Bidirectional
+#################
+# A* forward from the source and backward (over the links in reverse) from the destination,
+# taking turns; a router reached from both sides closes a path, and once either side has nothing
+# left on its open set cheaper than the best path closed, no path can beat that one
+def bidirectional(topo, source, destination, stats = None):
+    stats = stats or search.defaultStats
+    if stats is not None:
+        started = time.perf_counter()
+        expanded = heuristicCalls = revisits = maxOpen = 0
+    ends = endpoints(topo, source, destination)
+    if ends is None:
+        if stats is not None:
+            stats.record(False, 0, 0, 0, 0, time.perf_counter() - started)
+        return ([], "inf")
+    start, goal = ends
+    floor, uniform = costBounds(topo)
+    healthy = linkTest(topo)
+    unit = floor if uniform else None
+    # per side: the end it heads for, costs, the router every router was reached from, closed set, open heap
+    targets = (goal, start)
+    costs = ({start: 0}, {goal: 0})
+    parents = ({start: None}, {goal: None})
+    closed = (set(), set())
+    h = floor*gridDistance(topo, start, goal)
+    heaps = ([(h, h, 0, 0, start)], [(h, h, 0, 0, goal)])
+    order = count(1)
+    best, meeting = (0, start) if start == goal else (INF, None)
+    side = 1
+    while heaps[0] and heaps[1] and heaps[0][0][0] < best and heaps[1][0][0] < best:
+        if stats is not None:
+            maxOpen = max(maxOpen, len(heaps[0]) + len(heaps[1]))
+        side = 1 - side
+        f, h, first, cost, pos = heapq.heappop(heaps[side])
+        if pos in closed[side] or cost != costs[side][pos]:
+            if stats is not None:
+                revisits = revisits + 1
+            continue
+        closed[side].add(pos)
+        if stats is not None:
+            expanded = expanded + 1
+            if stats.onExpand is not None:
+                stats.onExpand(pos, f, len(heaps[side]))
+        for child, step, direction in links(topo, pos, healthy, unit, reverse = side == 1):
+            if child in closed[side] or cost + step >= costs[side].get(child, INF):
+                continue
+            costs[side][child] = cost + step
+            parents[side][child] = pos
+            other = costs[1-side].get(child)
+            if other is not None and cost + step + other < best:
+                best, meeting = cost + step + other, child
+            h = floor*gridDistance(topo, child, targets[side])
+            if stats is not None:
+                heuristicCalls = heuristicCalls + 1
+                if stats.onScore is not None:
+                    stats.onScore(child, targets[side], direction, cost + step, h, cost + step + h)
+            # paths through 'child' can't beat the best one already closed
+            if cost + step + h < best:
+                heapq.heappush(heaps[side], (cost + step + h, h, next(order), cost + step, child))
+    if meeting is None:
+        if stats is not None:
+            stats.record(False, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter() - started)
+        return ([], "inf")
+    path = []
+    pos = meeting
+    while pos is not None:
+        path.append(pos)
+        pos = parents[0][pos]
+    path = path[::-1]
+    pos = parents[1][meeting]
+    while pos is not None:
+        path.append(pos)
+        pos = parents[1][pos]
+    if stats is not None:
+        stats.record(True, expanded, heuristicCalls, revisits, maxOpen, time.perf_counter() - started)
+    return (path, search.pathCost(topo, path))
+
+######################
+# Jump point search
+######################
+'''
+Paths are made canonical by moving along X before Y: a router entered along X may go on along X
+or turn into Y, a router entered along Y only goes on along Y, unless the detour the other way
+round (X first, then Y) is blocked by a faulty link. Then the turn is forced and the router is a
+jump point. A run along X stops at routers from which a run along Y finds a jump point.
+'''
+def jumpPoint(topo, source, destination, stats = None):
+    X, Y = topo.getDimensions()
+    floor, uniform = costBounds(topo)
+    # the canonical detours don't exist on a torus ring of two
+    if not uniform or (isinstance(topo, topology.Torus) and min(X, Y) < 3):
+        return astar(topo, source, destination, stats)
+    healthy = linkTest(topo)
+    goal = destination.getPosition()
+
+    def step(x, y, direction):
+        return (x + STEPS[direction][0]) % X, (y + STEPS[direction][1]) % Y
+
+    # True if the router at (x, y), entered along Y in 'direction', has to turn to 'side'
+    def forced(x, y, direction, side):
+        if not healthy(x, y, side):
+            return False
+        px, py = step(x, y, (direction+2) % 4)
+        cx, cy = step(px, py, side)
+        return not (healthy(px, py, side) and healthy(cx, cy, direction))
+
+    # runs along Y, returning (jump point, hops) or None
+    def jumpY(x, y, direction):
+        for hops in range(1, Y):
+            if not healthy(x, y, direction):
+                return None
+            x, y = step(x, y, direction)
+            if (x, y) == goal or forced(x, y, direction, 0) or forced(x, y, direction, 2):
+                return (x, y), hops
+        return None
+
+    # runs along X, returning (jump point, hops) or None
+    def jumpX(x, y, direction):
+        for hops in range(1, X):
+            if not healthy(x, y, direction):
+                return None
+            x, y = step(x, y, direction)
+            if (x, y) == goal or jumpY(x, y, 1) is not None or jumpY(x, y, 3) is not None:
+                return (x, y), hops
+        return None
+
+    def successors(pos, entered):
+        x, y = pos
+        if entered is None:
+            directions = (0, 1, 2, 3)
+        elif entered % 2 == 0:
+            directions = (entered, 1, 3)
+        else:
+            directions = (entered,) + tuple(side for side in (0, 2) if forced(x, y, entered, side))
+        result = []
+        for direction in directions:
+            jump = jumpX(x, y, direction) if direction % 2 == 0 else jumpY(x, y, direction)
+            if jump is not None:
+                result.append((jump[0], jump[1]*floor, direction))
+        return result
+
+    return bestFirst(topo, source, destination, stats, lambda pos: floor*gridDistance(topo, pos, goal), successors)
+
+###############
+# Landmarks
+###############
+class Landmarks(topology.Observer):
+    # 'count' landmarks, the first one at 'first' and every next one the farthest from those before
+    def __init__(self, topo, count = 8, first = (0, 0)):
+        self.topology = topo
+        self.count = count
+        self.first = tuple(first)
+        self.stale = True
+        topology.addObserver(topo, self)
+
+    def linkHealthChanged(self, router, direction, old, new):
+        self.stale = True
+
+    def weightChanged(self, router, direction):
+        self.stale = True
+
+    # (re)computes the landmark distances: fromLandmark[l][i] from landmark l to router i = y*X + x,
+    # toLandmark[l][i] from router i to landmark l, both as lists with INF where there's no path
+    def refresh(self):
+        topo = self.topology
+        X, Y = topo.getDimensions()
+        N = X*Y
+        healthy = routingtable.healthyLinks(topo)
+        health, linkWeights, weights = snapshot.stateArrays(topo)
+        xs, ys = np.arange(N) % X, np.arange(N) // X
+        self.neighbours = np.stack([((ys+routingtable.DY[d]) % Y)*X + (xs+routingtable.DX[d]) % X for d in range(4)], axis=1)
+        self.costs = linkWeights.reshape(N, 4)*weights.reshape(N)[self.neighbours]
+        self.healthy = healthy
+        self.landmarks = []
+        self.fromLandmark, self.toLandmark = [], []
+        landmark = self.first[1]*X + self.first[0]
+        nearest = np.full(N, INF)
+        for _ in range(min(self.count, N)):
+            self.landmarks.append((landmark % X, landmark // X))
+            distances = self.distances(landmark, False)
+            self.fromLandmark.append(distances.tolist())
+            self.toLandmark.append(self.distances(landmark, True).tolist())
+            # the next landmark is the reachable router farthest from all landmarks so far
+            nearest = np.minimum(nearest, distances)
+            candidates = np.where(np.isfinite(nearest), nearest, -1)
+            landmark = int(np.argmax(candidates))
+            if candidates[landmark] <= 0:
+                break
+        self.stale = False
+
+    # distances from router 'origin' to all routers, or from all routers to it ('reverse')
+    def distances(self, origin, reverse):
+        N = len(self.costs)
+        distances = np.full(N, INF)
+        distances[origin] = 0
+        uniform = self.costs[self.healthy]
+        if len(uniform) and uniform.min() == uniform.max():
+            # breadth-first, one NumPy sweep per hop
+            unit = float(uniform[0])
+            frontier = np.array([origin])
+            hops = 0
+            while frontier.size:
+                hops = hops + 1
+                reached = []
+                for d in range(4):
+                    if reverse:
+                        previous = self.neighbours[frontier, (d+2) % 4]
+                        candidates = previous[self.healthy[previous, d]]
+                    else:
+                        candidates = self.neighbours[frontier[self.healthy[frontier, d]], d]
+                    reached.append(candidates)
+                frontier = np.unique(np.concatenate(reached))
+                frontier = frontier[np.isinf(distances[frontier])]
+                distances[frontier] = hops*unit
+            return distances
+        # Dijkstra
+        neighbours, costs, healthy = self.neighbours.tolist(), self.costs.tolist(), self.healthy.tolist()
+        distances = distances.tolist()
+        heap = [(0, origin)]
+        while heap:
+            distance, i = heapq.heappop(heap)
+            if distance > distances[i]:
+                continue
+            for d in range(4):
+                if reverse:
+                    j = neighbours[i][(d+2) % 4]
+                    if not healthy[j][d]:
+                        continue
+                    cost = costs[j][d]
+                else:
+                    if not healthy[i][d]:
+                        continue
+                    j, cost = neighbours[i][d], costs[i][d]
+                if distance + cost < distances[j]:
+                    distances[j] = distance + cost
+                    heapq.heappush(heap, (distance + cost, j))
+        return np.array(distances)
+
+    # lower bound on the cost from router 'i' to router 't' by the triangle inequality
+    # INF when the landmarks show 't' can't be reached from 'i'
+    def bound(self, i, t):
+        best = 0
+        for fromLandmark, toLandmark in zip(self.fromLandmark, self.toLandmark):
+            for h in (fromLandmark[t] - fromLandmark[i], toLandmark[i] - toLandmark[t]):
+                # INF - INF is nan and says nothing
+                if h > best:
+                    best = h
+        return best
+
+    def findPath(self, topo, source, destination, stats = None):
+        if(self.stale):
+            self.refresh()
+        X, Y = topo.getDimensions()
+        floor, uniform = costBounds(topo)
+        healthy = linkTest(topo)
+        unit = floor if uniform else None
+        goal = destination.getPosition()
+        t = goal[1]*X + goal[0]
+        return bestFirst(topo, source, destination, stats,
+            lambda pos: max(self.bound(pos[1]*X + pos[0], t), floor*gridDistance(topo, pos, goal)),
+            lambda pos, direction: links(topo, pos, healthy, unit))
+
+STRATEGIES = {
+    "findPath": search.findPath,
+    "astar": astar,
+    "bidirectional": bidirectional,
+    "jumpPoint": jumpPoint,
+}
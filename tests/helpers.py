@@ -0,0 +1,75 @@
+import random
+from collections import deque
+import topology
+import arraytopology
+import lazytopology
+
+# every grid storage, by name
+GRIDS = {
+    "Mesh": topology.Mesh,
+    "Torus": topology.Torus,
+    "ArrayMesh": arraytopology.ArrayMesh,
+    "ArrayTorus": arraytopology.ArrayTorus,
+    "LazyMesh": lazytopology.LazyMesh,
+    "LazyTorus": lazytopology.LazyTorus,
+}
+
+def build(kind, X, Y):
+    topo = GRIDS[kind](X, Y)
+    topo.initialise()
+    return topo
+
+def isHealthy(topo, pos, direction):
+    router = topo.routerAt(*pos)
+    return router.linkHealth[direction] > router.threshold
+
+# positions reachable from 'pos' over links healthy at either end, as ConnectivityIndex counts them
+def component(topo, pos):
+    seen = set([pos])
+    queue = deque([pos])
+    while queue:
+        current = queue.popleft()
+        for direction in range(4):
+            neighbour = topology.neighbourPosition(topo, current, direction)
+            if neighbour in seen:
+                continue
+            if isHealthy(topo, current, direction) or isHealthy(topo, neighbour, (direction+2)%4):
+                seen.add(neighbour)
+                queue.append(neighbour)
+    return seen
+
+# the components of the whole grid, as a set of frozensets of positions
+def components(topo):
+    X, Y = topo.getDimensions()
+    left = set((x, y) for x in range(X) for y in range(Y))
+    result = set()
+    while left:
+        members = component(topo, next(iter(left)))
+        left = left - members
+        result.add(frozenset(members))
+    return result
+
+# ways to change a topology: single faults, fault lists, random faults and mixed health lists
+def singleFaults(topo, rng):
+    X, Y = topo.getDimensions()
+    for _ in range(3):
+        pos, direction = (rng.randrange(X), rng.randrange(Y)), rng.randrange(4)
+        if isHealthy(topo, pos, direction):
+            topology.injectLinkFault(topo, pos, direction)
+    topology.injectRouterFault(topo, (rng.randrange(X), rng.randrange(Y)))
+
+def bulkFaults(topo, rng):
+    X, Y = topo.getDimensions()
+    topology.injectLinkFaults(topo, [((rng.randrange(X), rng.randrange(Y)), rng.randrange(4)) for _ in range(4)])
+    topology.injectRouterFaults(topo, [(rng.randrange(X), rng.randrange(Y)) for _ in range(2)])
+
+def randomFaults(topo, rng):
+    topology.injectRandomLinkFaults(topo, 3, rng=rng)
+    topology.injectRandomRouterFaults(topo, 1, rng=rng)
+
+def mixedUpdates(topo, rng):
+    X, Y = topo.getDimensions()
+    for _ in range(3):
+        topo.routerAt(rng.randrange(X), rng.randrange(Y)).setLinkHealthList([rng.choice((0, 1)) for _ in range(4)])
+
+CHANGES = {"single": singleFaults, "bulk": bulkFaults, "random": randomFaults, "mixed": mixedUpdates}
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import topology
+import ageing
+import helpers
+
+class Recorder(topology.Observer):
+    def __init__(self):
+        self.changes = []
+
+    def linkHealthChanged(self, router, direction, old, new):
+        self.changes.append((router.getPosition(), direction, old, new))
+
+def linkCount(topo):
+    X, Y = topo.getDimensions()
+    return sum(1 for y in range(Y) for x in range(X) for direction in (0, 1) if helpers.isHealthy(topo, (x, y), direction)
+        and helpers.isHealthy(topo, topology.neighbourPosition(topo, (x, y), direction), direction+2))
+
+# links fail in time order, at the first step their health is at or below the threshold, and the
+# observers hear about both ends of every failed link in that order
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayTorus", "LazyMesh"])
+def test_threshold_events(kind):
+    topo = helpers.build(kind, 6, 5)
+    topology.injectLinkFault(topo, (2, 2), 0)
+    links = linkCount(topo)
+    recorder = Recorder()
+    topology.addObserver(topo, recorder)
+    model = ageing.WeibullWear(300)
+    engine = ageing.Ageing(topo, model, rng=5, blockSize=64)
+    assert engine.aliveCount() == links
+    events = engine.run(400)
+    assert 0 < len(events) < links and engine.aliveCount() == links - len(events)
+    assert [event[0] for event in events] == sorted(event[0] for event in events)
+    threshold = engine.threshold
+    expected = []
+    for time, (x, y), direction, value in events:
+        assert 0 < time <= 400 and value <= threshold
+        other, back = topology.neighbourPosition(topo, (x, y), direction), (direction+2)%4
+        assert topo.routerAt(x, y).linkHealth[direction] == pytest.approx(value)
+        assert topo.routerAt(*other).linkHealth[back] == pytest.approx(value)
+        link = np.flatnonzero((engine.ends[0] == y) & (engine.ends[1] == x) & (engine.ends[2] == direction))
+        assert model.healthAt(link, time)[0] <= threshold < model.healthAt(link, time - 1)[0]
+        expected.extend([((x, y), direction, value), (other, back, value)])
+    assert [(pos, direction, pytest.approx(new)) for pos, direction, old, new in recorder.changes] == expected
+    assert all(old > threshold for pos, direction, old, new in recorder.changes)
+    # the links that are left were written back above the threshold
+    assert linkCount(topo) == engine.aliveCount()
+    assert engine.events == events
+
+# the block size changes how the clock is advanced, not what happens
+def test_block_size():
+    results = []
+    for blockSize in (1, 7, 1024):
+        topo = helpers.build("Torus", 5, 5)
+        engine = ageing.Ageing(topo, ageing.WeibullWear(100), rng=2, blockSize=blockSize)
+        results.append(engine.run(150))
+    assert results[0] == results[1] == results[2] and results[0]
+
+# stochastic wear, the same seed gives the same failures, whatever stores the topology
+def test_gamma_wear_is_reproducible():
+    results = []
+    for kind in ("Mesh", "ArrayMesh", "LazyMesh"):
+        topo = helpers.build(kind, 6, 6)
+        engine = ageing.Ageing(topo, ageing.GammaWear(0.01, variation=0.5), rng=9)
+        results.append(engine.run(80) + engine.run(40))
+        assert engine.time == 120
+    assert results[0] == results[1] == results[2] and results[0]
+    assert all(value <= 0.03 for time, pos, direction, value in results[0])
@@ -0,0 +1,57 @@
+import random
+import numpy as np
+import pytest
+import topology
+import arraytopology
+
+PAIRS = {"Mesh": (topology.Mesh, arraytopology.ArrayMesh), "Torus": (topology.Torus, arraytopology.ArrayTorus)}
+
+def health(topo):
+    X, Y = topo.getDimensions()
+    return np.array([[list(topo.routerAt(x, y).linkHealth) for x in range(X)] for y in range(Y)], dtype=float)
+
+def build(kind, X, Y, seed):
+    rng = random.Random(seed)
+    links = [((rng.randrange(X), rng.randrange(Y)), rng.randrange(4)) for _ in range(X*Y//3)]
+    routers = [(rng.randrange(X), rng.randrange(Y)) for _ in range(2)]
+    pair = []
+    for grid in PAIRS[kind]:
+        topo = grid(X, Y)
+        topo.initialise()
+        topology.injectLinkFaults(topo, links)
+        topology.injectRouterFaults(topo, routers)
+        pair.append(topo)
+    return pair
+
+# the arrays hold the same health as the routers after the same faults, and expand the same neighbours
+@pytest.mark.parametrize("kind", sorted(PAIRS))
+@pytest.mark.parametrize("seed", range(3))
+def test_same_health_and_neighbours(kind, seed):
+    objects, arrays = build(kind, 7, 5, seed)
+    assert np.array_equal(health(objects), health(arrays))
+    for y in range(5):
+        for x in range(7):
+            assert objects.getActiveNeighbourPositions((x, y)) == arrays.getActiveNeighbourPositions((x, y))
+
+# and route every pair the same way
+@pytest.mark.parametrize("kind", sorted(PAIRS))
+@pytest.mark.parametrize("seed", range(3))
+def test_same_paths(kind, seed):
+    objects, arrays = build(kind, 6, 6, seed)
+    rng = random.Random(seed)
+    for _ in range(30):
+        source, destination = (rng.randrange(6), rng.randrange(6)), (rng.randrange(6), rng.randrange(6))
+        expected = topology.findPath(objects, objects.routerAt(*source), objects.routerAt(*destination))
+        objects.clearPathInfo()
+        assert topology.findPath(arrays, arrays.routerAt(*source), arrays.routerAt(*destination)) == expected
+        arrays.clearPathInfo()
+
+# setLinkHealthList on a view writes the arrays and is seen like on a Router
+@pytest.mark.parametrize("kind", sorted(PAIRS))
+def test_health_lists(kind):
+    objects, arrays = build(kind, 4, 4, 7)
+    for topo in (objects, arrays):
+        topo.routerAt(1, 2).setLinkHealthList([0, 1, 0, 1])
+        topo.routerAt(3, 3).setLinkHealth(1, 0)
+    assert np.array_equal(health(objects), health(arrays))
+    assert list(arrays.health[2, 1]) == [0, 1, 0, 1]
@@ -0,0 +1,60 @@
+import random
+import pytest
+import topology
+import search
+import strategies
+import batch
+import helpers
+
+def pairsOf(rng, X, Y, count):
+    pairs = [((rng.randrange(X), rng.randrange(Y)), (rng.randrange(X), rng.randrange(Y))) for _ in range(count)]
+    # duplicates, in between the others
+    return pairs + pairs[::7]
+
+# results come back in input order and equal to routing every pair on its own
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("kind", ["Mesh", "ArrayTorus"])
+def test_matches_search(kind, workers):
+    rng = random.Random(kind)
+    topo = helpers.build(kind, 8, 6)
+    topology.injectRandomLinkFaults(topo, 10, rng=rng)
+    pairs = pairsOf(rng, 8, 6, 60)
+    for routing in (search.findPath, strategies.astar):
+        results = batch.findPaths(topo, pairs, workers = workers, routing = routing, parallelThreshold = 0)
+        assert results == [routing(topo, topo.routerAt(*source), topo.routerAt(*destination)) for source, destination in pairs]
+
+def test_duplicates_get_their_own_result():
+    topo = helpers.build("Mesh", 4, 4)
+    first, second = batch.findPaths(topo, [((0, 0), (3, 3)), ((0, 0), (3, 3))], workers = 1)
+    assert first == second and first[0] is not second[0]
+
+# all pairs of one source are routed by the same chunk
+def test_chunks_keep_sources_together(monkeypatch):
+    chunks = []
+    def routeChunk(pairs, topology = None, routing = None):
+        chunks.append(pairs)
+        return [([], "inf")]*len(pairs)
+    class Pool:
+        def __init__(self, **arguments):
+            pass
+        def __enter__(self):
+            return self
+        def __exit__(self, *arguments):
+            return False
+        def map(self, function, chunks):
+            return [function(chunk) for chunk in chunks]
+    monkeypatch.setattr(batch, "_routeChunk", routeChunk)
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", Pool)
+    pairs = [((x % 5, 0), (x, 1)) for x in range(40)]
+    batch.findPaths(helpers.build("Mesh", 40, 2), pairs, workers = 3, parallelThreshold = 0)
+    sources = [set(source for source, destination in chunk) for chunk in chunks]
+    assert len(chunks) > 1
+    assert sum(len(group) for group in sources) == 5
+
+# small batches don't start a pool
+def test_small_batches_in_process(monkeypatch):
+    def fail(**arguments):
+        raise AssertionError("pool started")
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", fail)
+    topo = helpers.build("Mesh", 4, 4)
+    assert batch.findPaths(topo, [((0, 0), (3, 3))]*3, workers = 8) == [search.findPath(topo, topo.routerAt(0, 0), topo.routerAt(3, 3))]*3
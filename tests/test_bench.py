@@ -0,0 +1,20 @@
+import random
+import bench
+
+def test_suite_runs_every_case():
+    results = bench.runSuite(sorted(bench.CASES), ["Mesh", "Torus"], [6], [0, 0.1], repeat = 2, pairs = 3)
+    assert set(result["name"] for result in results) == set(bench.CASES)
+    assert all(result["runs"] == 2 and result["median"] <= result["p95"] for result in results)
+
+# every repeat of a case is prepared with the same seed, so it times the same faults
+def test_repeats_prepare_the_same_work():
+    topologies = []
+    def build(kind, size, density, rng):
+        topologies.append(rng.random())
+        return original(kind, size, density, rng)
+    original, bench.build = bench.build, build
+    try:
+        bench.measure("findPath", "Mesh", 6, 0.1, 3, 2, 0)
+    finally:
+        bench.build = original
+    assert len(topologies) == 4 and len(set(topologies)) == 1
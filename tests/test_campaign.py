@@ -0,0 +1,25 @@
+import topology
+import arraytopology
+import campaign
+
+FACTORY = campaign.TopologyFactory(arraytopology.ArrayMesh, 6, 6)
+
+# trials draw from generators of their own, so the number of workers doesn't change the results
+def test_workers_give_identical_results():
+    arguments = dict(pairsPerTrial = 20, minTrials = 6, maxTrials = 24, roundSize = 4, tolerance = 0.001)
+    one = campaign.runCampaign(FACTORY, campaign.linkFaults, [5, 20], 3, workers = 1, **arguments)
+    two = campaign.runCampaign(FACTORY, campaign.linkFaults, [5, 20], 3, workers = 2, **arguments)
+    assert repr(one) == repr(two)
+    assert [result["faults"] for result in one] == [5, 20]
+
+# without faults every pair is reached, the interval is 0 from the start and sampling stops at minTrials
+def test_zero_variance_stops_at_min_trials():
+    for roundSize in (3, 16):
+        result, = campaign.runCampaign(FACTORY, campaign.routerFaults, [0], 1, pairsPerTrial = 10,
+            workers = 1, minTrials = 10, roundSize = roundSize)
+        assert result["trials"] == 10
+        assert result["reachability"] == 1.0 and result["reachabilityInterval"] == 0.0
+        assert result["stretch"] == 1.0
+
+def test_trials_are_reproducible():
+    assert campaign.runTrial(FACTORY, campaign.linkFaults, 10, 5, 2, 30) == campaign.runTrial(FACTORY, campaign.linkFaults, 10, 5, 2, 30)
@@ -0,0 +1,43 @@
+import random
+import pytest
+import topology
+import arraytopology
+from connectivity import ConnectivityIndex
+import helpers
+
+# the components of the index, as a set of frozensets of positions
+def indexed(index):
+    members = {}
+    for i, label in enumerate(index.labels):
+        members.setdefault(label, set()).add(index.position(i))
+    return set(frozenset(group) for group in members.values())
+
+def check(index, topo):
+    expected = helpers.components(topo)
+    assert indexed(index) == expected
+    assert index.componentCount() == len(expected)
+    assert sorted(index.sizes.values()) == sorted(len(group) for group in expected)
+
+# the index must match a fresh search of the grid after every change
+@pytest.mark.parametrize("kind", sorted(helpers.GRIDS))
+@pytest.mark.parametrize("change", sorted(helpers.CHANGES))
+def test_matches_search(kind, change):
+    rng = random.Random(kind + change)
+    topo = helpers.build(kind, 7, 5)
+    index = ConnectivityIndex(topo)
+    for _ in range(8):
+        helpers.CHANGES[change](topo, rng)
+        check(index, topo)
+    topo.initialise()
+    check(index, topo)
+
+# bulk router faults used to miss splits, as every link was written before the first notification
+@pytest.mark.parametrize("seed", range(20))
+def test_random_router_faults_on_array_mesh(seed):
+    topo = arraytopology.ArrayMesh(6, 6)
+    topo.initialise()
+    index = ConnectivityIndex(topo)
+    topology.injectRandomRouterFaults(topo, 8, rng=seed)
+    check(index, topo)
+    for pos in [(x, y) for x in range(6) for y in range(6)]:
+        assert index.isReachable((0, 0), pos) == (pos in helpers.component(topo, (0, 0)))
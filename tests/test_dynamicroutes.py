@@ -0,0 +1,23 @@
+import random
+import pytest
+import topology
+from dynamicroutes import DynamicRoutes
+import helpers
+
+DESTINATIONS = [(0, 0), (3, 2), (6, 4)]
+
+# the incremental tables must match tables built from scratch after every change
+@pytest.mark.parametrize("kind", sorted(helpers.GRIDS))
+@pytest.mark.parametrize("change", sorted(helpers.CHANGES))
+def test_matches_recompute(kind, change):
+    rng = random.Random(kind + change)
+    topo = helpers.build(kind, 7, 5)
+    routes = DynamicRoutes(topo, DESTINATIONS)
+    for _ in range(8):
+        helpers.CHANGES[change](topo, rng)
+        fresh = DynamicRoutes(topo, DESTINATIONS)
+        fresh.close()
+        for destination in DESTINATIONS:
+            assert routes.distances[destination] == fresh.distances[destination]
+        if change != "mixed":
+            topo.initialise()
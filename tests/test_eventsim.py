@@ -0,0 +1,23 @@
+import pytest
+import arraytopology
+from eventsim import Simulator
+
+def mesh():
+    topo = arraytopology.ArrayMesh(4, 4)
+    topo.initialise()
+    return topo
+
+# a packet larger than a buffer could never be admitted and would stay in flight for good
+def test_rejects_packets_larger_than_buffers():
+    simulator = Simulator(mesh(), bufferDepth = 4)
+    with pytest.raises(ValueError):
+        simulator.inject(0, (0, 0), (3, 3), size = 5)
+    assert simulator.injected == 0
+    assert simulator.run()["inFlight"] == 0
+
+def test_packets_that_fill_a_buffer_are_delivered():
+    simulator = Simulator(mesh(), bufferDepth = 4)
+    simulator.injectMany([(0, (0, 0), (3, 3), 4), (0, (3, 0), (0, 3), 4), (1, (1, 1), (1, 1), 1)])
+    report = simulator.run()
+    assert report["delivered"] == 3
+    assert report["inFlight"] == 0
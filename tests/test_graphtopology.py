@@ -0,0 +1,59 @@
+import random
+import topology
+import graphtopology
+
+def ring(N):
+    return graphtopology.fromEdges([(i, (i+1) % N) for i in range(N)], N)
+
+def isHealthy(topo, i, port):
+    return topo.routerAt(i).getHealthyLinksList()[port] == 1
+
+# the active neighbours kept by the topology must follow the health of its ports
+def checkActive(topo):
+    for i in range(topo.N):
+        healthy = topo.routerAt(i).getHealthyLinksList()
+        assert topo.active[i] == tuple(j for j, ok in zip(topo.neighbours[i], healthy) if ok)
+
+def test_single_faults():
+    topo = ring(6)
+    port = topo.getRelativeDirection(topo.routerAt(0), topo.routerAt(1))
+    assert topology.injectLinkFault(topo, (0,), port)
+    assert not isHealthy(topo, 0, port)
+    assert not isHealthy(topo, 1, topo.getReverseDirection(topo.routerAt(0), port))
+    assert not topology.injectLinkFault(topo, (0,), port)
+    topology.injectRouterFault(topo, (3,))
+    assert topo.routerAt(3).isIsolated()
+    assert 3 not in topo.active[2] and 3 not in topo.active[4]
+    checkActive(topo)
+
+def test_single_faults_out_of_range():
+    topo = ring(4)
+    for call in (lambda: topology.injectLinkFault(topo, (4,), 0), lambda: topology.injectLinkFault(topo, (0,), 2),
+            lambda: topology.injectRouterFault(topo, (9,))):
+        try:
+            call()
+        except IndexError:
+            continue
+        assert False, "expected IndexError"
+
+def test_fault_lists():
+    topo = graphtopology.fatTree(4)
+    rejected = topology.injectLinkFaults(topo, [((0,), 0), ((1,), 0), ((topo.N,), 0), ((0,), 99)])
+    assert rejected == [((topo.N,), 0), ((0,), 99)]
+    assert not isHealthy(topo, 0, 0) and not isHealthy(topo, 1, 0)
+    rejected = topology.injectRouterFaults(topo, [(2,), (5,), (topo.N,)])
+    assert rejected == [(topo.N,)]
+    assert topo.routerAt(2).isIsolated() and topo.routerAt(5).isIsolated()
+    checkActive(topo)
+
+def test_paths_avoid_faults():
+    topo = graphtopology.fatTree(4)
+    rng = random.Random(3)
+    topology.injectRandomLinkFaults(topo, 10, rng=rng)
+    topology.injectRouterFaults(topo, [(rng.randrange(topo.N),) for _ in range(3)])
+    checkActive(topo)
+    for _ in range(20):
+        source, destination = topo.routerAt(rng.randrange(topo.N)), topo.routerAt(rng.randrange(topo.N))
+        path, cost = topology.findPath(topo, source, destination)
+        for current, following in zip(path, path[1:]):
+            assert following[0] in topo.active[current[0]]
@@ -0,0 +1,77 @@
+import io
+import struct
+import zlib
+import pytest
+import topology
+import image
+import helpers
+
+# the chunks of a PNG file, checking every CRC
+def chunks(data):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    position, result = 8, []
+    while position < len(data):
+        length, = struct.unpack(">I", data[position:position+4])
+        kind, body = data[position+4:position+8], data[position+8:position+8+length]
+        crc, = struct.unpack(">I", data[position+8+length:position+12+length])
+        assert crc == zlib.crc32(kind + body) & 0xffffffff
+        result.append((kind, body))
+        position = position + 12 + length
+    return result
+
+# decoded PNG rows, all of them filter type 0
+def pngRows(data):
+    parts = chunks(data)
+    assert parts[0][0] == b"IHDR" and parts[-1] == (b"IEND", b"")
+    width, height, depth, kind, _, _, _ = struct.unpack(">IIBBBBB", parts[0][1])
+    assert (depth, kind) == (8, 2)
+    raw = zlib.decompress(b"".join(body for kind, body in parts if kind == b"IDAT"))
+    stride = 1 + 3*width
+    assert len(raw) == stride*height
+    rows = [raw[i:i+stride] for i in range(0, len(raw), stride)]
+    assert all(row[0] == 0 for row in rows)
+    return width, height, [row[1:] for row in rows]
+
+# P6/P5 header and the pixel bytes following it
+def pnm(data):
+    magic, size, maximum, pixels = data.split(b"\n", 3)
+    width, height = map(int, size.split())
+    assert maximum == b"255"
+    return magic, width, height, pixels
+
+@pytest.mark.parametrize("kind", ["Mesh", "ArrayTorus"])
+@pytest.mark.parametrize("scale", [1, 3])
+def test_sizes_and_headers(tmp_path, kind, scale):
+    topo = helpers.build(kind, 5, 3)
+    topology.injectLinkFault(topo, (2, 1), 0)
+    path = [(0, 0), (1, 0), (1, 1)]
+    for format, magic, depth in (("ppm", b"P6", 3), ("pgm", b"P5", 1)):
+        name = tmp_path / ("map." + format)
+        image.saveImage(topo, str(name), path, scale)
+        header, width, height, pixels = pnm(name.read_bytes())
+        assert (header, width, height) == (magic, 10*scale, 6*scale)
+        assert len(pixels) == width*height*depth
+    name = tmp_path / "map.png"
+    image.saveImage(topo, str(name), path, scale)
+    width, height, rows = pngRows(name.read_bytes())
+    assert (width, height) == (10*scale, 6*scale)
+    # the PNG holds the same pixels as the PPM
+    assert b"".join(rows) == pnm((tmp_path / "map.ppm").read_bytes())[3]
+
+# routers are coloured by their healthy links, path routers and links are green
+def test_pixels():
+    topo = helpers.build("Mesh", 3, 2)
+    topology.injectRouterFault(topo, (2, 1))
+    stream = io.BytesIO()
+    image.writeImage(topo, stream, "ppm", path=[(0, 0), (1, 0)])
+    _, width, height, pixels = pnm(stream.getvalue())
+    at = lambda x, y: tuple(pixels[3*(y*width + x):3*(y*width + x) + 3])
+    assert at(0, 0) == image.PATH and at(1, 0) == image.PATH and at(2, 0) == image.PATH
+    # (2,0) keeps only its left link, (1,1) its left and up links, (2,1) is faulty
+    assert at(4, 0) == image.ROUTER[1] and at(2, 2) == image.ROUTER[2] and at(4, 2) == image.ROUTER[0]
+    assert at(4, 1) == image.BACKGROUND and at(3, 2) == image.BACKGROUND and at(0, 1) == image.LINK
+    assert at(3, 0) == image.LINK and at(1, 1) == image.BACKGROUND
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        image.saveImage(helpers.build("Mesh", 2, 2), str(tmp_path / "map.bmp"))
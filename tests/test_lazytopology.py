@@ -0,0 +1,76 @@
+import random
+import pytest
+import topology
+import lazytopology
+import helpers
+
+def health(topo):
+    X, Y = topo.getDimensions()
+    return [[list(topo.routerAt(x, y).linkHealth) for x in range(X)] for y in range(Y)]
+
+# building and reading a lazy topology stores nothing, and reads like the object one
+@pytest.mark.parametrize("kind", ["Mesh", "Torus"])
+def test_reads_store_nothing(kind):
+    lazy, objects = helpers.build("Lazy" + kind, 9, 7), helpers.build(kind, 9, 7)
+    assert health(lazy) == health(objects)
+    for y in range(7):
+        for x in range(9):
+            assert lazy.getActiveNeighbourPositions((x, y)) == objects.getActiveNeighbourPositions((x, y))
+            assert lazy.routerAt(x, y).getWeight() == 1 and not lazy.routerAt(x, y).isMaterialised()
+    path = topology.findPath(lazy, lazy.routerAt(0, 0), lazy.routerAt(8, 6))
+    assert path == topology.findPath(objects, objects.routerAt(0, 0), objects.routerAt(8, 6))
+    lazy.clearPathInfo()
+    assert lazy.materialised == {}
+
+# writes store the routers they touch, and only those
+@pytest.mark.parametrize("kind", ["Mesh", "Torus"])
+def test_writes_materialise(kind):
+    lazy, objects = helpers.build("Lazy" + kind, 9, 7), helpers.build(kind, 9, 7)
+    rng = random.Random(kind)
+    touched = set()
+    for _ in range(6):
+        pos, direction = (rng.randrange(9), rng.randrange(7)), rng.randrange(4)
+        for topo in (lazy, objects):
+            topology.injectLinkFault(topo, pos, direction)
+        touched.add(pos)
+        touched.add(topology.neighbourPosition(lazy, pos, direction))
+    for topo in (lazy, objects):
+        topology.injectRouterFault(topo, (4, 3))
+    touched.update([(4, 3)] + [topology.neighbourPosition(lazy, (4, 3), d) for d in range(4)])
+    lazy.routerAt(1, 1).setWeight(3)
+    objects.routerAt(1, 1).setWeight(3)
+    touched.add((1, 1))
+    assert set(lazy.materialised) <= touched and (4, 3) in lazy.materialised and (1, 1) in lazy.materialised
+    assert health(lazy) == health(objects)
+    for y in range(7):
+        for x in range(9):
+            assert lazy.getActiveNeighbourPositions((x, y)) == objects.getActiveNeighbourPositions((x, y))
+            assert lazy.routerAt(x, y).isMaterialised() == ((x, y) in lazy.materialised)
+
+# compact() drops the routers written back to the default, and keeps the rest
+def test_compact():
+    lazy = helpers.build("LazyMesh", 6, 6)
+    default = list(lazy.routerAt(2, 2).linkHealth)
+    lazy.routerAt(2, 2).setLinkHealth(0, 0)
+    lazy.routerAt(3, 3).setWeight(2)
+    lazy.routerAt(4, 4).setLinkWeight(1, 5)
+    lazy.routerAt(5, 5).linkHealth = [0, 0, 0, 0]
+    assert set(lazy.materialised) == {(2, 2), (3, 3), (4, 4), (5, 5)}
+    lazy.compact()
+    assert len(lazy.materialised) == 4
+    lazy.routerAt(2, 2).setLinkHealthList(default)
+    lazy.routerAt(3, 3).setWeight(1)
+    lazy.routerAt(4, 4).setLinkWeight(1, 1)
+    lazy.compact()
+    assert set(lazy.materialised) == {(5, 5)}
+    assert lazy.routerAt(2, 2).linkHealth == default and lazy.routerAt(3, 3).getWeight() == 1
+    assert lazy.routerAt(5, 5).linkHealth == [0, 0, 0, 0]
+
+# routers stored before initialise() get the initial health like the rest
+def test_initialise_updates_stored_routers():
+    lazy = lazytopology.LazyMesh(5, 4)
+    lazy.routerAt(0, 0).setWeight(2)
+    lazy.initialise()
+    objects = helpers.build("Mesh", 5, 4)
+    assert health(lazy) == health(objects)
+    assert lazy.routerAt(0, 0).getWeight() == 2 and list(lazy.materialised) == [(0, 0)]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import topology
+import loadbalance
+import helpers
+
+def flows(X, Y, count, seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, X, count), rng.integers(0, Y, count), rng.integers(0, X, count), rng.integers(0, Y, count)
+
+# the load of every link is the demand of the flows whose path crosses it
+def loads(result, topo):
+    X, Y = topo.getDimensions()
+    load = np.zeros((Y, X, 4))
+    for flow in range(len(result.sx)):
+        path = result.path(flow)
+        for pos, following in zip(path, path[1:]):
+            direction = [d for d in range(4) if topology.neighbourPosition(topo, pos, d) == following][0]
+            load[pos[1], pos[0], direction] += result.demand[flow]
+    return load
+
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "ArrayTorus"])
+def test_loads_add_up(kind):
+    topo = helpers.build(kind, 9, 7)
+    topology.injectRandomLinkFaults(topo, 15, rng=3)
+    sx, sy, dx, dy = flows(9, 7, 600, 1)
+    demand = np.random.default_rng(2).uniform(0.5, 2, 600)
+    result = loadbalance.TrafficRouting(topo, sx, sy, dx, dy, demand, batches = 16)
+    assert np.allclose(loads(result, topo), result.load)
+    result.iterate(2)
+    assert np.allclose(loads(result, topo), result.load)
+    for flow in range(600):
+        path = result.path(flow)
+        assert path == [] or (path[0], path[-1]) == ((sx[flow], sy[flow]), (dx[flow], dy[flow]))
+
+# the passes never leave the maximum utilisation above the initial routing's
+@pytest.mark.parametrize("kind", ["ArrayMesh", "ArrayTorus"])
+@pytest.mark.parametrize("seed", range(3))
+def test_never_worse(kind, seed):
+    topo = helpers.build(kind, 12, 12)
+    topology.injectRandomLinkFaults(topo, 10, rng=seed)
+    result = loadbalance.route(topo, *flows(12, 12, 3000, seed), passes = 3)
+    assert all(later <= earlier for earlier, later in zip(result.history, result.history[1:]))
+    assert result.maxUtilisation() == result.history[-1] <= result.history[0]
+
+def test_passes_lower_the_maximum():
+    topo = helpers.build("ArrayMesh", 32, 32)
+    result = loadbalance.route(topo, *flows(32, 32, 20000, 0), passes = 1)
+    assert result.history[1] < result.history[0]
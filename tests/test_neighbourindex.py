@@ -0,0 +1,63 @@
+import random
+import pytest
+import topology
+import helpers
+
+# active neighbours worked out from the link health, in link order
+def expected(topo, pos):
+    return [topology.neighbourPosition(topo, pos, d) for d in range(4) if helpers.isHealthy(topo, pos, d)]
+
+def check(topo):
+    X, Y = topo.getDimensions()
+    for pos in [(x, y) for y in range(Y) for x in range(X)]:
+        assert [router.getPosition() for router in topo.getActiveNeighbours(pos)] == expected(topo, pos)
+
+# the neighbours Mesh and Torus keep in their NeighbourIndex must follow every change
+@pytest.mark.parametrize("kind", sorted(helpers.GRIDS))
+@pytest.mark.parametrize("change", sorted(helpers.CHANGES))
+def test_matches_health(kind, change):
+    rng = random.Random(kind + change)
+    topo = helpers.build(kind, 7, 5)
+    check(topo)
+    for _ in range(8):
+        helpers.CHANGES[change](topo, rng)
+        check(topo)
+    topo.initialise()
+    check(topo)
+
+@pytest.mark.parametrize("kind", ["Mesh", "Torus"])
+def test_index_is_shared(kind):
+    topo = helpers.build(kind, 4, 4)
+    topo.getActiveNeighbours((0, 0))
+    index = topo.neighbourIndex
+    topology.injectRandomRouterFaults(topo, 3, rng=2)
+    topo.getActiveNeighbours((1, 1))
+    assert topo.neighbourIndex is index
+    for y in range(4):
+        for x in range(4):
+            assert topo.getActiveNeighbourPositions((x, y)) == expected(topo, (x, y))
+
+# writes that go past the observers show up once the index is refreshed
+@pytest.mark.parametrize("kind", ["Mesh", "Torus"])
+def test_refresh_after_direct_writes(kind):
+    topo = helpers.build(kind, 5, 4)
+    check(topo)
+    topo.routerAt(1, 1).linkHealth[0] = 0
+    topo.routerAt(2, 2).linkHealth = [0, 1, 1, 0]
+    for row in topo.routers:
+        for router in row:
+            router.threshold = 0.5 if router.posx == 3 else router.threshold
+    topo.routerAt(3, 0).linkHealth = [0.4, 0.6, 0.4, 0.6]
+    topo.neighbourIndex.refresh()
+    check(topo)
+
+# Ageing.sync() writes the routers directly and refreshes the index itself
+def test_ageing_sync_refreshes():
+    import ageing
+    topo = helpers.build("Mesh", 6, 6)
+    check(topo)
+    topo.routerAt(2, 3).linkHealth[1] = 0
+    topo.routerAt(2, 2).linkHealth[3] = 0
+    engine = ageing.Ageing(topo, ageing.WeibullWear(1e9), rng=1)
+    engine.run(10)
+    check(topo)
@@ -0,0 +1,50 @@
+import random
+import pytest
+import topology
+import search
+import strategies
+from pathcache import PathCache
+import helpers
+
+# the links of a path must all be healthy
+def healthy(topo, path):
+    for pos, following in zip(path, path[1:]):
+        directions = [d for d in range(4) if topology.neighbourPosition(topo, pos, d) == following]
+        if not any(helpers.isHealthy(topo, pos, d) for d in directions):
+            return False
+    return True
+
+# cached answers must be as good as a fresh search after every change
+@pytest.mark.parametrize("kind", sorted(helpers.GRIDS))
+@pytest.mark.parametrize("change", sorted(helpers.CHANGES))
+def test_matches_fresh_search(kind, change):
+    rng = random.Random(kind + change)
+    topo = helpers.build(kind, 7, 5)
+    caches = {routing: PathCache(topo, 64, routing) for routing in (search.findPath, strategies.astar)}
+    pairs = [((rng.randrange(7), rng.randrange(5)), (rng.randrange(7), rng.randrange(5))) for _ in range(40)]
+    for _ in range(8):
+        for routing, cache in caches.items():
+            for source, destination in pairs:
+                path, cost = cache.findPath(topo.routerAt(*source), topo.routerAt(*destination))
+                freshPath, freshCost = routing(topo, topo.routerAt(*source), topo.routerAt(*destination))
+                assert bool(path) == bool(freshPath)
+                assert healthy(topo, path)
+                if path:
+                    assert (path[0], path[-1]) == (source, destination)
+                    assert cost == search.pathCost(topo, path)
+                if routing is strategies.astar:
+                    assert len(path) == len(freshPath)
+        helpers.CHANGES[change](topo, rng)
+    for cache in caches.values():
+        assert cache.stats()["hits"] > 0
+        cache.close()
+
+# a weight change drops the paths through the router, so they are searched again
+def test_weight_change_invalidates():
+    topo = helpers.build("ArrayMesh", 5, 5)
+    cache = PathCache(topo)
+    source, destination = topo.routerAt(0, 0), topo.routerAt(4, 4)
+    path, cost = cache.findPath(source, destination)
+    topo.routerAt(*path[2]).setWeight(10)
+    assert cache.findPath(source, destination) == search.findPath(topo, source, destination)
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,95 @@
+import json
+import socket
+import asyncio
+import threading
+import pytest
+import topology
+import arraytopology
+import search
+import pathd
+
+# serves a pathd.Service on a Unix socket from a thread of its own, yielding the socket's path
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "pathd.sock")
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    def run():
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(pathd.startServer(pathd.Service(), path))
+        started.set()
+        loop.run_forever()
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+    thread = threading.Thread(target = run, daemon = True)
+    thread.start()
+    assert started.wait(5)
+    yield path
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+@pytest.fixture
+def client(server):
+    client = pathd.Client(server)
+    yield client
+    client.close()
+
+LINKS = [((2, y), 0) for y in range(6)]
+
+def test_batch_matches_search(client):
+    client.create("a", "Mesh", 8, 8)
+    assert client.injectFaults("a", LINKS, [(5, 5)]) == 0
+    topo = arraytopology.ArrayMesh(8, 8)
+    topo.initialise()
+    topology.injectLinkFaults(topo, LINKS)
+    topology.injectRouterFaults(topo, [(5, 5)])
+    pairs = [((x, y), (7 - y, (x*3) % 8)) for x in range(8) for y in range(0, 8, 3)]
+    for strategy in ("findPath", "astar"):
+        results = client.findPaths("a", pairs, strategy)
+        for (source, destination), (path, cost) in zip(pairs, results):
+            expected, expectedCost = pathd.STRATEGIES[strategy](topo, topo.routerAt(*source), topo.routerAt(*destination))
+            assert (path, cost) == (expected, expectedCost)
+
+# queries sent before a change of the topology are routed before it, those after it see it
+def test_faults_route_queued_queries_first(client):
+    client.create("a", "Mesh", 4, 4)
+    query = {"op": "path", "name": "a", "source": [0, 0], "destination": [3, 0]}
+    before, faults, after = client.send([query, {"op": "faults", "name": "a", "links": [[[1, 0], 0]]}, query])
+    assert len(before["path"]) == 4
+    assert faults == {"rejected": 0}
+    assert len(after["path"]) == 6 and [1, 0] not in after["path"][2:]
+
+def test_errors(server, client):
+    with pytest.raises(RuntimeError):
+        client.findPath("missing", (0, 0), (1, 1))
+    client.create("a", "Torus", 4, 4)
+    with pytest.raises(RuntimeError):
+        client.findPath("a", (0, 0), (1, 1), strategy = "nothing")
+    with pytest.raises(RuntimeError):
+        client.findPath("a", (0, 0), (9, 1))
+    with pytest.raises(RuntimeError):
+        client.request("unknown")
+    # lines that aren't JSON objects get an error reply and the connection keeps working
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as raw:
+        raw.connect(server)
+        stream = raw.makefile("rwb")
+        stream.write(b"[1, 2]\nnot json\n" + json.dumps({"op": "list", "id": 7}).encode() + b"\n")
+        stream.flush()
+        assert "error" in json.loads(stream.readline())
+        assert "error" in json.loads(stream.readline())
+        assert json.loads(stream.readline()) == {"topologies": {"a": [4, 4]}, "id": 7}
+        stream.close()
+
+# a query failing in an unexpected way doesn't keep the rest of its batch from being answered
+def test_failing_query_answers_the_batch(client, monkeypatch):
+    def failing(topo, source, destination, stats = None):
+        if source.getPosition() == (1, 1):
+            raise RuntimeError("failed")
+        return search.findPath(topo, source, destination, stats)
+    monkeypatch.setitem(pathd.STRATEGIES, "failing", failing)
+    client.create("a", "Mesh", 4, 4)
+    replies = client.send([{"op": "path", "name": "a", "source": list(source), "destination": [3, 3], "strategy": "failing"}
+        for source in ((0, 0), (1, 1), (2, 2))])
+    assert "path" in replies[0] and "path" in replies[2]
+    assert replies[1]["error"] == "RuntimeError: failed"
@@ -0,0 +1,77 @@
+import io
+import re
+import pytest
+import topology
+import render
+import helpers
+
+# a small terminal: the lines on screen and a cursor, understanding the escape codes FrameRenderer writes
+# (colours are dropped, they don't move the cursor)
+def play(screen, cursor, text):
+    row, column = cursor
+    for token in re.findall(r"\033\[[0-9;]*[A-Za-z]|\n|\r|[^\033\n\r]", text):
+        if token == "\n":
+            row, column = row + 1, 0
+        elif token == "\r":
+            column = 0
+        elif token.startswith("\033"):
+            code, count = token[-1], int(token[2:-1] or 1) if token[-1] != "m" else 0
+            if code == "A":
+                row = row - count
+            elif code == "B":
+                row = row + count
+            elif code == "G":
+                column = count - 1
+        else:
+            while len(screen) <= row:
+                screen.append([])
+            line = screen[row]
+            line.extend(" "*(column + 1 - len(line)))
+            line[column] = token
+            column = column + 1
+    return row, column
+
+def plain(text):
+    return [line.rstrip() for line in re.sub(r"\033\[[0-9;]*m", "", text).split("\n")[:-1]]
+
+def screenLines(screen, rows):
+    return ["".join(screen[row]).rstrip() if row < len(screen) else "" for row in range(rows)]
+
+# every frame after the first is a diff, which leaves the screen showing the full frame
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "LazyTorus"])
+@pytest.mark.parametrize("colour", [False, True])
+def test_diffs_draw_the_frame(kind, colour):
+    topo = helpers.build(kind, 6, 4)
+    stream = io.StringIO()
+    renderer = render.FrameRenderer(topo, colour=colour, stream=stream)
+    screen, cursor = [], (0, 0)
+    faults = [((1, 1), 0), ((3, 2), 3), ((5, 0), 2), ((0, 3), 1)]
+    paths = [(), [(0, 0), (1, 0), (2, 0)], [(2, 0), (2, 1)], ()]
+    for fault, path in zip(faults, paths):
+        stream.seek(0)
+        stream.truncate()
+        renderer.draw(path)
+        cursor = play(screen, cursor, stream.getvalue())
+        full = render.frame(topo, renderer.glyphs, path)
+        assert screenLines(screen, 2*4) == plain(full)
+        # the cursor ends up on the line below the frame, at its start
+        assert cursor == (2*4, 0)
+        topology.injectLinkFault(topo, *fault)
+
+# a frame that didn't change writes no cells, a fault only the cells it touches
+def test_diff_is_small():
+    topo = helpers.build("Mesh", 8, 8)
+    stream = io.StringIO()
+    renderer = render.FrameRenderer(topo, colour=False, stream=stream)
+    renderer.draw()
+    first = len(stream.getvalue())
+    stream.seek(0)
+    stream.truncate()
+    renderer.draw()
+    assert stream.getvalue() == "\r"
+    stream.seek(0)
+    stream.truncate()
+    topology.injectLinkFault(topo, (3, 3), 0)
+    renderer.draw()
+    out = stream.getvalue()
+    assert out.count("\033[") < 10 and len(out) < first // 10
@@ -0,0 +1,30 @@
+import topology
+from router import Router
+
+class Recorder(topology.Observer):
+    def __init__(self):
+        self.changes = []
+
+    def linkHealthChanged(self, router, direction, old, new):
+        self.changes.append((router.getPosition(), direction, old, new))
+
+# a list handed to several routers stays theirs to share, changing one router leaves the others alone
+def test_shared_lists_are_copied():
+    shared = [1, 1, 1, 1]
+    first, second = Router((0, 0), shared), Router((1, 0), shared)
+    third = Router((2, 0), [0, 0, 0, 0])
+    third.setLinkHealthList(shared)
+    recorder = Recorder()
+    for router in (first, second, third):
+        router.observers = [recorder]
+    first.setLinkHealthList([0, 1, 0, 1])
+    third.setLinkHealth(1, 0)
+    assert first.linkHealth == [0, 1, 0, 1]
+    assert second.linkHealth == [1, 1, 1, 1] and shared == [1, 1, 1, 1]
+    assert third.linkHealth == [1, 0, 1, 1]
+    assert recorder.changes == [((0, 0), 0, 1, 0), ((0, 0), 2, 1, 0), ((2, 0), 1, 1, 0)]
+
+def test_set_link_health_list_checks_the_length():
+    router = Router((0, 0), [1, 1, 1, 1])
+    assert not router.setLinkHealthList([0, 0])
+    assert router.linkHealth == [1, 1, 1, 1]
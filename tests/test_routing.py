@@ -0,0 +1,93 @@
+import random
+import pytest
+import topology
+import search
+import routing
+import helpers
+
+EAST, NORTH, WEST, SOUTH = routing.EAST, routing.NORTH, routing.WEST, routing.SOUTH
+
+# returns True if the turn from 'before' to 'after', in the route's column 'column', is allowed
+def xyTurn(before, after, column):
+    return not (before % 2 == 1 and after % 2 == 0)
+
+def yxTurn(before, after, column):
+    return not (before % 2 == 0 and after % 2 == 1)
+
+def westFirstTurn(before, after, column):
+    return after != WEST or before == WEST
+
+def northLastTurn(before, after, column):
+    return before != NORTH or after == NORTH
+
+def negativeFirstTurn(before, after, column):
+    return not (before in (EAST, SOUTH) and after in (WEST, NORTH))
+
+def oddEvenTurn(before, after, column):
+    if before == EAST and after in (NORTH, SOUTH):
+        return column % 2 == 1
+    if before in (NORTH, SOUTH) and after == WEST:
+        return column % 2 == 0
+    return True
+
+TURNS = {"xy": xyTurn, "yx": yxTurn, "westFirst": westFirstTurn, "northLast": northLastTurn,
+    "negativeFirst": negativeFirstTurn, "oddEven": oddEvenTurn}
+
+# the directions of the links a path takes, each one healthy
+def directions(topo, path):
+    taken = []
+    for pos, following in zip(path, path[1:]):
+        direction = [d for d in range(4) if topology.neighbourPosition(topo, pos, d) == following and helpers.isHealthy(topo, pos, d)]
+        assert direction, (pos, following)
+        taken.append(direction[0])
+    return taken
+
+def check(topo, name, source, destination):
+    X, Y = topo.getDimensions()
+    wraps = isinstance(topo, topology.Torus)
+    stats = search.SearchStats()
+    path, cost = routing.ALGORITHMS[name](topo, topo.routerAt(*source), topo.routerAt(*destination), stats)
+    if not path:
+        assert cost == "inf" and not stats.last["found"]
+        return False
+    assert (path[0], path[-1]) == (source, destination)
+    assert cost == search.pathCost(topo, path)
+    # minimal, the shorter way round on a torus
+    hops = abs(routing.offset(source[0], destination[0], X, wraps)) + abs(routing.offset(source[1], destination[1], Y, wraps))
+    assert len(path) - 1 == hops == stats.last["expanded"]
+    taken = directions(topo, path)
+    # columns are counted along the route without wrapping
+    column = source[0]
+    for before, after in zip(taken, taken[1:]):
+        column = column + routing.STEPS[before][0]
+        assert TURNS[name](before, after, column), (path, taken)
+    return True
+
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "ArrayTorus"])
+@pytest.mark.parametrize("name", sorted(routing.ALGORITHMS))
+def test_turn_model(kind, name):
+    rng = random.Random(kind + name)
+    # odd sizes, so that wrapping around a torus changes the column parity
+    topo = helpers.build(kind, 7, 5)
+    pairs = [((rng.randrange(7), rng.randrange(5)), (rng.randrange(7), rng.randrange(5))) for _ in range(60)]
+    for source, destination in pairs:
+        assert check(topo, name, source, destination)
+    topology.injectRandomLinkFaults(topo, 6, rng=rng)
+    for source, destination in pairs:
+        check(topo, name, source, destination)
+
+# on a torus odd-even keeps counting columns past the wrap: x = 0 is the route's column 7, so the
+# packet may turn from east to north there, which an even column would forbid
+def test_odd_even_torus_wrap():
+    topo = helpers.build("Torus", 7, 5)
+    path, cost = routing.oddEven(topo, topo.routerAt(5, 0), topo.routerAt(0, 3))
+    assert path == [(5, 0), (6, 0), (0, 0), (0, 4), (0, 3)]
+    assert check(topo, "oddEven", (5, 0), (0, 3))
+
+@pytest.mark.parametrize("name", sorted(routing.ALGORITHMS))
+def test_strategy_of_findpath(name):
+    topo = helpers.build("Mesh", 5, 5)
+    stats = search.SearchStats()
+    path, cost = topology.findPath(topo, topo.routerAt(0, 4), topo.routerAt(3, 1), stats = stats, strategy = routing.ALGORITHMS[name])
+    assert len(path) == 7 and cost == search.pathCost(topo, path)
+    assert stats.queries == 1
@@ -0,0 +1,37 @@
+import random
+import pytest
+import topology
+import search
+import campaign
+from routingtable import RoutingTable
+import helpers
+
+# the table's routes are as short as a breadth first search finds, over healthy links
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "ArrayTorus"])
+def test_paths_are_shortest(kind):
+    rng = random.Random(kind)
+    topo = helpers.build(kind, 7, 5)
+    topology.injectRandomLinkFaults(topo, 12, rng=rng)
+    topology.injectRandomRouterFaults(topo, 2, rng=rng)
+    table = RoutingTable(topo)
+    positions = [(x, y) for y in range(5) for x in range(7)]
+    for source in positions:
+        for destination in positions:
+            path = table.path(source, destination)
+            hops = campaign.hopDistance(topo, source, destination)
+            if hops is None:
+                assert path == []
+                continue
+            assert len(path) - 1 == hops
+            for pos, following in zip(path, path[1:]):
+                assert following in [router.getPosition() for router in topo.getActiveNeighbours(pos)]
+
+def test_routing_signature():
+    topo = helpers.build("Torus", 5, 5)
+    topology.injectRouterFault(topo, (2, 2))
+    table = RoutingTable(topo)
+    stats = search.SearchStats()
+    path, cost = topology.findPath(topo, topo.routerAt(0, 0), topo.routerAt(3, 3), stats = stats, strategy = table.findPath)
+    assert len(path) == 5 and cost == search.pathCost(topo, path)
+    assert stats.last["found"] and stats.last["expanded"] == 5
+    assert table.findPath(topo, topo.routerAt(0, 0), topo.routerAt(2, 2)) == ([], "inf")
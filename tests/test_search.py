@@ -0,0 +1,71 @@
+import random
+import pytest
+import topology
+import search
+import helpers
+
+def pairs(topo, n, seed):
+    X, Y = topo.getDimensions()
+    rng = random.Random(seed)
+    return [((rng.randrange(X), rng.randrange(Y)), (rng.randrange(X), rng.randrange(Y))) for _ in range(n)]
+
+def route(topo, source, destination, stats = None):
+    return search.findPath(topo, topo.routerAt(*source), topo.routerAt(*destination), stats)
+
+# the totals are the sums of the per query counters, which match the callbacks
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "LazyTorus"])
+def test_counters(kind):
+    topo = helpers.build(kind, 8, 6)
+    topology.injectRandomLinkFaults(topo, 10, rng=3)
+    expansions, scores = [], []
+    stats = search.SearchStats(onExpand=lambda *args: expansions.append(args), onScore=lambda *args: scores.append(args))
+    lasts = []
+    for source, destination in pairs(topo, 40, kind):
+        before = len(expansions), len(scores)
+        path, cost = route(topo, source, destination, stats)
+        # the same answer as without stats
+        assert (path, cost) == route(topo, source, destination)
+        last = stats.last
+        lasts.append(last)
+        assert last["found"] == bool(path)
+        assert last["expanded"] == len(expansions) - before[0]
+        assert last["heuristicCalls"] == len(scores) - before[1]
+        if path:
+            assert last["expanded"] >= len(path) and last["maxOpen"] >= 1
+            assert expansions[-1][0] == destination
+        assert last["time"] >= 0
+    summary = stats.summary()
+    assert summary["queries"] == 40
+    assert summary["found"] == sum(1 for last in lasts if last["found"])
+    for name in ("expanded", "heuristicCalls", "revisits"):
+        assert summary[name] == sum(last[name] for last in lasts)
+    assert summary["maxOpen"] == max(last["maxOpen"] for last in lasts)
+    assert summary["expandedMean"] == pytest.approx(summary["expanded"]/40.0)
+    assert summary["time"] == pytest.approx(sum(last["time"] for last in lasts))
+
+# queries that never search record zero counters
+def test_isolated_and_unreachable():
+    topo = helpers.build("Mesh", 4, 4)
+    topology.injectRouterFault(topo, (2, 2))
+    stats = search.SearchStats()
+    assert route(topo, (0, 0), (2, 2), stats) == ([], "inf")
+    assert stats.last["found"] is False and stats.last["expanded"] == stats.last["heuristicCalls"] == 0
+    assert stats.summary()["queries"] == 1 and stats.summary()["found"] == 0
+
+def test_reset_and_default_stats():
+    topo = helpers.build("Torus", 5, 5)
+    stats = search.SearchStats()
+    route(topo, (0, 0), (3, 3), stats)
+    assert stats.queries == 1 and stats.expanded > 0
+    stats.reset()
+    assert stats.summary() == dict(queries=0, found=0, expanded=0, heuristicCalls=0, revisits=0, maxOpen=0,
+        time=0.0, expandedMean=0.0, heuristicCallsMean=0.0, timeMean=0.0)
+    assert stats.last is None
+    # defaultStats picks up queries made without stats, topology.findPath included
+    search.defaultStats = stats
+    try:
+        topology.findPath(topo, topo.routerAt(0, 0), topo.routerAt(4, 1))
+        route(topo, (1, 1), (2, 4))
+    finally:
+        search.defaultStats = None
+    assert stats.queries == 2 and stats.found == 2
@@ -0,0 +1,39 @@
+import pickle
+import numpy as np
+import pytest
+import topology
+import arraytopology
+import snapshot
+import helpers
+
+@pytest.mark.parametrize("kind", sorted(helpers.GRIDS))
+@pytest.mark.parametrize("mmap", [False, True])
+def test_round_trip(tmp_path, kind, mmap):
+    topo = helpers.build(kind, 6, 4)
+    topology.injectRandomLinkFaults(topo, 5, rng=1)
+    topo.routerAt(2, 3).setWeight(3)
+    path = str(tmp_path / "faults.snap")
+    snapshot.save(topo, path)
+    loaded = snapshot.load(path, mmap)
+    assert type(loaded) is (arraytopology.ArrayTorus if "Torus" in kind else arraytopology.ArrayMesh)
+    for expected, actual in zip(snapshot.stateArrays(topo), snapshot.stateArrays(loaded)):
+        assert np.array_equal(expected, actual)
+
+# without mmap the topology holds the arrays read from the file, and faults can be injected into them
+def test_private_copy(tmp_path):
+    topo = helpers.build("ArrayTorus", 5, 5)
+    path = str(tmp_path / "faults.snap")
+    snapshot.save(topo, path)
+    loaded = snapshot.load(path, False)
+    assert loaded.health.flags.writeable and loaded.health.shape == (5, 5, 4)
+    assert topology.injectLinkFault(loaded, (1, 1), 0)
+    assert not loaded.routerAt(1, 1).canTransmit(0)
+    assert snapshot.load(path, False).routerAt(1, 1).canTransmit(0)
+
+def test_mapped_topology_pickles_as_its_file(tmp_path):
+    topo = helpers.build("ArrayMesh", 5, 3)
+    path = str(tmp_path / "faults.snap")
+    snapshot.save(topo, path)
+    loaded = pickle.loads(pickle.dumps(snapshot.load(path)))
+    assert loaded.snapshotPath == path
+    assert np.array_equal(loaded.health, topo.health)
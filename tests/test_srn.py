@@ -0,0 +1,48 @@
+import random
+import pytest
+import topology
+import arraytopology
+import search
+import campaign
+import srn
+import helpers
+
+# every path must be a walk over healthy links, as short as a breadth first search finds
+def check(topo, source, destination):
+    path, cost = srn.findPath(topo, topo.routerAt(*source), topo.routerAt(*destination))
+    expected = campaign.hopDistance(topo, source, destination)
+    # as for every strategy, an isolated end has no path, not even to itself
+    if topo.routerAt(*source).isIsolated() or topo.routerAt(*destination).isIsolated():
+        expected = None
+    if expected is None:
+        assert (path, cost) == ([], "inf")
+        return
+    assert len(path) - 1 == expected
+    assert cost == search.pathCost(topo, path)
+    assert path[0] == source and path[-1] == destination
+    for pos, step in zip(path, path[1:]):
+        assert any(topology.neighbourPosition(topo, pos, direction) == step and helpers.isHealthy(topo, pos, direction)
+            for direction in range(4))
+
+@pytest.mark.parametrize("kind", sorted(helpers.GRIDS))
+@pytest.mark.parametrize("change", sorted(helpers.CHANGES))
+def test_minimum_hops(kind, change):
+    if change == "mixed" and "Mesh" in kind:
+        pytest.skip("mixed health lists turn on the edge links of a Mesh, which no grid distance bound allows for")
+    rng = random.Random(kind + change)
+    topo = helpers.build(kind, 7, 5)
+    for _ in range(4):
+        helpers.CHANGES[change](topo, rng)
+        for _ in range(6):
+            check(topo, (rng.randrange(7), rng.randrange(5)), (rng.randrange(7), rng.randrange(5)))
+
+# a long wall makes the search back off from the bound; no router may be searched twice
+def test_wall():
+    topo = arraytopology.ArrayMesh(32, 32)
+    topo.initialise()
+    topology.injectLinkFaults(topo, [((15, y), 0) for y in range(30)])
+    stats = search.SearchStats()
+    path, cost = srn.findPath(topo, topo.routerAt(0, 0), topo.routerAt(31, 0), stats)
+    assert len(path) - 1 == campaign.hopDistance(topo, (0, 0), (31, 0)) == 31 + 2*30
+    assert stats.last["expanded"] <= 32*32
+    assert stats.last["heuristicCalls"] >= stats.last["expanded"]
@@ -0,0 +1,56 @@
+import random
+import pytest
+import topology
+import search
+import strategies
+import srn
+import helpers
+
+STRATEGIES = dict(strategies.STRATEGIES, srn=srn.findPath)
+
+# every strategy reports the cost search.findPath gives its path, so their results are interchangeable
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "ArrayTorus"])
+@pytest.mark.parametrize("name", sorted(STRATEGIES))
+def test_cost_is_the_one_of_findpath(kind, name):
+    rng = random.Random(kind + name)
+    topo = helpers.build(kind, 7, 6)
+    topology.injectRandomLinkFaults(topo, 10, rng=rng)
+    for _ in range(30):
+        source = topo.routerAt(rng.randrange(7), rng.randrange(6))
+        destination = topo.routerAt(rng.randrange(7), rng.randrange(6))
+        path, cost = STRATEGIES[name](topo, source, destination)
+        expected, expectedCost = search.findPath(topo, source, destination)
+        assert bool(path) == bool(expected)
+        assert cost == search.pathCost(topo, path)
+        if path == expected:
+            assert cost == expectedCost
+
+def test_path_cost_of_findpath():
+    topo = helpers.build("Mesh", 5, 5)
+    path, cost = search.findPath(topo, topo.routerAt(0, 0), topo.routerAt(4, 3))
+    assert cost == search.pathCost(topo, path)
+    assert search.pathCost(topo, []) == "inf"
+
+# the least-cost strategies all minimise the distance, whatever cost they report
+@pytest.mark.parametrize("kind", ["Mesh", "Torus", "ArrayMesh", "ArrayTorus"])
+def test_same_distance(kind):
+    rng = random.Random(kind)
+    topo = helpers.build(kind, 7, 6)
+    topology.injectRandomLinkFaults(topo, 10, rng=rng)
+    for _ in range(15):
+        topo.routerAt(rng.randrange(7), rng.randrange(6)).setLinkWeight(rng.randrange(4), rng.choice((1, 2, 4)))
+    for _ in range(30):
+        source = topo.routerAt(rng.randrange(7), rng.randrange(6))
+        destination = topo.routerAt(rng.randrange(7), rng.randrange(6))
+        distances = set(search.pathDistance(topo, strategies.STRATEGIES[name](topo, source, destination)[0])
+            for name in ("astar", "bidirectional", "jumpPoint"))
+        assert len(distances) == 1
+        path, cost = search.findPath(topo, source, destination)
+        if path:
+            assert search.pathDistance(topo, path) >= distances.pop()
+
+def test_distance_is_hops_with_default_weights():
+    topo = helpers.build("Torus", 6, 6)
+    path, cost = strategies.astar(topo, topo.routerAt(0, 0), topo.routerAt(5, 3))
+    assert search.pathDistance(topo, path) == len(path) - 1 == 4
+    assert search.pathDistance(topo, []) == "inf"
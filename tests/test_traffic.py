@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import topology
+import traffic
+
+def collect(stream):
+    chunks = list(stream)
+    return np.concatenate([chunk[0] for chunk in chunks]) if chunks else np.zeros(0)
+
+@pytest.mark.parametrize("injection", ["bernoulli", "bursty"])
+def test_rate_zero_ends(injection):
+    mesh = topology.Mesh(4, 4)
+    times = collect(traffic.generate(mesh, rate=0, cycles=1000, injection=injection, seed=1))
+    assert len(times) == 0
+
+@pytest.mark.parametrize("injection", ["bernoulli", "bursty"])
+@pytest.mark.parametrize("rate", [-0.1, 1.5])
+def test_rates_outside_range_rejected(injection, rate):
+    with pytest.raises(ValueError):
+        next(traffic.generate(topology.Mesh(4, 4), rate=rate, cycles=10, injection=injection))
+
+def test_rate_zero_needs_cycles():
+    with pytest.raises(ValueError):
+        next(traffic.generate(topology.Mesh(4, 4), rate=0, packets=10))
+
+@pytest.mark.parametrize("injection", ["bernoulli", "bursty"])
+@pytest.mark.parametrize("rate", [0.05, 0.5, 0.95, 1.0])
+def test_cycles_and_rate(injection, rate):
+    mesh = topology.Mesh(8, 8)
+    times = collect(traffic.generate(mesh, rate=rate, cycles=2000, injection=injection, seed=2, dropSelf=False))
+    assert len(times) == 0 or times.max() < 2000
+    # the long-run rate comes out within a few percent
+    assert abs(len(times)/(64*2000.0) - rate) < 0.05
+
+def test_packets():
+    times = collect(traffic.generate(topology.Torus(8, 8), rate=0.2, packets=5000, injection="bursty", seed=3))
+    assert len(times) == 5000
+    assert np.all(np.diff(times) >= 0)
@@ -1,48 +1,57 @@
 from __future__ import print_function
+import sys
 import random
+from array import array
 from time import sleep
 from router import *
+import search
+import render
+import image
 import pdb
 
-BLUE =  '\033[1;38;2;32;64;227m'
-RED =   '\033[1;38;2;227;32;32m'
-GREEN = '\033[0;38;2;0;192;0m'
-YELLOW ='\033[0;38;2;192;192;0m'
-NC =    '\033[0m'
+from render import BLUE, RED, GREEN, YELLOW, NC
 
 ############
 # Basic Mesh
 ############
 class Mesh:
+    # built on first use, see NeighbourIndex
+    neighbourIndex = None
+
     def __init__(self, x, y, connectAllLinks = False):
         self.X, self.Y = x, y
         if(connectAllLinks):
             self.routers = [[Router([j,i],[1,1,1,1]) for j in range(self.X)] for i in range(self.Y)]
         else:
             self.routers = [[Router([j,i],[0,0,0,0]) for j in range(self.X)] for i in range(self.Y)]
+        self.observers = []
         
     # initialises the topology to with all healthy links
     def initialise(self):
         for i in range(self.Y):
             for j in range(self.X):
-                if(i == 0 and j == 0):
-                    self.routers[i][j].setLinkHealthList([1,0,0,1])
-                elif (i == self.Y-1 and j == 0):
-                    self.routers[i][j].setLinkHealthList([1,1,0,0])
-                elif (i == 0 and j == self.X-1):
-                    self.routers[i][j].setLinkHealthList([0,0,1,1])
-                elif (i == self.Y-1 and j == self.X-1):
-                    self.routers[i][j].setLinkHealthList([0,1,1,0])
-                elif (i == 0 and (j > 0 and j < self.X-1)):
-                    self.routers[i][j].setLinkHealthList([1,0,1,1])
-                elif (i == self.Y-1 and (j > 0 and j < self.X-1)):
-                    self.routers[i][j].setLinkHealthList([1,1,1,0])
-                elif (j == 0 and (i > 0 and i < self.Y - 1)):
-                    self.routers[i][j].setLinkHealthList([1,1,0,1])
-                elif (j == self.X-1 and (i > 0 and i < self.Y-1)):
-                    self.routers[i][j].setLinkHealthList([0,1,1,1])
-                else:
-                    self.routers[i][j].setLinkHealthList([1,1,1,1])
+                self.routers[i][j].setLinkHealthList(self.initialHealth(j, i))
+
+    # link health initialise() gives the router at (j, i): all links but the ones on the border
+    def initialHealth(self, j, i):
+        if(i == 0 and j == 0):
+            return [1,0,0,1]
+        elif (i == self.Y-1 and j == 0):
+            return [1,1,0,0]
+        elif (i == 0 and j == self.X-1):
+            return [0,0,1,1]
+        elif (i == self.Y-1 and j == self.X-1):
+            return [0,1,1,0]
+        elif (i == 0 and (j > 0 and j < self.X-1)):
+            return [1,0,1,1]
+        elif (i == self.Y-1 and (j > 0 and j < self.X-1)):
+            return [1,1,1,0]
+        elif (j == 0 and (i > 0 and i < self.Y - 1)):
+            return [1,1,0,1]
+        elif (j == self.X-1 and (i > 0 and i < self.Y-1)):
+            return [0,1,1,1]
+        else:
+            return [1,1,1,1]
 
     # return the dimensions of the topology
     def getDimensions(self):
@@ -52,41 +61,13 @@ class Mesh:
     # Although this seems like a method more suitable to the router class,
     # only the topology will store the dimensions of the grid.
     def getActiveNeighbourPositions(self, pos):
-        x, y = pos
-        X, Y = self.getDimensions()
-        active = []
-        linkHealths = self.routers[y][x].getHealthyLinksList()
-        r, u, l, d = wrap(x+1,0,X-1), wrap(y-1,0,Y-1), wrap(x-1,0,X-1), wrap(Y+1,0,Y-1) 
-        for link in range(4):
-            if(linkHealths[link] == 1):
-                if(link == 0):
-                    active.append((r,y))
-                elif(link == 1):
-                    active.append((x,u))
-                elif(link == 2):
-                    active.append((l,y))
-                else:
-                    active.append((x,d))
-        return active
-
-    # returns active neighbouring Router instances
+        return [router.getPosition() for router in self.getActiveNeighbours(pos)]
+
+    # returns active neighbouring Router instances, a tuple kept up to date by the neighbour index
+    # (direct linkHealth or threshold writes need neighbourIndex.refresh(), see NeighbourIndex)
     def getActiveNeighbours(self, pos):
-        x, y = pos
-        X, Y = self.getDimensions()
-        active = []
-        linkHealths = self.routers[y][x].getHealthyLinksList()
-        r, u, l, d = wrap(x+1,0,X-1), wrap(y-1,0,Y-1), wrap(x-1,0,X-1), wrap(y+1,0,Y-1) 
-        for link in range(4):
-            if(linkHealths[link] == 1):
-                if(link == 0):
-                    active.append(self.routers[y][r])
-                elif(link == 1):
-                    active.append(self.routers[u][x])
-                elif(link == 2):
-                    active.append(self.routers[y][l])
-                else:
-                    active.append(self.routers[d][x])
-        return active
+        index = self.neighbourIndex or NeighbourIndex(self)
+        return index.active[pos[1]*self.X + pos[0]]
 
     # returns router at given address
     def routerAt(self, posx, posy):
@@ -121,8 +102,7 @@ class Mesh:
         if(destination[1] != current[1] and direction%2 == 1):
             gy = (2-direction)*linkWeight*(2 if (destination[1] - current[1] > 0) else 1)
         g = gx + gy
-        f = h+g
-        # print("F: %.3f, H: %.3f, G: %.3f, LW: %d, Dir: %d" % (f,h,g,linkWeight,direction) + " | {0}-->{1}".format(current,destination))
+        # search.SearchStats(onScore = search.printScore) prints the scores
         return g,h
 
     # for clearing the path info : used when searching for multiple paths in one run
@@ -137,42 +117,41 @@ class Mesh:
 # 2D Planar Torus
 #################
 class Torus:
+    # built on first use, see NeighbourIndex
+    neighbourIndex = None
+
     def __init__(self, x, y, connectAllLinks = True):
         self.X, self.Y = x, y
         if(connectAllLinks):
             self.routers = [[Router([j,i],[1,1,1,1]) for j in range(self.X)] for i in range(self.Y)]
         else:
             self.routers = [[Router([j,i],[0,0,0,0]) for j in range(self.X)] for i in range(self.Y)]
+        self.observers = []
 
     # initialises the topology to with all healthy links
     def initialise(self):
         for i in range(self.Y):
             for j in range(self.X):
-                self.routers[i][j].setLinkHealthList([1,1,1,1])
+                self.routers[i][j].setLinkHealthList(self.initialHealth(j, i))
         return
 
+    # link health initialise() gives the router at (j, i)
+    def initialHealth(self, j, i):
+        return [1,1,1,1]
+
     # returns the dimensions of the topology
     def getDimensions(self):
         return self.X, self.Y
 
-    # returns active neighbouring Router instances
+    # get active (healthy) neighbours' positions
+    def getActiveNeighbourPositions(self, pos):
+        return [router.getPosition() for router in self.getActiveNeighbours(pos)]
+
+    # returns active neighbouring Router instances, a tuple kept up to date by the neighbour index
+    # (direct linkHealth or threshold writes need neighbourIndex.refresh(), see NeighbourIndex)
     def getActiveNeighbours(self, pos):
-        x, y = pos
-        X, Y = self.getDimensions()
-        active = []
-        linkHealths = self.routers[y][x].getHealthyLinksList()
-        r, u, l, d = wrap(x+1,0,X-1), wrap(y-1,0,Y-1), wrap(x-1,0,X-1), wrap(y+1,0,Y-1) 
-        for link in range(4):
-            if(linkHealths[link] == 1):
-                if(link == 0):
-                    active.append(self.routers[y][r])
-                elif(link == 1):
-                    active.append(self.routers[u][x])
-                elif(link == 2):
-                    active.append(self.routers[y][l])
-                else:
-                    active.append(self.routers[d][x])
-        return active
+        index = self.neighbourIndex or NeighbourIndex(self)
+        return index.active[pos[1]*self.X + pos[0]]
 
     # returns router at given address
     def routerAt(self, posx, posy):
@@ -211,10 +190,8 @@ class Torus:
             gx = linkWeight*(1 if (destination[0] - current[0] > 0) else 2)
         if(destination[1] != current[1] and direction%2 == 1):
             gy = linkWeight*(2 if (destination[1] - current[1] > 0) else 1)
-        # pdb.set_trace()
         g = gx + gy
-        f = h+g
-        print("F: %.3f, H: %.3f, G: %.3f, LW: %d, Dir: %d" % (f,h,g,linkWeight, direction) + " | {0}-->{1}".format(current,destination))
+        # search.SearchStats(onScore = search.printScore) prints the scores
         return g,h
 
     # for clearing the path info : used when searching for multiple paths in one run
@@ -228,7 +205,104 @@ class Torus:
 ###########################
 # Common topology functions
 ###########################
+
+'''
+Observers
+
+An observer is told about every change made through the Router setters, which includes
+all the fault injection functions below. Path caches and other derived state use this
+to update themselves instead of being rebuilt.
+'''
+class Observer:
+    # called after link 'direction' of 'router' changed health from 'old' to 'new'
+    def linkHealthChanged(self, router, direction, old, new):
+        pass
+
+    # called after the router weight (direction None) or a link weight changed
+    def weightChanged(self, router, direction):
+        pass
+
+# registers an observer with the topology and all of its routers
+# 'first' puts it ahead of the others, for state the other observers may read
+def addObserver(topology, observer, first = False):
+    # routers share the topology's list, so this only has to be done once
+    # (array topologies hand out views that read the list from the topology)
+    if(len(topology.observers) == 0 and isinstance(topology.routers, list)):
+        for row in topology.routers:
+            for router in row:
+                router.observers = topology.observers
+    if(first):
+        topology.observers.insert(0, observer)
+    else:
+        topology.observers.append(observer)
+
+def removeObserver(topology, observer):
+    topology.observers.remove(observer)
+
+'''
+Neighbour index
+
+Mesh and Torus expand routers through a NeighbourIndex, built on the first getActiveNeighbours()
+call. Routers are numbered i = y*X + x and the index holds, in compressed sparse row form:
+* offsets       neighbours of router i are neighbours[offsets[i]:offsets[i+1]], one per port
+* neighbours    router number at the other end of every port, wrap-around included
+* healthy       bitmask of the healthy ports of every router (bit d for direction d)
+* active        tuple of the neighbouring Router objects behind the healthy ports
+As an observer it flips one bit and rebuilds one tuple per link change, so expanding a router
+is a single lookup that allocates nothing. The tuples are shared, don't modify them.
+The index only hears about changes made through setLinkHealth()/setLinkHealthList(). Assigning
+router.linkHealth directly, writing into it, or changing router.threshold goes unnoticed; call
+topology.neighbourIndex.refresh() afterwards (Ageing.sync() does).
+'''
+# directions of the set bits of every 4-bit mask
+PORTS = [tuple(direction for direction in range(4) if mask >> direction & 1) for mask in range(16)]
+
+class NeighbourIndex(Observer):
+    def __init__(self, topology):
+        X, Y = topology.getDimensions()
+        self.X = X
+        self.routers = [router for row in topology.routers for router in row]
+        self.offsets = array('l', range(0, 4*X*Y + 1, 4))
+        self.neighbours = array('l', [0]*(4*X*Y))
+        for y in range(Y):
+            for x in range(X):
+                i = y*X + x
+                for direction in range(4):
+                    nx, ny = neighbourPosition(topology, (x,y), direction)
+                    self.neighbours[4*i + direction] = ny*X + nx
+        self.refresh()
+        addObserver(topology, self, first = True)
+        topology.neighbourIndex = self
+
+    # reads the masks again from the routers, after changes the observers didn't hear about
+    def refresh(self):
+        self.healthy = bytearray(sum(1 << direction for direction in range(4) if router.linkHealth[direction] > router.threshold)
+                                 for router in self.routers)
+        self.active = [self.activeRouters(i) for i in range(len(self.routers))]
+
+    def activeRouters(self, i):
+        start = self.offsets[i]
+        return tuple(self.routers[self.neighbours[start + direction]] for direction in PORTS[self.healthy[i]])
+
+    def linkHealthChanged(self, router, direction, old, new):
+        i = router.posy*self.X + router.posx
+        if(new > router.threshold):
+            mask = self.healthy[i] | (1 << direction)
+        else:
+            mask = self.healthy[i] & ~(1 << direction)
+        if(mask != self.healthy[i]):
+            self.healthy[i] = mask
+            self.active[i] = self.activeRouters(i)
+
+# generic graphs (see graphtopology.py) have routers at (i,) and number the links of every router,
+# the injectors hand them the port of a link instead of working out its neighbour on a grid
 def injectLinkFault(topology, pos, direction):
+    if hasattr(topology, 'port'):
+        # return true only if the link was healthy before
+        if(topology.injectLinkFaults([topology.port(pos, direction)]) == 1):
+            return True
+        print("Already a fault!")
+        return False
     X,Y = topology.getDimensions()
     j,i = pos   # position of the router
     if(j > X-1 or i > Y-1):
@@ -237,35 +311,121 @@ def injectLinkFault(topology, pos, direction):
     else:
         # return true only if the link was healthy before
         if(topology.routers[i][j].getHealthyLinksList()[direction] == 1):
-            topology.routers[i][j].setLinkHealth(direction, 0)
-            if(direction == 0):
-                topology.routers[i][wrap(j+1,0,X-1)].setLinkHealth(2,0)
-            elif(direction == 1):
-                topology.routers[wrap(i-1,0,Y-1)][j].setLinkHealth(3,0)
-            elif(direction == 2):
-                topology.routers[i][wrap(j-1,0,X-1)].setLinkHealth(0,0)
-            else:
-                topology.routers[wrap(i+1,0,Y-1)][j].setLinkHealth(1,0)
+            killLink(topology, pos, direction)
             return True
         else:
             print("Already a fault!")
             return False
 
 def injectRouterFault(topology, pos):
+    if hasattr(topology, 'port'):
+        topology.injectRouterFaults([topology.routerIndex(pos)])
+        return
     X,Y = topology.getDimensions()
     j,i = pos   # position of the router
     if(j > X-1 or i > Y-1):
         raise IndexError("Index out of range for given topology")
         return False
     else:
-        topology.routers[i][j].setLinkHealthList([0,0,0,0])
-        # modify neighbours
-        r, u, l, d = wrap(j+1,0,X-1), wrap(i-1,0,Y-1), wrap(j-1,0,X-1), wrap(i+1,0,Y-1) 
-        topology.routers[i][l].setLinkHealth(0,0)
-        topology.routers[d][j].setLinkHealth(1,0)
-        topology.routers[i][r].setLinkHealth(2,0)
-        topology.routers[u][j].setLinkHealth(3,0)
-        
+        killRouter(topology, pos)
+
+# sets a link and its counterpart on the neighbouring router as faulty
+def killLink(topology, pos, direction):
+    x,y = pos
+    topology.routers[y][x].setLinkHealth(direction, 0)
+    nx,ny = neighbourPosition(topology, pos, direction)
+    topology.routers[ny][nx].setLinkHealth((direction+2)%4, 0)
+
+# sets a router and all links pointing at it as faulty
+def killRouter(topology, pos):
+    x,y = pos
+    topology.routers[y][x].setLinkHealthList([0,0,0,0])
+    # modify neighbours
+    for direction in range(4):
+        nx,ny = neighbourPosition(topology, pos, direction)
+        topology.routers[ny][nx].setLinkHealth((direction+2)%4, 0)
+
+# injects a list of link faults [((x,y), direction), ...], such as simvar.faultyLinks
+# Entries that don't fit the topology are skipped and returned, faulty links are left as they are.
+def injectLinkFaults(topology, faults):
+    if hasattr(topology, 'port'):
+        return injectGraphFaults(topology, faults, lambda fault: topology.port(*fault), topology.injectLinkFaults)
+    X,Y = topology.getDimensions()
+    valid, rejected = [], []
+    for fault in faults:
+        (x,y), direction = fault
+        if(0 <= x < X and 0 <= y < Y and 0 <= direction < 4):
+            valid.append(fault)
+        else:
+            rejected.append(fault)
+    if hasattr(topology, 'health'):
+        # array topologies apply the whole list in one pass
+        topology.injectLinkFaults([x for (x,y),d in valid], [y for (x,y),d in valid], [d for (x,y),d in valid])
+    else:
+        for pos, direction in valid:
+            killLink(topology, pos, direction)
+    return rejected
+
+# injects a list of router faults [(x,y), ...], such as simvar.faultyRouters
+# Positions that don't fit the topology are skipped and returned.
+def injectRouterFaults(topology, positions):
+    if hasattr(topology, 'port'):
+        return injectGraphFaults(topology, positions, topology.routerIndex, topology.injectRouterFaults)
+    X,Y = topology.getDimensions()
+    valid, rejected = [], []
+    for pos in positions:
+        if(0 <= pos[0] < X and 0 <= pos[1] < Y):
+            valid.append(pos)
+        else:
+            rejected.append(pos)
+    if hasattr(topology, 'health'):
+        topology.injectRouterFaults([x for x,y in valid], [y for x,y in valid])
+    else:
+        for pos in valid:
+            killRouter(topology, pos)
+    return rejected
+
+# injects the 'faults' of a generic graph with 'inject', after turning them into ports or router
+# numbers with 'index'; returns the faults that don't fit the graph
+def injectGraphFaults(topology, faults, index, inject):
+    valid, rejected = [], []
+    for fault in faults:
+        try:
+            valid.append(index(fault))
+        except IndexError:
+            rejected.append(fault)
+    inject(valid)
+    return rejected
+
+# returns a generator with randrange() for 'rng': the random module itself when rng is None,
+# rng when it already is a random.Random, otherwise a random.Random seeded with rng
+def randomGenerator(rng):
+    if rng is None:
+        return random
+    if isinstance(rng, random.Random):
+        return rng
+    return random.Random(rng)
+
+# draws distinct numbers from range(size), each in O(1)
+# This is a Fisher-Yates shuffle that only stores the slots it has swapped.
+def sampleWithoutReplacement(size, rng):
+    swapped = {}
+    while size > 0:
+        k = rng.randrange(size)
+        size = size-1
+        choice = swapped.get(k, k)
+        swapped[k] = swapped.pop(size, size)
+        yield choice
+
+# turns the 'frames' argument of the random injectors into something to draw(), and draws the first frame
+def frameRecorder(topology, frames):
+    if frames is None:
+        return None
+    if not hasattr(frames, 'draw'):
+        frames = image.FrameWriter(topology, frames)
+    frames.draw()
+    return frames
+
 '''
 Injects 'n' random faults
 
@@ -276,20 +436,31 @@ Keeping a macro for different topologies, a if-else is very simple to implement.
 I'd prefer a general solution.
 
 A workaround can be to target only healthy links and modify them, which has been implemented.
+
+Candidates are drawn without replacement in O(1) each, so injecting n faults costs O(n)
+(plus the faulty links skipped on the way). 'rng' can be a seed or a random.Random for
+reproducible runs; by default the random module is used.
+
+'frames' records the injection as images: a file name pattern like "frames/{0:04d}.png" (see
+image.FrameWriter) or anything with a draw() method, drawn once before and once after every fault.
 '''
-def injectRandomLinkFaults(topology, n):
+def injectRandomLinkFaults(topology, n, rng = None, frames = None):
+    rng = randomGenerator(rng)
+    # array-backed and graph topologies pick and inject all faults in one vectorized pass
+    if hasattr(topology, 'injectRandomLinkFaults') and frames is None:
+        return topology.injectRandomLinkFaults(n, rng.getrandbits(64))
     X,Y = topology.getDimensions()
     # a 2D planar topology will have 2*M*N links. Mesh will have M+N-2 less links.
     if n > 2*X*Y:
         raise ValueError("Too many elements. No faults injected.")
         return
+    frames = frameRecorder(topology, frames)
     faults = []
-    original = [i for i in range(2*X*Y)]
+    candidates = sampleWithoutReplacement(2*X*Y, rng)
     while (n > 0):
-        try:
-            # choose a random router
-            choice = random.choice(original)
-        except:
+        # choose a random link
+        choice = next(candidates, None)
+        if choice is None:
             print("Couldn't inject " + str(n) + " faults")
             return faults
         # get coordinates
@@ -299,203 +470,82 @@ def injectRandomLinkFaults(topology, n):
         # check if the link is healthy
         if(topology.routers[i][j].getHealthyLinksList()[link] == 1):
             faults.append(((j,i), link))
-            topology.routers[i][j].setLinkHealth(link, 0)
-            if(link == 0):
-                topology.routers[i][wrap(j+1,0,X-1)].setLinkHealth(2,0)
-            elif(link == 1):
-                topology.routers[wrap(i-1,0,Y-1)][j].setLinkHealth(3,0)
-            elif(link == 2):
-                topology.routers[i][wrap(j-1,0,X-1)].setLinkHealth(0,0)
-            else:
-                topology.routers[wrap(i+1,0,Y-1)][j].setLinkHealth(1,0)
-            # remove choice and decrement counter
-            original.remove(choice)
+            killLink(topology, (j,i), link)
             n = n-1
-        else:
-            # remove choice
-            original.remove(choice)
+            if frames:
+                frames.draw()
     if len(faults) > 0:
         return faults
 
-def injectRandomRouterFaults(topology, n, animate=False, frameDelay=0.05):
+def injectRandomRouterFaults(topology, n, animate=False, frameDelay=0.05, rng = None, frames = None):
+    rng = randomGenerator(rng)
+    if hasattr(topology, 'injectRandomRouterFaults') and not animate and frames is None:
+        topology.injectRandomRouterFaults(n, rng.getrandbits(64))
+        return
     X,Y = topology.getDimensions()
     if n > X*Y:
         raise ValueError("Too many elements. No faults injected.")
         return
-    original = [i for i in range(X*Y)]
+    frames = frameRecorder(topology, frames)
+    candidates = sampleWithoutReplacement(X*Y, rng)
+    if(animate):
+        renderer = render.FrameRenderer(topology, True)
     for k in range(n):
         # choose a random router
-        choice = random.choice(original)
+        choice = next(candidates)
         # get coordinates
         i = int(choice/X)
         j = int(choice%X)
         # kill router
-        topology.routers[i][j].setLinkHealthList([0,0,0,0])
-        # modify neighbours
-        r, u, l, d = wrap(j+1,0,X-1), wrap(i-1,0,Y-1), wrap(j-1,0,X-1), wrap(i+1,0,Y-1) 
-        # print(j+1,i-1,j-1,i+1)
-        # print(r, u, l, d)
-        topology.routers[i][l].setLinkHealth(0,0)
-        topology.routers[d][j].setLinkHealth(1,0)
-        topology.routers[i][r].setLinkHealth(2,0)
-        topology.routers[u][j].setLinkHealth(3,0)
-        original.remove(choice)
+        killRouter(topology, (j,i))
         if(animate):
-            printTopologyMap(topology, True)
+            # only the cells around the new fault are redrawn
+            renderer.draw()
             sleep(frameDelay)
-            for c in range(2*Y):
-                print("\033[F", end = '')
-    if(animate):
-        for i in range(2*Y):
-            print("\033[E", end = '')
+        if frames:
+            frames.draw()
 
 # find shortest path between two nodes
-def findPath(topology, source, destination, pathWeight = 1, linkWeight = 1):
-    # customary check
-    if(source.isIsolated() or destination.isIsolated()):
-        return ([], "inf")
-    openList = []
-    closedList = []
-    pathCost = 0
-    openList.append(source)
-    while len(openList) > 0:
-        # fetch current
-        currentNode = openList[0]
-        currentIndex = 0
-        for index, item in enumerate(openList):
-            if item.getCost() < currentNode.getCost():
-                # print("Searching node "+str(item.getPosition()))
-                currentNode = item
-                currentIndex = index
-        # pop off current from open and add to closed
-        openList.pop(currentIndex)
-        closedList.append(currentNode)
-
-        # found goal
-        if currentNode == destination:
-            path = []
-            current = currentNode
-            # pdb.set_trace()
-            while current is not None:
-                # print(RED + str(current.getPosition()) + NC)                
-                path.append(current.getPosition())
-                pathCost = pathCost + current.getCost()
-                current.setWeight(current.getWeight()*pathWeight)
-                try:
-                    direction = topology.getRelativeDirection(current, current.parent)
-                except AttributeError:
-                    pass
-                else:
-                    pdir = (direction+2)%4
-                    current.parent.setLinkWeight(pdir, linkWeight*current.parent.getLinkWeight(pdir))
-                    current.setLinkWeight(direction, linkWeight*current.getLinkWeight(direction))
-                    # print(current.getPosition(), direction, current.getLinkWeight(direction))
-                    # print(current.parent.getPosition(), pdir, current.parent.getLinkWeight(pdir), current.parent.getCostHeuristic())
-                # pdb.set_trace()
-                current = current.parent
-            return (path[::-1], pathCost)
-
-        # create children
-        children = []
-        for newNode in topology.getActiveNeighbours(currentNode.getPosition()):
-            if(newNode.parent == None and newNode != source):
-                newNode.parent = currentNode
-            children.append(newNode)
-
-        for child in children:
-            # is this a valid way to check for child's availability in the closedList?
-            if child in closedList:
-                continue
-            
-            # generate heuristic values
-            dx = child.getPosition()[0] - currentNode.getPosition()[0]
-            dy = child.getPosition()[1] - currentNode.getPosition()[1]
-            direction = topology.getRelativeDirection(currentNode, child)
-            # heuristic is subjective to topology
-            g,h = topology.heuristic(child.getPosition(),destination.getPosition(),direction)
-            child.setCostHeuristic(cost=g, heuristic=h)
-
-            for openNode in openList:
-                # if child == openNode and child.getCost() > openNode.getCost():
-                if child == openNode and child.getCostHeuristic()[1] > openNode.getCostHeuristic()[1]:
-                    continue
-
-            openList.append(child)
-    # return nothing if no path found
-    return ([], "inf")
+# The search itself lives in search.py and leaves routers untouched; pathWeight and linkWeight
+# multiply the router and link weights along the found path to push later paths elsewhere.
+# 'stats' is an optional search.SearchStats recording the query.
+# 'strategy' replaces the search, e.g. one of strategies.STRATEGIES (search.findPath when not given),
+# any function with the routing signature described in search.py
+def findPath(topology, source, destination, pathWeight = 1, linkWeight = 1, stats = None, strategy = None):
+    path, pathCost = (strategy or search.findPath)(topology, source, destination, stats)
+    if(pathWeight != 1 or linkWeight != 1):
+        search.applyPathWeights(topology, path, pathWeight, linkWeight)
+    return (path, pathCost)
 
 # highlight a path in Green
 # coloured outputs can get pretty ugly in terminals not supporting colour escape codes
+# Topologies that aren't grids draw themselves with writeMap(stream, path, colour).
 def showPath(topology, path):
-    for i in range(topology.Y):
-        for j in range(topology.X):
-            num = topology.routers[i][j].getHealthyLinksCount()
-            linkRight = topology.routers[i][j].getHealthyLinksList()[0]
-            if(j < topology.X-1):
-                if (j,i) in path:
-                    print(GREEN + str(num) + NC, end = "")
-                # elif(num == 0):
-                #     print(RED + str(num) + NC, end = "")
-                # elif(num == 1):
-                #     print(YELLOW + str(num) + NC, end = "")
-                else:
-                    print(str(num), end = "")
-                print("---", end = "") if(linkRight == 1) else print("   ", end = "")    
-            else:
-                if (j,i) in path:
-                    print(GREEN + str(num) + NC)
-                # elif(num == 0):
-                #     print(RED + str(num) + NC)
-                # elif(num == 1):
-                #     print(YELLOW + str(num) + NC)
-                else:
-                    print(num)
-        for j in range(topology.X):
-            if(i != topology.Y-1):
-                linkDown = topology.routers[i][j].getHealthyLinksList()[3]
-                print("|", end = "   ") if(linkDown == 1) else print("    ", end = "")
-        print()
+    if hasattr(topology, 'writeMap'):
+        topology.writeMap(sys.stdout, path, False)
+        return
+    sys.stdout.write(render.frame(topology, render.PLAIN, path))
 
 # prints topology in readable format
 # coloured outputs can get pretty ugly in terminals not supporting colour escape codes
 def printTopologyMap(topology, colour):
-    for i in range(topology.Y):
-        for j in range(topology.X):
-            num = topology.routers[i][j].getHealthyLinksCount()
-            linkRight = topology.routers[i][j].getHealthyLinksList()[0]
-            if(j < topology.X-1):
-                if colour:
-                    if(num == 0):
-                        print(RED + str(num) + NC, end = "")
-                    elif(num == 1):
-                        print(YELLOW + str(num) + NC, end = "")
-                    else:
-                        print(str(num), end = "")
-                    print("---", end = "") if(linkRight == 1) else print("   ", end = "")
-                else:
-                    if(num == 0):
-                        print(" ", end = "")
-                    else:
-                        print(str(num), end = "")
-                    print("---", end = "") if(linkRight == 1) else print("   ", end = "")
-            else:
-                if colour:
-                    if(num == 0):
-                        print(RED + str(num) + NC)
-                    elif(num == 1):
-                        print(YELLOW + str(num) + NC)
-                    else:
-                        print(str(num))
-                else:
-                    if(num == 0):
-                        print(" ")
-                    else:
-                        print(str(num))
-        for j in range(topology.X):
-            if(i != topology.Y - 1):
-                linkDown = topology.routers[i][j].getHealthyLinksList()[3]
-                print("|", end = "   ") if(linkDown == 1) else print("    ", end = "")
-        print()
+    if hasattr(topology, 'writeMap'):
+        topology.writeMap(sys.stdout, (), colour)
+        return
+    sys.stdout.write(render.frame(topology, render.COLOUR if colour else render.BLANK))
+
+# returns the position of the router at the other end of link 'direction' of the router at 'pos'
+def neighbourPosition(topology, pos, direction):
+    X,Y = topology.getDimensions()
+    x,y = pos
+    if(direction == 0):
+        return (wrap(x+1,0,X-1), y)
+    elif(direction == 1):
+        return (x, wrap(y-1,0,Y-1))
+    elif(direction == 2):
+        return (wrap(x-1,0,X-1), y)
+    else:
+        return (x, wrap(y+1,0,Y-1))
 
 # helper function for dealing with wrap around links
 def wrap(variable, minval, maxval):
@@ -0,0 +1,146 @@
+import numpy as np
+
+'''
+Synthetic traffic
+
+generate() streams packets for the standard NoC traffic patterns on any topology with
+getDimensions(). Routers are numbered i = y*X + x. Every chunk is a tuple of NumPy arrays
+(times, sx, sy, dx, dy) holding injection cycles, source and destination coordinates of about
+'chunkSize' packets, so large workloads never turn into one big Python list.
+
+Patterns (destination of a packet sent by the router at (x,y), number i, out of N):
+* uniform           any other router, picked at random
+* transpose         (y*X/Y, x*Y/X), which is (y,x) on square grids
+* bitcomplement     router N-1-i, the bitwise complement of i when N is a power of two
+* bitreversal       router with the bits of i reversed (taken modulo N)
+* hotspot           one of 'hotspots' with probability 'hotspotFraction', uniform otherwise
+* neighbour         one of the four adjacent routers, picked at random
+* tornado           (x + ceil(X/2) - 1, y + ceil(Y/2) - 1), wrapped around
+
+Injection processes:
+* bernoulli         every router injects a packet in each cycle with probability 'rate'
+* bursty            every router switches between ON (one packet per cycle) and OFF periods;
+                    ON periods last 'burstLength' cycles on average and the long-run rate is 'rate'
+'''
+
+PATTERNS = ("uniform", "transpose", "bitcomplement", "bitreversal", "hotspot", "neighbour", "tornado")
+
+# returns destination coordinates for sources (sx, sy) under 'pattern'
+def destinations(pattern, X, Y, sx, sy, rng, hotspots = None, hotspotFraction = 0.1):
+    N = X*Y
+    if pattern == "uniform":
+        source = sy*X + sx
+        target = rng.integers(0, N-1, len(sx))
+        target = target + (target >= source)
+        return target % X, target // X
+    elif pattern == "transpose":
+        return (sy*X) // Y, (sx*Y) // X
+    elif pattern == "bitcomplement":
+        target = N-1 - (sy*X + sx)
+        return target % X, target // X
+    elif pattern == "bitreversal":
+        source = sy*X + sx
+        bits = max(1, int(np.ceil(np.log2(N))))
+        target = np.zeros_like(source)
+        for bit in range(bits):
+            target = target | (((source >> bit) & 1) << (bits-1-bit))
+        target = target % N
+        return target % X, target // X
+    elif pattern == "hotspot":
+        dx, dy = destinations("uniform", X, Y, sx, sy, rng)
+        hotspots = np.array(hotspots if hotspots is not None else [(X//2, Y//2)])
+        hot = rng.random(len(sx)) < hotspotFraction
+        choice = hotspots[rng.integers(0, len(hotspots), np.count_nonzero(hot))]
+        dx[hot], dy[hot] = choice[:, 0], choice[:, 1]
+        return dx, dy
+    elif pattern == "neighbour":
+        direction = rng.integers(0, 4, len(sx))
+        ox = np.array([1, 0, -1, 0])[direction]
+        oy = np.array([0, -1, 0, 1])[direction]
+        # step the other way along the grid's edges
+        ox = np.where((sx+ox < 0) | (sx+ox >= X), -ox, ox)
+        oy = np.where((sy+oy < 0) | (sy+oy >= Y), -oy, oy)
+        return sx+ox, sy+oy
+    elif pattern == "tornado":
+        return (sx + -(-X//2) - 1) % X, (sy + -(-Y//2) - 1) % Y
+    else:
+        raise ValueError("Unknown traffic pattern: " + str(pattern))
+
+# yields (cycles, router numbers, end cycle) of injections for blocks of about 'chunkSize' packets
+# neither goes past cycle 'cycles' when it is given
+def bernoulli(N, rate, rng, chunkSize, cycles = None):
+    block = max(1, int(chunkSize/max(N*rate, 1e-9)))
+    start = 0
+    while cycles is None or start < cycles:
+        if cycles is not None:
+            block = min(block, cycles - start)
+        # the number of injections in a block, then which (cycle, router) slots they fall on
+        slots = rng.choice(block*N, rng.binomial(block*N, rate), replace=False)
+        slots.sort()
+        yield start + slots // N, slots % N, start + block
+        start = start + block
+
+def bursty(N, rate, burstLength, rng, chunkSize, cycles = None):
+    stop, go = 1.0/burstLength, 1.0
+    if rate*stop < 1-rate:
+        go = rate*stop/(1-rate)
+    else:
+        # rates this close to 1 can't be reached with ON periods that short, routers turn ON again
+        # right away and stay ON longer
+        stop = (1-rate)/rate
+    on = rng.random(N) < rate
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        times, routers, count = [], [], 0
+        while count < chunkSize and (cycles is None or cycle < cycles):
+            injecting = np.flatnonzero(on)
+            times.append(np.full(len(injecting), cycle))
+            routers.append(injecting)
+            count = count + len(injecting)
+            flip = rng.random(N) < np.where(on, stop, go)
+            on = on ^ flip
+            cycle = cycle + 1
+        yield np.concatenate(times), np.concatenate(routers), cycle
+
+# streams (times, sx, sy, dx, dy) chunks until 'packets' packets or 'cycles' cycles have been generated
+def generate(topology, pattern = "uniform", rate = 0.1, packets = None, cycles = None, injection = "bernoulli",
+        burstLength = 10, chunkSize = 65536, seed = None, dropSelf = True, **patternArgs):
+    if packets is None and cycles is None:
+        raise ValueError("Either packets or cycles has to be given")
+    if not 0 <= rate <= 1:
+        raise ValueError("rate has to be between 0 and 1")
+    if rate == 0 and cycles is None:
+        raise ValueError("Nothing is injected at rate 0, cycles has to be given")
+    X, Y = topology.getDimensions()
+    rng = np.random.default_rng(seed)
+    if injection == "bernoulli":
+        stream = bernoulli(X*Y, rate, rng, chunkSize, cycles)
+    elif injection == "bursty":
+        stream = bursty(X*Y, rate, burstLength, rng, chunkSize, cycles)
+    else:
+        raise ValueError("Unknown injection process: " + str(injection))
+    generated = 0
+    for times, routers, end in stream:
+        if cycles is not None:
+            keep = times < cycles
+            times, routers = times[keep], routers[keep]
+        sx, sy = routers % X, routers // X
+        dx, dy = destinations(pattern, X, Y, sx, sy, rng, **patternArgs)
+        if dropSelf:
+            keep = (sx != dx) | (sy != dy)
+            times, sx, sy, dx, dy = times[keep], sx[keep], sy[keep], dx[keep], dy[keep]
+        if packets is not None and generated + len(times) >= packets:
+            left = packets - generated
+            yield times[:left], sx[:left], sy[:left], dx[:left], dy[:left]
+            return
+        generated = generated + len(times)
+        if len(times):
+            yield times, sx, sy, dx, dy
+        if cycles is not None and end >= cycles:
+            return
+
+# turns a stream of chunks into (time, source, destination) tuples, as taken by Simulator.injectMany()
+def packetTuples(stream):
+    for times, sx, sy, dx, dy in stream:
+        for time, x1, y1, x2, y2 in zip(times.tolist(), sx.tolist(), sy.tolist(), dx.tolist(), dy.tolist()):
+            yield time, (x1, y1), (x2, y2)